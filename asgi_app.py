@@ -0,0 +1,120 @@
+"""
+ASGI application for PDF RAG System.
+This script serves the web interface with an asyncio server, so that many
+clients can stream answers at the same time without a thread per stream.
+
+The streaming endpoint runs natively on the event loop; all other routes are
+served by the Flask application in web_app.py, which shares the RAG systems
+and caches with it.
+
+Run with:
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from quart import Quart, request, jsonify
+from hypercorn.middleware import AsyncioWSGIMiddleware
+
+import web_app
+from src.async_ollama_client import AsyncOllamaClient
+from src.sse import astream_events, format_event, format_comment
+
+# Thread pool for the blocking steps of a query: loading the index, embedding and searching
+search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-search")
+
+# One pooled asyncio client for all streams
+async_ollama_client = AsyncOllamaClient(api_base=web_app.faiss_rag_system.ollama_client.api_base)
+
+stream_app = Quart(__name__)
+# Streams last as long as the answer takes; heartbeats keep idle ones alive
+stream_app.config['RESPONSE_TIMEOUT'] = None
+
+# Everything but /stream is handled by the Flask app, run in a thread pool
+wsgi_app = AsyncioWSGIMiddleware(web_app.app, max_body_size=web_app.app.config['MAX_CONTENT_LENGTH'])
+
+@stream_app.before_serving
+async def start_background_tasks():
+    web_app.start_background_tasks()
+
+@stream_app.after_serving
+async def close_clients():
+    await async_ollama_client.aclose()
+    search_executor.shutdown(wait=False)
+
+@stream_app.route('/stream', methods=['GET', 'POST'])
+async def stream():
+    # Handle both GET and POST requests
+    if request.method == 'GET':
+        params = request.args
+    else:
+        params = await request.get_json(silent=True)
+        if not params:
+            return jsonify({'error': 'No data provided'}), 400
+    question = params.get('question')
+    model = params.get('model', 'llama2')
+    retrieval_id = params.get('retrieval_id')
+    if not question:
+        return jsonify({'error': 'No question provided'}), 400
+    print(f"Async stream request received - Question: {question}, Model: {model}")
+    # Get the RAG system for this request, like the Flask app does
+    try:
+        system_type, current_system = web_app._select_system(params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Only models listed by Ollama are accepted, like the Flask app does
+    if not web_app.model_registry.has_model(model):
+        return jsonify({'error': f"Unknown model: {model}"}), 400
+    # Reuse the documents retrieved by /query instead of searching again
+    retrieved_docs = web_app.retrieval_cache.get(retrieval_id, question,
+                                                 **web_app._retrieval_scope(system_type, current_system))
+    headers = {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+
+    chunks = current_system.astream_query(question, async_ollama_client, retrieved_docs=retrieved_docs,
+                                          model=model, executor=search_executor)
+
+    async def generate():
+        try:
+            # A comment, so that it is not mistaken for part of the answer
+            yield format_comment("connected")
+            async for event in astream_events(
+                chunks,
+                coalesce_interval=web_app.STREAM_COALESCE_INTERVAL,
+                heartbeat_interval=web_app.STREAM_HEARTBEAT_INTERVAL
+            ):
+                yield event
+        except Exception as e:
+            error_msg = str(e)
+            print(f"Error in streaming: {error_msg}")
+            yield format_event(f"Error: {error_msg}")
+        # Not sent from a finally block: yielding is impossible once the client went away
+        yield format_event("[DONE]")
+
+    return generate(), 200, headers
+
+async def app(scope, receive, send):
+    """ASGI entry point: lifespan and /stream go to the async app, the rest to Flask."""
+    if scope["type"] == "lifespan" or scope.get("path") == "/stream":
+        await stream_app(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
+
+if __name__ == '__main__':
+    import asyncio
+    from hypercorn.config import Config
+    from hypercorn.asyncio import serve
+
+    # Ensure the indexes are loaded
+    try:
+        web_app.faiss_rag_system.index_documents()
+        web_app.chroma_rag_system.index_documents()
+    except Exception as e:
+        print(f"Warning: Could not load indexes: {str(e)}")
+
+    config = Config()
+    config.bind = ["0.0.0.0:5000"]
+    asyncio.run(serve(app, config))
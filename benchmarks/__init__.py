@@ -0,0 +1,5 @@
+"""
+Benchmarks for RAG System.
+This package measures ingestion, index builds, searches and index loading of
+the vector stores on generated corpora, without a running Ollama server.
+"""
@@ -0,0 +1,214 @@
+"""
+Synthetic Corpus Module for RAG Benchmarks.
+This module generates reproducible document chunks, queries and PDF files of
+any size, with a Zipf-like word distribution like that of natural text.
+"""
+
+import os
+from typing import List, Dict, Any, Iterator, Tuple
+
+import numpy as np
+
+_SYLLABLES = [
+    consonant + vowel
+    for consonant in "bcdfghjklmnprstvwz"
+    for vowel in ("a", "e", "i", "o", "u", "ai", "ou")
+]
+
+class SyntheticCorpus:
+    """Class for generating document chunks made of pseudo-words."""
+
+    def __init__(self, num_chunks: int, chunk_words: int = 150, chunks_per_source: int = 50,
+                 vocabulary_size: int = 50_000, zipf_exponent: float = 1.1,
+                 num_topics: int = 200, topic_share: float = 0.5, seed: int = 0):
+        """
+        Initialize the corpus.
+
+        Chunks are generated on demand, so corpora of millions of chunks are
+        never held in memory as a whole. Every source file has a topic, and
+        part of its words come from the topic's own frequency ranking, so
+        that chunks form clusters like real documents do.
+
+        Args:
+            num_chunks: Number of chunks in the corpus
+            chunk_words: Number of words per chunk
+            chunks_per_source: Number of chunks attributed to each source file
+            vocabulary_size: Number of distinct words
+            zipf_exponent: Exponent of the word frequency distribution
+            num_topics: Number of topics
+            topic_share: Fraction of the words of a chunk drawn for its topic
+            seed: Seed of the random generator; the same seed gives the same corpus
+        """
+        self.num_chunks = num_chunks
+        self.chunk_words = chunk_words
+        self.chunks_per_source = chunks_per_source
+        self.topic_share = topic_share
+        self.seed = seed
+
+        rng = np.random.default_rng(seed)
+        syllable_counts = rng.integers(2, 5, size=vocabulary_size)
+        words = set()
+        self.vocabulary: List[str] = []
+        for count in syllable_counts:
+            word = "".join(rng.choice(_SYLLABLES, size=count))
+            while word in words:
+                word += _SYLLABLES[rng.integers(len(_SYLLABLES))]
+            words.add(word)
+            self.vocabulary.append(word)
+
+        weights = 1.0 / np.arange(1, vocabulary_size + 1) ** zipf_exponent
+        self._cumulative = np.cumsum(weights / weights.sum())
+        # A topic ranks the vocabulary rotated by its offset
+        self._topic_offsets = rng.integers(0, vocabulary_size, size=num_topics)
+
+    def _chunk_words(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Draw the words of one chunk; always the same for the same corpus and index.
+
+        Returns:
+            Tuple of the word ids and their frequency ranks, where a larger rank is a rarer word
+        """
+        rng = np.random.default_rng((self.seed, index))
+        ranks = np.minimum(np.searchsorted(self._cumulative, rng.random(self.chunk_words)),
+                           len(self.vocabulary) - 1)
+        topic_offset = self._topic_offsets[(index // self.chunks_per_source) % len(self._topic_offsets)]
+        from_topic = rng.random(self.chunk_words) < self.topic_share
+        word_ids = np.where(from_topic, (ranks + topic_offset) % len(self.vocabulary), ranks)
+        return word_ids, ranks
+
+    def chunk_text(self, index: int) -> str:
+        """
+        Generate the text of one chunk.
+
+        Args:
+            index: Number of the chunk
+
+        Returns:
+            The chunk's text; always the same for the same corpus and index
+        """
+        word_ids, _ = self._chunk_words(index)
+        return " ".join(self.vocabulary[i] for i in word_ids)
+
+    def document(self, index: int) -> Dict[str, Any]:
+        """
+        Generate one chunk with the metadata the vector stores expect.
+
+        Args:
+            index: Number of the chunk
+
+        Returns:
+            Document dictionary with 'content', 'metadata' and 'id'
+        """
+        source = f"synthetic_{index // self.chunks_per_source:06d}.pdf"
+        chunk = index % self.chunks_per_source
+        return {
+            "content": self.chunk_text(index),
+            "metadata": {"source": source, "chunk": chunk},
+            "id": f"{source}:{chunk}"
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self.num_chunks):
+            yield self.document(index)
+
+    def __len__(self) -> int:
+        return self.num_chunks
+
+    def queries(self, count: int, query_words: int = 8, seed: int = 1) -> List[Tuple[str, str]]:
+        """
+        Generate queries, each made of words taken from one chunk.
+
+        Words are drawn from the rarer half of the chunk's distinct words, so
+        that, like real questions, queries are about what sets a chunk apart
+        rather than about its most common words.
+
+        Args:
+            count: Number of queries
+            query_words: Number of words per query
+            seed: Seed of the random generator
+
+        Returns:
+            List of (query, id of the chunk it was taken from) tuples
+        """
+        rng = np.random.default_rng((self.seed, seed, count))
+        queries = []
+        for index in rng.integers(0, self.num_chunks, size=count):
+            word_ids, ranks = self._chunk_words(int(index))
+            distinct = np.unique(word_ids, return_index=True)[1]
+            rare = word_ids[distinct[np.argsort(ranks[distinct])]][len(distinct) // 2:]
+            picked = rng.choice(rare, size=min(query_words, len(rare)), replace=False)
+            query = " ".join(self.vocabulary[i] for i in picked)
+            queries.append((query, self.document(int(index))["id"]))
+        return queries
+
+def _pdf_string(text: str) -> str:
+    """Escape text for a PDF string literal."""
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: str, pages: List[List[str]]) -> None:
+    """
+    Write a minimal PDF file with lines of text.
+
+    Args:
+        path: Path of the PDF file
+        pages: Lines of text of each page
+    """
+    page_count = len(pages)
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    page_ids = [4 + 2 * i for i in range(page_count)]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>"
+         % (" ".join(f"{page_id} 0 R" for page_id in page_ids), page_count)).encode("latin-1"),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page_id, lines in zip(page_ids, pages):
+        text = "".join(f"({_pdf_string(line)}) Tj T*\n" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td\n{text}ET".encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(output)
+
+def write_pdf_corpus(directory: str, num_files: int, pages_per_file: int,
+                     lines_per_page: int = 50, words_per_line: int = 12, seed: int = 0) -> List[str]:
+    """
+    Write PDF files filled with pseudo-words.
+
+    Args:
+        directory: Directory to write the files to
+        num_files: Number of PDF files
+        pages_per_file: Number of pages per file
+        lines_per_page: Number of lines of text per page
+        words_per_line: Number of words per line
+        seed: Seed of the random generator
+
+    Returns:
+        Paths of the written files
+    """
+    os.makedirs(directory, exist_ok=True)
+    corpus = SyntheticCorpus(num_files * pages_per_file, chunk_words=lines_per_page * words_per_line, seed=seed)
+    paths = []
+    for file_number in range(num_files):
+        pages = []
+        for page_number in range(pages_per_file):
+            words = corpus.chunk_text(file_number * pages_per_file + page_number).split()
+            pages.append([" ".join(words[i:i + words_per_line]) for i in range(0, len(words), words_per_line)])
+        path = os.path.join(directory, f"synthetic_{file_number:04d}.pdf")
+        write_pdf(path, pages)
+        paths.append(path)
+    return paths
@@ -0,0 +1,93 @@
+"""
+Fake Embeddings Module for RAG Benchmarks.
+This module provides a deterministic local embedder that stands in for the
+Ollama embedding model, so that benchmarks do not depend on a running server.
+"""
+
+import zlib
+from typing import List, Dict
+
+import numpy as np
+
+class HashEmbeddings:
+    """
+    Class for embedding texts by feature hashing their words.
+
+    Every word is hashed to a dimension and a sign, and a text's vector is
+    the normalized sum of its words. Texts sharing words get similar
+    vectors, so searches return meaningful neighbours, and the same text
+    always gets the same vector in every process.
+    """
+
+    def __init__(self, dimension: int = 384):
+        """
+        Initialize the embedder.
+
+        Args:
+            dimension: Number of dimensions of the embeddings
+        """
+        self.dimension = dimension
+        # Stored with saved indexes; a different name would make them reload the Ollama model
+        self.model = f"hash-embeddings-{dimension}"
+        self._buckets: Dict[str, int] = {}
+
+    def _bucket(self, word: str) -> int:
+        """Get the signed bucket of a word: its dimension, plus the dimension count if it counts negatively."""
+        bucket = self._buckets.get(word)
+        if bucket is None:
+            digest = zlib.crc32(word.encode("utf-8"))
+            bucket = (digest >> 1) % self.dimension + (digest & 1) * self.dimension
+            self._buckets[word] = bucket
+        return bucket
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a list of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            NumPy array with one L2-normalized embedding row per text
+        """
+        rows = []
+        buckets = []
+        for row, text in enumerate(texts):
+            words = [self._bucket(word) for word in text.lower().split()]
+            buckets.extend(words)
+            rows.extend([row] * len(words))
+        rows = np.asarray(rows, dtype=np.int64)
+        buckets = np.asarray(buckets, dtype=np.int64)
+
+        # Count the words per signed bucket, then fold the negative half onto the positive one
+        counts = np.bincount(rows * 2 * self.dimension + buckets,
+                             minlength=len(texts) * 2 * self.dimension)
+        counts = counts.reshape(len(texts), 2, self.dimension).astype(np.float32)
+        vectors = counts[:, 0] - counts[:, 1]
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed search queries.
+
+        Args:
+            queries: Query strings
+
+        Returns:
+            NumPy array with one embedding row per query
+        """
+        return self.embed_documents(queries)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a single query.
+
+        Args:
+            text: Query string
+
+        Returns:
+            Embedding vector
+        """
+        return self.embed_documents([text])[0].tolist()
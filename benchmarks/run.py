@@ -0,0 +1,455 @@
+"""
+Benchmark Runner for RAG System.
+This script measures ingestion throughput, index build time, search latency,
+peak memory and load time of the FAISS index types and the ChromaDB store,
+and PDF extraction throughput, on synthetic corpora with a local embedder.
+
+Every case runs in a fresh process, so that its peak memory is its own.
+
+Run with:
+    python -m benchmarks.run --sizes 1k 10k 100k --output results.json
+    python -m benchmarks.run --sizes 1k 10k --baseline results.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import resource
+import multiprocessing
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.corpus import SyntheticCorpus, write_pdf_corpus
+from benchmarks.fake_embeddings import HashEmbeddings
+
+BACKENDS = ("flat", "ivf_flat", "ivf_pq", "hnsw", "chroma")
+
+# Metrics compared with a baseline, and whether higher values are better
+COMPARED_METRICS = {
+    "ingest_chunks_per_s": True,
+    "build_s": False,
+    "search_p50_ms": False,
+    "search_p95_ms": False,
+    "search_p99_ms": False,
+    "load_s": False,
+    "peak_rss_mb": False,
+    "recall": True,
+    "pages_per_s": True,
+}
+
+_SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+def parse_size(value: str) -> int:
+    """
+    Parse a corpus size such as 5000, 10k or 1m.
+
+    Args:
+        value: Size, optionally with a k or m suffix
+
+    Returns:
+        Number of chunks
+    """
+    value = value.strip().lower()
+    multiplier = _SIZE_SUFFIXES.get(value[-1:], 1)
+    if multiplier > 1:
+        value = value[:-1]
+    try:
+        return int(float(value) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size: {value}")
+
+def peak_rss_mb() -> float:
+    """Get the peak resident memory of this process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def latency_percentiles(latencies: List[float]) -> Dict[str, float]:
+    """
+    Summarize search latencies.
+
+    Args:
+        latencies: Latencies in seconds
+
+    Returns:
+        Dictionary with the p50, p95 and p99 latencies in milliseconds
+    """
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {"search_p50_ms": round(p50, 3), "search_p95_ms": round(p95, 3), "search_p99_ms": round(p99, 3)}
+
+def _make_store(backend: str, directory: str, embeddings: HashEmbeddings, size: int,
+                batch_size: int, mmap: bool) -> Any:
+    """Create an empty store of a backend, embedding with the local embedder."""
+    if backend == "chroma":
+        from src.chroma_store import ChromaStore
+        return ChromaStore(
+            embedding_model_name=embeddings.model,
+            collection_name="benchmark",
+            persist_directory=directory,
+            embedding_cache_path=None,
+            embeddings=embeddings,
+            embedding_batch_size=batch_size
+        )
+    from src.vector_store import VectorStore, FaissIndexType
+    return VectorStore(
+        embedding_model_name=embeddings.model,
+        embedding_cache_path=None,
+        embeddings=embeddings,
+        embedding_batch_size=batch_size,
+        index_type=FaissIndexType(backend),
+        expected_size=size,
+        mmap=mmap
+    )
+
+def _timed(function: Any, timings: List[float]) -> Any:
+    """Wrap a function so that the time spent in each call is appended to timings."""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings.append(time.perf_counter() - start)
+    return wrapper
+
+def exact_neighbours(corpus: SyntheticCorpus, embeddings: HashEmbeddings, queries: List[str],
+                     k: int, batch_size: int = 4096) -> List[set]:
+    """
+    Find the true nearest chunks of queries by brute force.
+
+    The corpus is embedded again batch by batch, so this works for corpora
+    whose vectors do not fit in memory.
+
+    Args:
+        corpus: Corpus the store was built from
+        embeddings: Embedder the store was built with
+        queries: Query strings
+        k: Number of neighbours per query
+        batch_size: Number of chunks embedded at a time
+
+    Returns:
+        One set of chunk ids per query
+    """
+    query_vectors = embeddings.embed_queries(queries)
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(corpus), batch_size):
+        indices = range(start, min(start + batch_size, len(corpus)))
+        vectors = embeddings.embed_documents([corpus.chunk_text(i) for i in indices])
+        # Vectors are normalized, so the inner product ranks like the L2 distance
+        scores = np.hstack([best_scores, query_vectors @ vectors.T])
+        ids = np.hstack([best_ids, np.broadcast_to(np.asarray(indices), (len(queries), len(indices)))])
+        keep = np.argsort(-scores, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_ids = np.take_along_axis(ids, keep, axis=1)
+    return [{corpus.document(int(i))["id"] for i in row} for row in best_ids]
+
+def _search_all(store: Any, queries: List[str], k: int) -> Tuple[List[float], List[set]]:
+    """Run the queries one by one, returning their latencies and the ids of the chunks found."""
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        results = store.search(query, k)
+        latencies.append(time.perf_counter() - start)
+        found.append({f"{doc['metadata']['source']}:{doc['metadata']['chunk']}" for doc in results})
+    return latencies, found
+
+def bench_store(backend: str, size: int, directory: str, num_queries: int = 200, k: int = 5,
+                dimension: int = 384, chunk_words: int = 150, batch_size: int = 64,
+                mmap: bool = False, recall: bool = True, seed: int = 0) -> Dict[str, Any]:
+    """
+    Benchmark one vector store backend on one corpus size.
+
+    Args:
+        backend: FAISS index type ("flat", "ivf_flat", "ivf_pq", "hnsw") or "chroma"
+        size: Number of chunks in the corpus
+        directory: Empty directory the store is saved to
+        num_queries: Number of timed searches
+        k: Number of results per search
+        dimension: Dimension of the embeddings
+        chunk_words: Number of words per chunk
+        batch_size: Number of chunks embedded per batch
+        mmap: Whether the FAISS index is memory-mapped when loaded
+        recall: Whether to compute the recall of the searches against an
+            exact brute-force search, which embeds the corpus a second time
+        seed: Seed of the corpus
+
+    Returns:
+        Dictionary of measurements. Ingestion covers embedding and adding to
+        the store; the build time only the part spent adding to the index,
+        including training. The load time covers opening the saved store and
+        answering the first search.
+    """
+    corpus = SyntheticCorpus(size, chunk_words=chunk_words, seed=seed)
+    queries = [query for query, _ in corpus.queries(num_queries)]
+    embeddings = HashEmbeddings(dimension)
+
+    store = _make_store(backend, directory, embeddings, size, batch_size, mmap)
+    build_timings: List[float] = []
+    store.add_embedded = _timed(store.add_embedded, build_timings)
+    if hasattr(store, "finalize"):
+        store.finalize = _timed(store.finalize, build_timings)
+
+    start = time.perf_counter()
+    added = store.add_document_stream(iter(corpus))
+    ingest_s = time.perf_counter() - start
+
+    save_s = None
+    if backend != "chroma":
+        start = time.perf_counter()
+        store.save(directory)
+        save_s = time.perf_counter() - start
+
+    # Warm up, then time searches one at a time like the web app does
+    store.search(queries[0], k)
+    latencies, found = _search_all(store, queries, k)
+    del store
+    if backend == "chroma":
+        # Otherwise the store is reopened through the client cached for its directory
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+
+    start = time.perf_counter()
+    store = _make_store(backend, directory, embeddings, size, batch_size, mmap)
+    if backend != "chroma":
+        store.load(directory)
+    store.search(queries[0], k)
+    load_s = time.perf_counter() - start
+
+    result = {
+        "case": "store",
+        "backend": backend,
+        "size": size,
+        "chunks": added,
+        "ingest_s": round(ingest_s, 3),
+        "ingest_chunks_per_s": round(added / ingest_s, 1),
+        "build_s": round(sum(build_timings), 3),
+        "save_s": None if save_s is None else round(save_s, 3),
+        "load_s": round(load_s, 3),
+    }
+    result.update(latency_percentiles(latencies))
+    # Taken before the exact search, which is not part of the store's footprint
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    if recall:
+        del store
+        exact = exact_neighbours(corpus, embeddings, queries, k)
+        result["recall"] = round(float(np.mean([len(f & e) / len(e) for f, e in zip(found, exact)])), 3)
+    return result
+
+def bench_pdf(num_files: int, pages_per_file: int, directory: str,
+              max_workers: Optional[int] = None, seed: int = 0) -> Dict[str, Any]:
+    """
+    Benchmark PDF text extraction and chunking.
+
+    Args:
+        num_files: Number of generated PDF files
+        pages_per_file: Number of pages per file
+        directory: Empty directory the files are written to
+        max_workers: Number of extraction processes; None uses all cores
+        seed: Seed of the generated text
+
+    Returns:
+        Dictionary of measurements; writing the files is not timed
+    """
+    from src.pdf_processor import PDFProcessor
+
+    paths = write_pdf_corpus(directory, num_files, pages_per_file, seed=seed)
+    megabytes = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+    processor = PDFProcessor(max_workers=max_workers)
+
+    start = time.perf_counter()
+    chunks = sum(len(documents) for _, documents in processor.iter_files(paths))
+    seconds = time.perf_counter() - start
+
+    pages = num_files * pages_per_file
+    return {
+        "case": "pdf",
+        "backend": "pdf",
+        "size": pages,
+        "files": num_files,
+        "chunks": chunks,
+        "extract_s": round(seconds, 3),
+        "pages_per_s": round(pages / seconds, 1),
+        "chunks_per_s": round(chunks / seconds, 1),
+        "mb_per_s": round(megabytes / seconds, 2),
+    }
+
+def _run_case(connection: Any, function_name: str, kwargs: Dict[str, Any]) -> None:
+    """Run one benchmark in a child process and send back its result."""
+    try:
+        baseline = peak_rss_mb()
+        result = globals()[function_name](**kwargs)
+        result["baseline_rss_mb"] = round(baseline, 1)
+        result.setdefault("peak_rss_mb", round(peak_rss_mb(), 1))
+        connection.send(result)
+    except Exception as e:
+        connection.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        connection.close()
+
+def run_isolated(function_name: str, **kwargs) -> Dict[str, Any]:
+    """
+    Run a benchmark function of this module in a fresh process.
+
+    Args:
+        function_name: Name of the function, e.g. "bench_store"
+        **kwargs: Arguments of the function
+
+    Returns:
+        The function's result, with the process's peak memory, or a
+        dictionary with an 'error' if it failed
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_case, args=(sender, function_name, kwargs))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"error": "benchmark process died"}
+    process.join()
+    if process.exitcode:
+        result.setdefault("error", f"benchmark process exited with code {process.exitcode}")
+    return result
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+            tolerance: float) -> List[str]:
+    """
+    Compare results with a baseline run.
+
+    Args:
+        results: Results of this run
+        baseline: Results of the baseline run
+        tolerance: Allowed relative change for the worse, e.g. 0.25 for 25%
+
+    Returns:
+        Descriptions of the metrics that got worse by more than the tolerance
+    """
+    previous = {(result["backend"], result["size"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result["backend"], result["size"]))
+        if old is None or "error" in result or "error" in old:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            new_value, old_value = result.get(metric), old.get(metric)
+            if not new_value or not old_value:
+                continue
+            change = (old_value - new_value) / old_value if higher_is_better else (new_value - old_value) / old_value
+            if change > tolerance:
+                regressions.append(
+                    f"{result['backend']} @ {result['size']}: {metric} {old_value} -> {new_value} "
+                    f"({change:.0%} worse)"
+                )
+    return regressions
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    """Print the store results, then the PDF results, as aligned tables."""
+    columns = {
+        "store": ["backend", "size", "ingest_chunks_per_s", "build_s", "search_p50_ms", "search_p95_ms",
+                  "search_p99_ms", "recall", "load_s", "peak_rss_mb"],
+        "pdf": ["size", "files", "chunks", "extract_s", "pages_per_s", "chunks_per_s", "mb_per_s", "peak_rss_mb"],
+    }
+    for case, names in columns.items():
+        rows = [result for result in results if result.get("case") == case]
+        if not rows:
+            continue
+        cells = [[str(row.get(name, "")) for name in names] for row in rows]
+        widths = [max(len(name), *(len(row[i]) for row in cells)) for i, name in enumerate(names)]
+        print()
+        print("  ".join(name.rjust(width) for name, width in zip(names, widths)))
+        for row in cells:
+            print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the RAG system's vector stores and PDF processing")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[1_000, 10_000],
+                        help="Corpus sizes in chunks, e.g. 1k 10k 100k 1m")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS),
+                        help="FAISS index types and/or chroma")
+    parser.add_argument("--queries", type=int, default=200, help="Number of timed searches per case")
+    parser.add_argument("--k", type=int, default=5, help="Number of results per search")
+    parser.add_argument("--dimension", type=int, default=384, help="Dimension of the fake embeddings")
+    parser.add_argument("--chunk-words", type=int, default=150, help="Number of words per chunk")
+    parser.add_argument("--batch-size", type=int, default=64, help="Number of chunks embedded per batch")
+    parser.add_argument("--mmap", action="store_true", help="Memory-map FAISS indexes when loading them")
+    parser.add_argument("--no-recall", dest="recall", action="store_false",
+                        help="Skip the exact search the recall is measured against")
+    parser.add_argument("--pdf-files", type=int, default=20, help="Number of generated PDFs; 0 skips the PDF benchmark")
+    parser.add_argument("--pdf-pages", type=int, default=20, help="Number of pages per generated PDF")
+    parser.add_argument("--pdf-workers", type=int, default=None, help="Number of PDF extraction processes")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated corpora")
+    parser.add_argument("--workdir", help="Directory for the generated files; defaults to a temporary directory")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Relative change for the worse reported as a regression")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag-benchmark-")
+    results = []
+    try:
+        if args.pdf_files > 0:
+            print(f"Benchmarking PDF processing: {args.pdf_files} files of {args.pdf_pages} pages")
+            results.append(run_isolated(
+                "bench_pdf", num_files=args.pdf_files, pages_per_file=args.pdf_pages,
+                directory=os.path.join(workdir, "pdfs"), max_workers=args.pdf_workers, seed=args.seed
+            ))
+
+        for size in args.sizes:
+            for backend in args.backends:
+                print(f"Benchmarking {backend} with {size} chunks")
+                directory = os.path.join(workdir, f"{backend}_{size}")
+                shutil.rmtree(directory, ignore_errors=True)
+                result = run_isolated(
+                    "bench_store", backend=backend, size=size, directory=directory,
+                    num_queries=args.queries, k=args.k, dimension=args.dimension,
+                    chunk_words=args.chunk_words, batch_size=args.batch_size, mmap=args.mmap,
+                    recall=args.recall, seed=args.seed
+                )
+                result.setdefault("case", "store")
+                result.setdefault("backend", backend)
+                result.setdefault("size", size)
+                results.append(result)
+                shutil.rmtree(directory, ignore_errors=True)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+    for result in results:
+        if "error" in result:
+            print(f"Error in {result.get('backend')} @ {result.get('size')}: {result['error']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "results": results,
+            }, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) compared with {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions compared with {args.baseline}")
+
+    return 1 if any("error" in result for result in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Answer Cache Module for RAG System.
+This module keeps generated answers for a while, so that repeated and
+near-duplicate questions are answered without running the LLM again.
+"""
+
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for exact-match lookups.
+
+    Args:
+        question: User question
+
+    Returns:
+        Lower-cased question with collapsed whitespace and without trailing punctuation
+    """
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+class AnswerCache:
+    """Class for caching answers by normalized question and query embedding similarity."""
+
+    def __init__(self, ttl_seconds: float = 3600.0, max_entries: int = 1000,
+                 similarity_threshold: float = 0.95):
+        """
+        Initialize the answer cache.
+
+        Args:
+            ttl_seconds: Number of seconds an answer stays valid
+            max_entries: Maximum number of answers to keep; the least recently
+                used are evicted first
+            similarity_threshold: Minimum cosine similarity between query
+                embeddings for a cached answer to be reused for a different
+                wording of the question
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _scope_key(scope: Dict[str, Any]) -> Tuple:
+        """Turn a scope dictionary into a hashable key."""
+        return tuple(sorted(scope.items()))
+
+    def get(self, question: str, query_embedding: Optional[Any] = None, **scope: Any) -> Optional[List[str]]:
+        """
+        Look up the answer to a question.
+
+        The normalized question is matched exactly first; if that fails and a
+        query embedding is given, the most similar cached question in the
+        same scope is used if it is similar enough.
+
+        Args:
+            question: User question
+            query_embedding: Optional embedding of the question
+            **scope: Values the answer must have been stored with, e.g. the
+                model name, vector store type and index version
+
+        Returns:
+            The chunks of the cached answer, or None on a miss
+        """
+        scope_key = self._scope_key(scope)
+        key = (scope_key, normalize_question(question))
+        now = time.monotonic()
+
+        with self._lock:
+            self._purge(now)
+            entry = self._entries.get(key)
+
+            if entry is None and query_embedding is not None:
+                vector = self._unit_vector(query_embedding)
+                best_similarity = self.similarity_threshold
+                for candidate_key, candidate in self._entries.items():
+                    if candidate_key[0] != scope_key or candidate["vector"] is None:
+                        continue
+                    if candidate["vector"].shape != vector.shape:
+                        continue
+                    similarity = float(np.dot(candidate["vector"], vector))
+                    if similarity >= best_similarity:
+                        best_similarity = similarity
+                        key, entry = candidate_key, candidate
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry["chunks"])
+
+    def put(self, question: str, chunks: List[str], query_embedding: Optional[Any] = None, **scope: Any) -> None:
+        """
+        Store the answer to a question.
+
+        Args:
+            question: User question
+            chunks: Chunks of the answer, in the order they were generated
+            query_embedding: Optional embedding of the question, used for
+                similarity lookups
+            **scope: Values that must match when the answer is reused
+        """
+        key = (self._scope_key(scope), normalize_question(question))
+        vector = self._unit_vector(query_embedding) if query_embedding is not None else None
+        now = time.monotonic()
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = {
+                "chunks": list(chunks),
+                "vector": vector,
+                "expires_at": now + self.ttl_seconds
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached answers."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with the number of entries, hits and misses
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _unit_vector(embedding: Any) -> np.ndarray:
+        """Convert an embedding to a float32 vector of unit length."""
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _purge(self, now: float) -> None:
+        """Drop expired entries. Caller holds the lock."""
+        expired = [key for key, entry in self._entries.items() if entry["expires_at"] < now]
+        for key in expired:
+            del self._entries[key]
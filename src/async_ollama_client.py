@@ -0,0 +1,181 @@
+"""
+Async Ollama Client Module for RAG System.
+This module streams answers from Ollama with asyncio, so that an ASGI server
+can serve many concurrent streams without a thread per client.
+"""
+
+import json
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator, Union
+
+import httpx
+
+from src.ollama_client import DEFAULT_KEEP_ALIVE, build_rag_messages, default_context_builder
+from src.context_builder import ContextBuilder
+from src.metrics import GenerationTimer
+from src.ollama_transport import DEFAULT_API_BASE
+
+class AsyncOllamaClient:
+    """Class for streaming Ollama generations over a pooled asyncio HTTP client."""
+
+    def __init__(self, model_name: str = "llama2", api_base: str = DEFAULT_API_BASE,
+                 pool_size: int = 64, connect_timeout: float = 5.0, stream_timeout: float = 10.0,
+                 first_token_timeout: Optional[float] = 300.0, context_builder: Optional[ContextBuilder] = None,
+                 keep_alive: Optional[Union[str, float]] = DEFAULT_KEEP_ALIVE):
+        """
+        Initialize the async Ollama client.
+
+        The HTTP client is bound to the event loop it is first used in; call
+        aclose() when the loop shuts down.
+
+        Args:
+            model_name: Name of the Ollama model used when none is given per call
+            api_base: Base URL for the Ollama API
+            pool_size: Maximum number of connections to Ollama; further
+                streams wait for a free connection
+            connect_timeout: Number of seconds to wait for a connection
+            stream_timeout: Maximum number of seconds to wait for the next
+                chunk of a streamed answer once the first chunk has arrived
+            first_token_timeout: Maximum number of seconds to wait for the
+                first chunk, which includes loading the model and evaluating
+                the prompt; None waits forever
+            context_builder: Builder fitting retrieved documents into each
+                model's context window; defaults to the shared default builder
+            keep_alive: How long Ollama keeps a model loaded after each request
+        """
+        self.model_name = model_name
+        self.api_base = api_base.rstrip("/")
+        self.pool_size = pool_size
+        self.stream_timeout = stream_timeout
+        # httpx applies the read timeout to every read; the shorter timeout
+        # between chunks is enforced by _stream once the first chunk arrived
+        self.timeout = httpx.Timeout(connect=connect_timeout, read=first_token_timeout,
+                                     write=connect_timeout, pool=None)
+        self.context_builder = context_builder
+        self.keep_alive = keep_alive
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_base,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _payload(self, model: str, **fields: Any) -> Dict[str, Any]:
+        """Build the body of a generation request, with the same keep-alive and options as OllamaClient."""
+        payload = {"model": model, **fields}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        context_builder = self.context_builder or default_context_builder
+        num_ctx = context_builder.num_ctx_for(model)
+        if num_ctx is not None:
+            payload["options"] = {"num_ctx": num_ctx}
+        return payload
+
+    async def _stream(self, path: str, data: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Stream the text chunks of a generation request.
+
+        Errors are yielded as a chunk starting with "Error: ", like
+        OllamaClient.stream_answer_with_rag does.
+        """
+        timer = GenerationTimer(data["model"])
+        try:
+            async with self.client.stream("POST", path, json=data) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    error_msg = f"Ollama API error: {response.status_code} - {body}"
+                    print(error_msg)
+                    yield f"Error: {error_msg}"
+                    return
+
+                lines = response.aiter_lines()
+                first_chunk = True
+                while True:
+                    try:
+                        if first_chunk:
+                            line = await lines.__anext__()
+                            first_chunk = False
+                        else:
+                            line = await asyncio.wait_for(lines.__anext__(), self.stream_timeout)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise httpx.ReadTimeout(f"No chunk received for {self.stream_timeout}s")
+                    if not line:
+                        continue
+                    try:
+                        chunk = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        print(f"JSON decode error: {e}, line: {line}")
+                        continue
+                    timer.chunk(chunk)
+                    if "response" in chunk:
+                        yield chunk["response"]
+                    elif "message" in chunk:
+                        yield chunk["message"].get("content", "")
+        except httpx.HTTPError as e:
+            error_msg = f"Request to Ollama API failed: {str(e)}"
+            print(error_msg)
+            yield f"Error: {error_msg}"
+        finally:
+            timer.finish()
+
+    async def stream_generate(self, prompt: str, model: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream a generation for a prompt.
+
+        Args:
+            prompt: Prompt text
+            model: Ollama model to use; defaults to model_name
+
+        Yields:
+            Chunks of the generated text
+        """
+        data = self._payload(model or self.model_name, prompt=prompt, stream=True)
+        async for chunk in self._stream("/api/generate", data):
+            yield chunk
+
+    async def stream_chat(self, messages: List[Dict[str, str]], model: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response.
+
+        Args:
+            messages: Chat messages, e.g. from build_rag_messages
+            model: Ollama model to use; defaults to model_name
+
+        Yields:
+            Chunks of the generated text
+        """
+        data = self._payload(model or self.model_name, messages=messages, stream=True)
+        async for chunk in self._stream("/api/chat", data):
+            yield chunk
+
+    async def stream_answer_with_rag(self, question: str, context_docs: List[Dict[str, Any]],
+                                     model: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Stream an answer using RAG.
+
+        Args:
+            question: User question
+            context_docs: List of context documents from vector search
+            model: Ollama model to use; defaults to model_name
+
+        Yields:
+            Chunks of the generated answer
+        """
+        model = model or self.model_name
+        messages = build_rag_messages(question, context_docs, model, self.context_builder)
+        async for chunk in self.stream_chat(messages, model):
+            yield chunk
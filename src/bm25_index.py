@@ -0,0 +1,406 @@
+"""
+BM25 Index Module for RAG System.
+This module provides a lexical BM25 index over the indexed chunks, stored as
+a compact inverted index with array-backed postings, and the fusion of its
+results with those of the vector stores.
+"""
+
+import os
+import re
+import json
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+
+import numpy as np
+
+from src.document_store import DocumentStore
+
+FORMAT_VERSION = 1
+
+# One posting per (term, document): the document position and the term frequency
+POSTING_DTYPE = np.dtype([
+    ("doc", "<i4"),
+    ("tf", "<u2"),
+])
+
+# Words and compounds like "gpt-3.5", "bert_base" or "text-embedding-ada-002"
+_TOKEN_RE = re.compile(r"[^\W_]+(?:[.\-_/][^\W_]+)*")
+_SEPARATOR_RE = re.compile(r"[.\-_/]")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the
+their there these this to was were which with
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into BM25 terms.
+
+    Compounds are kept whole, so exact model names and version numbers
+    match, and their parts are added too, so "gpt-3.5" is also found by "gpt".
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of lowercase terms, stopwords removed
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token not in STOPWORDS:
+            terms.append(token)
+        if _SEPARATOR_RE.search(token):
+            terms.extend(part for part in _SEPARATOR_RE.split(token) if part and part not in STOPWORDS)
+    return terms
+
+class BM25Index:
+    """Class for lexical search over chunks with a BM25-scored inverted index."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize an empty BM25 index.
+
+        Postings are kept in CSR form: the postings of term t are
+        postings[offsets[t]:offsets[t + 1]], sorted by document position.
+
+        Args:
+            k1: Term frequency saturation
+            b: Strength of the document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        """Empty the index."""
+        self.documents = DocumentStore()
+        self._terms: List[str] = []
+        self._term_ids: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=POSTING_DTYPE)
+        self._lengths = np.zeros(0, dtype=np.int32)
+        # Postings of documents added since the last merge, as (term id, position, tf) arrays
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._pending_lengths: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, documents: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add documents to the index.
+
+        Args:
+            documents: Documents with 'content' and 'metadata'
+        """
+        documents = list(documents)
+        if not documents:
+            return
+
+        counts = [Counter(tokenize(document["content"])) for document in documents]
+        with self._lock:
+            position = len(self.documents)
+            for document_counts in counts:
+                term_ids = np.fromiter((self._term_id(term) for term in document_counts),
+                                       dtype=np.int64, count=len(document_counts))
+                tfs = np.fromiter(document_counts.values(), dtype=np.int64, count=len(document_counts))
+                self._pending.append((term_ids, np.full(len(document_counts), position, dtype=np.int64), tfs))
+                self._pending_lengths.append(sum(document_counts.values()))
+                position += 1
+
+            self.documents.append(documents)
+
+    def _term_id(self, term: str) -> int:
+        """Get the id of a term, adding it to the vocabulary if needed."""
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self._terms)
+            self._terms.append(term)
+            self._term_ids[term] = term_id
+        return term_id
+
+    def _posting_terms(self) -> np.ndarray:
+        """Get the term id of every merged posting."""
+        return np.repeat(np.arange(len(self._offsets) - 1, dtype=np.int64), np.diff(self._offsets))
+
+    def _set_postings(self, terms: np.ndarray, docs: np.ndarray, tfs: np.ndarray) -> None:
+        """Store postings given as parallel arrays, ordering them by term and document."""
+        order = np.lexsort((docs, terms))
+        postings = np.zeros(len(order), dtype=POSTING_DTYPE)
+        postings["doc"] = docs[order]
+        postings["tf"] = np.minimum(tfs[order], np.iinfo(np.uint16).max)
+        counts = np.bincount(terms, minlength=len(self._terms))
+        self._offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self._postings = postings
+
+    def _merge_pending(self) -> None:
+        """Merge the postings of recently added documents into the CSR arrays."""
+        if not self._pending:
+            return
+
+        terms = np.concatenate([self._posting_terms()] + [p[0] for p in self._pending])
+        docs = np.concatenate([self._postings["doc"].astype(np.int64)] + [p[1] for p in self._pending])
+        tfs = np.concatenate([self._postings["tf"].astype(np.int64)] + [p[2] for p in self._pending])
+        self._set_postings(terms, docs, tfs)
+        self._lengths = np.concatenate((self._lengths, np.asarray(self._pending_lengths, dtype=np.int32)))
+        self._pending, self._pending_lengths = [], []
+
+    def remove_source(self, source: str) -> int:
+        """
+        Remove all documents that were extracted from a given source file.
+
+        Args:
+            source: Source filename as stored in the document metadata
+
+        Returns:
+            Number of documents removed
+        """
+        return self.remove_sources([source])
+
+    def remove_sources(self, sources: Iterable[str]) -> int:
+        """
+        Remove all documents that were extracted from any of the given source files.
+
+        Later documents shift down, like in the document store.
+
+        Args:
+            sources: Source filenames as stored in the document metadata
+
+        Returns:
+            Number of documents removed
+        """
+        with self._lock:
+            positions = sorted({
+                position for source in set(sources) for position in self.documents.positions_for_source(source)
+            })
+            if not positions:
+                return 0
+
+            self._merge_pending()
+            keep = np.ones(len(self._lengths), dtype=bool)
+            keep[positions] = False
+            new_positions = np.cumsum(keep) - 1
+
+            docs = self._postings["doc"]
+            kept = keep[docs]
+            self._set_postings(
+                self._posting_terms()[kept],
+                new_positions[docs[kept]],
+                self._postings["tf"][kept].astype(np.int64)
+            )
+            self._lengths = self._lengths[keep]
+            self.documents.remove(positions)
+            return len(positions)
+
+    def copy(self) -> "BM25Index":
+        """
+        Copy the index, so the copy can be modified while the original is searched.
+
+        Returns:
+            The copy
+        """
+        with self._lock:
+            self._merge_pending()
+            index = BM25Index(self.k1, self.b)
+            # The postings arrays are replaced, never modified in place, so they can be shared
+            index.documents = self.documents.copy()
+            index._terms = list(self._terms)
+            index._term_ids = dict(self._term_ids)
+            index._offsets = self._offsets
+            index._postings = self._postings
+            index._lengths = self._lengths
+            return index
+
+    def clear(self) -> None:
+        """Remove all documents from the index."""
+        with self._lock:
+            self._reset()
+
+    def iter_documents(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the indexed documents in position order.
+
+        Yields:
+            Document dictionaries with 'content' and 'metadata'
+        """
+        return self.documents.iter_documents()
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Search the index.
+
+        Args:
+            query: Query text
+            k: Number of results to return
+
+        Returns:
+            List of document dictionaries with BM25 scores, best first
+        """
+        terms = tokenize(query)
+        with self._lock:
+            # Concurrent updates replace these arrays instead of modifying them
+            self._merge_pending()
+            offsets, postings_array, lengths = self._offsets, self._postings, self._lengths
+            documents = self.documents
+            term_ids = {self._term_ids[term] for term in terms if term in self._term_ids}
+
+        num_docs = len(lengths)
+        if num_docs == 0 or not term_ids or k <= 0:
+            return []
+
+        average_length = max(float(lengths.mean()), 1.0)
+        length_norm = self.k1 * (1 - self.b + self.b * lengths / average_length)
+        scores = np.zeros(num_docs, dtype=np.float32)
+        for term_id in term_ids:
+            postings = postings_array[offsets[term_id]:offsets[term_id + 1]]
+            if len(postings) == 0:
+                continue
+            idf = np.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            docs = postings["doc"]
+            tfs = postings["tf"].astype(np.float32)
+            # Each document appears once per term, so plain fancy-index addition is safe
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + length_norm[docs])
+
+        matches = np.flatnonzero(scores)
+        if len(matches) > k:
+            matches = matches[np.argpartition(-scores[matches], k - 1)[:k]]
+        matches = matches[np.argsort(-scores[matches], kind="stable")]
+
+        results = []
+        for position in matches:
+            document = documents.get(int(position))
+            document["score"] = float(scores[position])
+            results.append(document)
+        return results
+
+    @staticmethod
+    def _paths(directory_path: str, name: str) -> Dict[str, str]:
+        """Get the paths of the files making up a saved index, besides the document store."""
+        base = os.path.join(directory_path, name)
+        return {
+            "terms": f"{base}.terms.json",
+            "offsets": f"{base}.offsets.npy",
+            "postings": f"{base}.postings.npy",
+            "lengths": f"{base}.lengths.npy"
+        }
+
+    @classmethod
+    def exists(cls, directory_path: str, name: str) -> bool:
+        """
+        Check whether a saved index exists.
+
+        Args:
+            directory_path: Directory of the saved index
+            name: Base name of the saved files
+
+        Returns:
+            True if all files of the index are present
+        """
+        return DocumentStore.exists(directory_path, name) and \
+            all(os.path.exists(path) for path in cls._paths(directory_path, name).values())
+
+    def save(self, directory_path: str, name: str) -> None:
+        """
+        Save the index.
+
+        Files are written under temporary names and renamed into place, so
+        processes that memory-map the previous files keep a valid mapping.
+
+        Args:
+            directory_path: Directory to save the index in
+            name: Base name for the saved files
+        """
+        with self._lock:
+            self._merge_pending()
+            self.documents.save(directory_path, name)
+            paths = self._paths(directory_path, name)
+
+            with open(f"{paths['terms']}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"version": FORMAT_VERSION, "count": len(self._lengths), "terms": self._terms}, f)
+            np.save(f"{paths['offsets']}.tmp.npy", self._offsets)
+            np.save(f"{paths['postings']}.tmp.npy", self._postings)
+            np.save(f"{paths['lengths']}.tmp.npy", self._lengths)
+
+            os.replace(f"{paths['terms']}.tmp", paths["terms"])
+            for key in ("offsets", "postings", "lengths"):
+                os.replace(f"{paths[key]}.tmp.npy", paths[key])
+
+            self.documents = DocumentStore.load(directory_path, name)
+
+    @classmethod
+    def load(cls, directory_path: str, name: str, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """
+        Open a saved index. Postings and documents are memory-mapped, not read.
+
+        Args:
+            directory_path: Directory of the saved index
+            name: Base name of the saved files
+            k1: Term frequency saturation
+            b: Strength of the document length normalization
+
+        Returns:
+            The loaded BM25 index
+        """
+        paths = cls._paths(directory_path, name)
+        with open(paths["terms"], "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index version {header.get('version')} in {paths['terms']}")
+
+        index = cls(k1=k1, b=b)
+        index._terms = header["terms"]
+        index._term_ids = {term: i for i, term in enumerate(index._terms)}
+        index._offsets = np.load(paths["offsets"], mmap_mode="r")
+        index._postings = np.load(paths["postings"], mmap_mode="r")
+        index._lengths = np.load(paths["lengths"], mmap_mode="r")
+        index.documents = DocumentStore.load(directory_path, name)
+        if len(index._lengths) != header["count"] or len(index.documents) != header["count"]:
+            raise ValueError(f"BM25 index files in {directory_path} do not match")
+        return index
+
+def _document_key(document: Dict[str, Any]) -> Tuple[Any, Any]:
+    """Identify a chunk across result lists by its source file and chunk number."""
+    metadata = document.get("metadata") or {}
+    return metadata.get("source"), metadata.get("chunk", document.get("content"))
+
+def reciprocal_rank_fusion(results: Dict[str, List[Dict[str, Any]]], k: int = 60,
+                           limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Fuse ranked result lists with reciprocal rank fusion.
+
+    Each document scores the sum of 1 / (k + rank) over the lists it appears
+    in, so only ranks matter and scores of different retrievers need not be
+    comparable.
+
+    Args:
+        results: Ranked result lists by retriever name, e.g. {"dense": ..., "bm25": ...}
+        k: Rank offset; larger values flatten the difference between ranks
+        limit: Maximum number of results to return
+
+    Returns:
+        Fused list of document dictionaries, best first; 'rrf_score' holds
+        the fused score, '<name>_score' the score from each retriever, and
+        'score' keeps the score from the first retriever, e.g. the vector
+        distance, or None if that retriever did not return the document
+    """
+    fused: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    primary = next(iter(results), None)
+    for name, documents in results.items():
+        for rank, document in enumerate(documents):
+            key = _document_key(document)
+            entry = fused.get(key)
+            if entry is None:
+                entry = {field: value for field, value in document.items() if field != "score"}
+                entry["score"] = None
+                entry["rrf_score"] = 0.0
+                fused[key] = entry
+            entry["rrf_score"] += 1.0 / (k + rank + 1)
+            if "score" in document:
+                entry[f"{name}_score"] = document["score"]
+                if name == primary:
+                    entry["score"] = document["score"]
+
+    ranked = sorted(fused.values(), key=lambda document: document["rrf_score"], reverse=True)
+    return ranked[:limit] if limit is not None else ranked
@@ -5,8 +5,18 @@ This module handles vector embeddings and ChromaDB operations.
 
 import os
 import chromadb
-from typing import List, Dict, Any, Optional
-from langchain_community.embeddings import OllamaEmbeddings
+import numpy as np
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Set
+
+from src.embedding_cache import DEFAULT_CACHE_PATH, get_cached_embeddings
+from src.embedding_pipeline import EmbeddingPipeline, LEGACY_EMBEDDING_FORMAT, embedding_format
+from src.index_manifest import make_document_id
+from src.ollama_transport import DEFAULT_API_BASE
+from src.metrics import span
+
+def _backup_name(collection_name: str) -> str:
+    """Name the live collection is renamed to while replace_collection swaps in another one."""
+    return f"{collection_name}_previous"
 
 class ChromaStore:
     """Class for managing vector embeddings and ChromaDB."""
@@ -14,7 +24,13 @@ class ChromaStore:
     def __init__(self,
                  embedding_model_name: str = "nomic-embed-text",
                  collection_name: str = "pdf_documents",
-                 persist_directory: str = "data/chroma_db"):
+                 persist_directory: str = "data/chroma_db",
+                 embedding_cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 embeddings: Optional[Any] = None,
+                 embedding_batch_size: int = 64,
+                 embedding_workers: int = 4,
+                 embedding_max_in_flight: Optional[int] = None,
+                 api_base: str = DEFAULT_API_BASE):
         """
         Initialize the ChromaDB vector store.
 
@@ -22,11 +38,21 @@ class ChromaStore:
             embedding_model_name: Name of the Ollama embedding model to use
             collection_name: Name of the ChromaDB collection
             persist_directory: Directory to persist the ChromaDB
+            embedding_cache_path: Path of the shared embedding cache, or None to disable it
+            embeddings: Optional embeddings object to use instead of the Ollama model
+            embedding_batch_size: Number of chunks sent per embeddings request
+            embedding_workers: Number of embeddings requests run concurrently
+            embedding_max_in_flight: Maximum number of batches being embedded
+                ahead of the one being written to the collection
+            api_base: Base URL for the Ollama API computing the embeddings
         """
         self.embedding_model_name = embedding_model_name
         self.collection_name = collection_name
         self.persist_directory = persist_directory
-        self.embeddings = OllamaEmbeddings(model=embedding_model_name)
+        self.embeddings = embeddings or get_cached_embeddings(embedding_model_name, embedding_cache_path, api_base)
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_workers = embedding_workers
+        self.embedding_max_in_flight = embedding_max_in_flight
 
         # Create directory if it doesn't exist
         os.makedirs(persist_directory, exist_ok=True)
@@ -38,10 +64,46 @@ class ChromaStore:
         try:
             self.collection = self.client.get_collection(name=collection_name)
             print(f"Loaded existing collection '{collection_name}' with {self.collection.count()} documents")
+            version = embedding_format(self.embeddings)
+            if version is not None and self.collection.count() == 0 and self.embedding_format != version:
+                # Nothing to rebuild; record the format of the vectors that will be added
+                self.collection.modify(metadata={"embedding_format": version})
         except Exception as e:
-            print(f"Collection not found, creating new one: {str(e)}")
-            self.collection = self.client.create_collection(name=collection_name)
-            print(f"Created new collection '{collection_name}'")
+            if self._restore_backup():
+                self.collection = self.client.get_collection(name=collection_name)
+                print(f"Restored collection '{collection_name}' with {self.collection.count()} documents")
+            else:
+                print(f"Collection not found, creating new one: {str(e)}")
+                self.collection = self._create_collection()
+                print(f"Created new collection '{collection_name}'")
+
+    def _create_collection(self) -> Any:
+        """Create the collection, recording the embedding format of the vectors it will hold."""
+        version = embedding_format(self.embeddings)
+        metadata = {"embedding_format": version} if version is not None else None
+        return self.client.create_collection(name=self.collection_name, metadata=metadata)
+
+    @property
+    def embedding_format(self) -> Optional[int]:
+        """Embedding format version of the vectors in the collection."""
+        metadata = self.collection.metadata or {}
+        if "embedding_format" in metadata:
+            return metadata["embedding_format"]
+        # Collections created before the version was recorded hold vectors of the legacy format
+        return LEGACY_EMBEDDING_FORMAT if embedding_format(self.embeddings) is not None else None
+
+    def is_outdated(self) -> bool:
+        """
+        Check whether the collection holds vectors of another embedding format than the embedder produces.
+
+        Such vectors cannot be compared with new query embeddings, so the
+        documents must be embedded again.
+
+        Returns:
+            True if the collection must be rebuilt
+        """
+        current = embedding_format(self.embeddings)
+        return current is not None and self.embedding_format != current and self.count() > 0
 
     def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
@@ -55,35 +117,91 @@ class ChromaStore:
         """
         return self.embeddings.embed_documents(texts)
 
-    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed search queries, using the in-process query embedding cache when available.
+
+        Args:
+            queries: Query strings
+
+        Returns:
+            NumPy array with one embedding row per query
+        """
+        with span("query_embedding", "chroma"):
+            if hasattr(self.embeddings, "embed_queries"):
+                return np.asarray(self.embeddings.embed_queries(queries), dtype=np.float32)
+            return np.asarray(self.embeddings.embed_documents(queries), dtype=np.float32)
+
+    def _embedding_pipeline(self) -> EmbeddingPipeline:
+        """Create a batched embedding pipeline for the current embeddings object."""
+        return EmbeddingPipeline(
+            self.embeddings,
+            batch_size=self.embedding_batch_size,
+            max_workers=self.embedding_workers,
+            max_in_flight=self.embedding_max_in_flight
+        )
+
+    def add_documents(self, documents: List[Dict[str, Any]], ids: Optional[List[str]] = None) -> None:
         """
-        Add documents to the ChromaDB collection.
+        Add documents to the ChromaDB collection, replacing documents with the same ids.
 
         Args:
             documents: List of document dictionaries with 'content' and 'metadata'
+            ids: Optional list of ids for the documents, one per document;
+                defaults to each document's 'id', or an id derived from its
+                source, chunk number and content
         """
         if not documents:
             print("No documents to add")
             return
 
-        # Extract document content, metadata, and create IDs
-        contents = [doc["content"] for doc in documents]
-        metadatas = [doc["metadata"] for doc in documents]
-        ids = [f"doc_{i}" for i in range(len(documents))]
-
-        # Get embeddings
-        embeddings = self._get_embeddings(contents)
+        # Create IDs
+        if ids is None:
+            ids = [doc.get("id") or make_document_id(doc) for doc in documents]
+        documents = [dict(doc, id=doc_id) for doc, doc_id in zip(documents, ids)]
 
-        # Add documents to collection
-        self.collection.add(
-            documents=contents,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
-        )
+        self.add_document_stream(documents)
 
         print(f"Added {len(documents)} documents to ChromaDB collection")
 
+    def add_document_stream(self, documents: Iterable[Dict[str, Any]],
+                            on_batch: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Embed a stream of documents and add them to the collection as batches complete.
+
+        Args:
+            documents: Documents with 'content', 'metadata' and 'id'; may be a generator
+            on_batch: Function called with the size of each batch added to the collection
+
+        Returns:
+            Number of documents added
+        """
+        added = 0
+        for batch, embeddings in self._embedding_pipeline().iter_embedded(documents):
+            self.add_embedded(batch, embeddings)
+            added += len(batch)
+            if on_batch is not None:
+                on_batch(len(batch))
+        return added
+
+    def add_embedded(self, documents: List[Dict[str, Any]], embeddings: Any) -> None:
+        """
+        Add documents whose embeddings have already been computed.
+
+        Documents are upserted, so writing a document again under the same id
+        replaces it instead of failing or creating a duplicate.
+
+        Args:
+            documents: List of document dictionaries with 'content', 'metadata' and 'id'
+            embeddings: Array with one embedding row per document
+        """
+        self.collection.upsert(
+            documents=[doc["content"] for doc in documents],
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            metadatas=[doc["metadata"] for doc in documents],
+            ids=[doc["id"] for doc in documents]
+        )
+
     def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """
         Search the vector store for documents similar to the query.
@@ -95,33 +213,179 @@ class ChromaStore:
         Returns:
             List of document dictionaries with similarity scores
         """
-        # Get query embedding
-        query_embedding = self._get_embeddings([query])[0]
+        return self.search_batch([query], k)[0]
+
+    def search_batch(self, queries: List[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search the vector store for several queries at once.
+
+        All queries are embedded with one embeddings request and sent to
+        ChromaDB as a single multi-embedding query.
+
+        Args:
+            queries: Query strings
+            k: Number of results to return per query
+
+        Returns:
+            One list of document dictionaries with similarity scores per query
+        """
+        if not queries:
+            return []
+
+        return self.search_by_embeddings(self.embed_queries(queries), k)
+
+    def search_by_embeddings(self, query_embeddings: Any, k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search the vector store with already computed query embeddings.
+
+        Args:
+            query_embeddings: Array or list with one query embedding per row
+            k: Number of results to return per query
 
+        Returns:
+            One list of document dictionaries with similarity scores per query
+        """
         # Search ChromaDB collection
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=k,
-            include=["documents", "metadatas", "distances"]
-        )
+        with span("vector_search", "chroma"):
+            results = self.collection.query(
+                query_embeddings=np.asarray(query_embeddings, dtype=np.float32).tolist(),
+                n_results=k,
+                include=["documents", "metadatas", "distances"]
+            )
 
         # Format results
-        formatted_results = []
-        for i in range(len(results["documents"][0])):
-            formatted_results.append({
-                "content": results["documents"][0][i],
-                "metadata": results["metadatas"][0][i],
-                "score": results["distances"][0][i]
-            })
+        all_results = []
+        for contents, metadatas, distances in zip(results["documents"], results["metadatas"], results["distances"]):
+            all_results.append([
+                {"content": content, "metadata": metadata, "score": distance}
+                for content, metadata, distance in zip(contents, metadatas, distances)
+            ])
+
+        return all_results
+
+    def iter_documents(self, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the documents in the collection.
+
+        Args:
+            page_size: Number of documents fetched per request
+
+        Yields:
+            Document dictionaries with 'content', 'metadata' and 'id'
+        """
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            for doc_id, content, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                yield {"content": content, "metadata": metadata, "id": doc_id}
+            if len(page["ids"]) < page_size:
+                return
+            offset += page_size
+
+    def remove_source(self, source: str) -> int:
+        """
+        Remove all documents that were extracted from a given source file.
+
+        Args:
+            source: Source filename as stored in the document metadata
+
+        Returns:
+            Number of documents removed
+        """
+        return self.remove_sources([source])
+
+    def remove_sources(self, sources: Iterable[str], keep_ids: Optional[Set[str]] = None) -> int:
+        """
+        Remove all documents that were extracted from any of the given source files.
+
+        Args:
+            sources: Source filenames as stored in the document metadata
+            keep_ids: Ids of documents to keep, e.g. the new chunks of changed files
+
+        Returns:
+            Number of documents removed
+        """
+        sources = sorted(set(sources))
+        if not sources:
+            return 0
+        ids = self.collection.get(where={"source": {"$in": sources}}, include=[])['ids']
+        if keep_ids:
+            ids = [doc_id for doc_id in ids if doc_id not in keep_ids]
+        if ids:
+            self.collection.delete(ids=ids)
+            print(f"Removed {len(ids)} documents from {len(sources)} source(s) from ChromaDB collection")
+        return len(ids)
+
+    def remove_ids(self, ids: List[str]) -> None:
+        """
+        Remove documents by id.
+
+        Args:
+            ids: Ids of the documents to remove
+        """
+        if ids:
+            self.collection.delete(ids=list(ids))
+
+    def _restore_backup(self) -> bool:
+        """
+        Rename the backup left by an interrupted replace_collection back to this store's collection name.
+
+        Returns:
+            True if a backup was restored
+        """
+        try:
+            backup = self.client.get_collection(name=_backup_name(self.collection_name))
+        except Exception:
+            return False
+        backup.modify(name=self.collection_name)
+        return True
+
+    def replace_collection(self, collection_name: str) -> None:
+        """
+        Rename this store's collection to collection_name, replacing the collection that had that name.
+
+        A collection built under a staging name replaces the live one this
+        way once it is complete. The live collection is renamed to a backup
+        name first and only dropped once the rename succeeded; if it fails,
+        the backup is renamed back, and a backup left by a process that died
+        in between is restored when the collection is next opened.
+
+        Args:
+            collection_name: Name of the collection to replace
+        """
+        backup_name = _backup_name(collection_name)
+        try:
+            # Left over from a run that failed to drop it
+            self.client.delete_collection(name=backup_name)
+        except Exception:
+            pass
+        try:
+            live = self.client.get_collection(name=collection_name)
+        except Exception:
+            live = None
+        if live is not None:
+            live.modify(name=backup_name)
+
+        try:
+            self.collection.modify(name=collection_name)
+        except Exception:
+            if live is not None:
+                live.modify(name=collection_name)
+            raise
+        self.collection_name = collection_name
 
-        return formatted_results
+        if live is not None:
+            try:
+                self.client.delete_collection(name=backup_name)
+            except Exception as e:
+                print(f"Collection '{backup_name}' not deleted: {str(e)}")
 
     def clear(self) -> None:
         """Clear all documents from the collection."""
-        # Get all IDs in the collection
-        all_ids = self.collection.get()['ids']
-        if all_ids:
-            self.collection.delete(ids=all_ids)
+        # Dropping and recreating the collection is much faster than
+        # fetching and deleting every id
+        self.client.delete_collection(name=self.collection_name)
+        self.collection = self._create_collection()
         print(f"Cleared all documents from collection '{self.collection_name}'")
 
     def count(self) -> int:
@@ -0,0 +1,275 @@
+"""
+Context Builder Module for RAG System.
+This module assembles the retrieved documents into a prompt context that fits
+the model's context window: overlapping neighbour chunks are merged, and the
+lowest-ranked documents are trimmed or dropped once the token budget is spent.
+"""
+
+import re
+import math
+from typing import List, Dict, Any, Optional
+
+# Context length assumed for models whose window is unknown; Ollama runs
+# models with at least this num_ctx unless told otherwise
+DEFAULT_CONTEXT_WINDOW = 2048
+
+# Tokens kept free for the answer
+DEFAULT_ANSWER_TOKENS = 512
+
+# Words, runs of digits and single other characters, the units tokenizers split text into
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+# English tokenizers use about one token per four characters of a word
+_CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text.
+
+    Ollama has no tokenization endpoint, so the count is estimated: one
+    token per punctuation mark and per four characters of each word or
+    number, which slightly overestimates common tokenizers on English text.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated number of tokens
+    """
+    return sum(math.ceil(len(piece) / _CHARS_PER_TOKEN) for piece in _TOKEN_PIECES.findall(text))
+
+def _overlap_length(first: str, second: str, max_overlap: int, min_overlap: int) -> int:
+    """Get the length of the longest suffix of first that is a prefix of second."""
+    longest = min(len(first), len(second), max_overlap)
+    for length in range(longest, min_overlap - 1, -1):
+        if first.endswith(second[:length]):
+            return length
+    return 0
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, at a sentence or word boundary when possible."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # Binary search for the longest prefix that fits
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) + 1 <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = text[:low]
+    sentence_end = max(prefix.rfind(". "), prefix.rfind("\n"))
+    if sentence_end >= len(prefix) // 2:
+        prefix = prefix[:sentence_end + 1]
+    elif " " in prefix:
+        prefix = prefix[:prefix.rfind(" ")]
+    return prefix.rstrip() + "…"
+
+class ContextBuilder:
+    """Class for fitting retrieved documents into a model's context window."""
+
+    def __init__(self, context_window: Optional[int] = None,
+                 context_windows: Optional[Dict[str, int]] = None,
+                 answer_tokens: int = DEFAULT_ANSWER_TOKENS,
+                 min_document_tokens: int = 64,
+                 max_overlap: int = 400,
+                 min_overlap: int = 20):
+        """
+        Initialize the context builder.
+
+        Args:
+            context_window: Context length, in tokens, of models without an
+                entry in context_windows, sent to Ollama as num_ctx; None
+                leaves num_ctx to Ollama and budgets DEFAULT_CONTEXT_WINDOW
+            context_windows: Context length per model, keyed by full model
+                name ("llama3:70b") or name without tag ("llama3"), sent to
+                Ollama as num_ctx; ModelRegistry adds the models it finds
+            answer_tokens: Number of tokens kept free for the answer
+            min_document_tokens: Smallest useful part of a document; a
+                document is dropped rather than trimmed to fewer tokens
+            max_overlap: Longest overlap, in characters, looked for between
+                neighbouring chunks; at least the chunk overlap used when
+                splitting the documents
+            min_overlap: Shortest overlap, in characters, that neighbouring
+                chunks are merged on
+        """
+        self.context_window = context_window
+        self.context_windows = dict(context_windows or {})
+        self.answer_tokens = answer_tokens
+        self.min_document_tokens = min_document_tokens
+        self.max_overlap = max_overlap
+        self.min_overlap = min_overlap
+
+    def num_ctx_for(self, model: Optional[str]) -> Optional[int]:
+        """
+        Get the context length to run a model with.
+
+        Args:
+            model: Ollama model name, with or without tag
+
+        Returns:
+            Context length in tokens, or None if it is not known, in which
+            case Ollama's own num_ctx applies
+        """
+        if model:
+            # Ollama lists untagged models with the ':latest' tag
+            for name in (model, model.split(":", 1)[0], f"{model}:latest"):
+                if name in self.context_windows:
+                    return self.context_windows[name]
+        return self.context_window
+
+    def window_for(self, model: Optional[str]) -> int:
+        """
+        Get the context length of a model.
+
+        Args:
+            model: Ollama model name, with or without tag
+
+        Returns:
+            Context length in tokens, DEFAULT_CONTEXT_WINDOW if it is not known
+        """
+        num_ctx = self.num_ctx_for(model)
+        return DEFAULT_CONTEXT_WINDOW if num_ctx is None else num_ctx
+
+    def has_window(self, model: str) -> bool:
+        """Check whether a context length is configured for a model itself."""
+        return model in self.context_windows or model.split(":", 1)[0] in self.context_windows
+
+    def set_window(self, model: str, context_window: int) -> None:
+        """
+        Set the context length of a model.
+
+        Args:
+            model: Ollama model name, with or without tag
+            context_window: Context length in tokens
+        """
+        self.context_windows[model] = context_window
+
+    def budget(self, model: Optional[str], prompt_tokens: int) -> int:
+        """
+        Get the number of tokens left for context documents.
+
+        Args:
+            model: Ollama model name
+            prompt_tokens: Tokens of the prompt without the documents
+
+        Returns:
+            Token budget of the documents, at least 0
+        """
+        return max(self.window_for(model) - self.answer_tokens - prompt_tokens, 0)
+
+    def merge_neighbours(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge overlapping neighbouring chunks of the same file and drop duplicates.
+
+        Consecutive chunks repeat the end of the previous chunk, so when both
+        are retrieved the overlap would be sent twice. They are merged into
+        one passage, which takes the rank of its best-ranked chunk.
+
+        Args:
+            documents: Retrieved documents, best first
+
+        Returns:
+            Documents best first, with merged passages and without duplicates
+        """
+        passages: List[Dict[str, Any]] = []
+        seen_contents = set()
+        # (source, chunk number) -> passage containing that chunk, and whether it is the first/last chunk
+        by_chunk: Dict[tuple, Dict[str, Any]] = {}
+
+        for document in documents:
+            content = document.get("content", "")
+            if content in seen_contents:
+                continue
+            seen_contents.add(content)
+
+            metadata = document.get("metadata") or {}
+            source, chunk = metadata.get("source"), metadata.get("chunk")
+            if source is None or not isinstance(chunk, int):
+                passages.append(document)
+                continue
+
+            passage = dict(document, metadata=dict(metadata), chunks=[chunk])
+            passages.append(passage)
+            by_chunk[(source, chunk)] = passage
+            passage = self._merge_with(passage, by_chunk.get((source, chunk - 1)), passages, by_chunk, source)
+            self._merge_with(by_chunk.get((source, chunk + 1)), passage, passages, by_chunk, source)
+
+        return passages
+
+    def _merge_with(self, later: Optional[Dict[str, Any]], earlier: Optional[Dict[str, Any]],
+                    passages: List[Dict[str, Any]], by_chunk: Dict[tuple, Dict[str, Any]],
+                    source: str) -> Optional[Dict[str, Any]]:
+        """
+        Append the passage later to the passage earlier if the last chunk of
+        earlier directly precedes the first chunk of later and their texts overlap.
+
+        Returns:
+            The passage that now holds the chunks of later
+        """
+        if later is None or earlier is None or later is earlier:
+            return later
+        if earlier["chunks"][-1] + 1 != later["chunks"][0]:
+            return later
+        overlap = _overlap_length(earlier["content"], later["content"], self.max_overlap, self.min_overlap)
+        if overlap == 0:
+            return later
+
+        # Keep the position of the better-ranked passage
+        first, second = (earlier, later) if passages.index(earlier) < passages.index(later) else (later, earlier)
+        first["content"] = earlier["content"] + later["content"][overlap:]
+        first["chunks"] = earlier["chunks"] + later["chunks"]
+        first["metadata"]["chunk"] = first["chunks"][0]
+        passages.remove(second)
+        for chunk in first["chunks"]:
+            by_chunk[(source, chunk)] = first
+        return first
+
+    def select(self, documents: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+        """
+        Choose the documents that fit a token budget.
+
+        Documents are taken in rank order. The first one that does not fit
+        is trimmed to the remaining budget if at least min_document_tokens
+        are left (the best document is always trimmed rather than dropped),
+        and it and all lower-ranked documents are dropped otherwise.
+
+        Args:
+            documents: Documents best first, e.g. from merge_neighbours
+            budget: Token budget, as returned by budget()
+
+        Returns:
+            Selected documents best first; trimmed ones are copies
+        """
+        selected = []
+        remaining = budget
+        for position, document in enumerate(documents):
+            # Tokens of the "Document N (Source: ...):" header format_context adds
+            source = (document.get("metadata") or {}).get("source", "")
+            header_tokens = estimate_tokens(f"Document {position + 1} (Source: {source}):") + 2
+            tokens = header_tokens + estimate_tokens(document.get("content", ""))
+            if tokens <= remaining:
+                selected.append(document)
+                remaining -= tokens
+                continue
+            content_budget = remaining - header_tokens
+            if content_budget >= self.min_document_tokens or (not selected and content_budget > 0):
+                selected.append(dict(document, content=_truncate(document.get("content", ""), content_budget)))
+            break
+        return selected
+
+    def build(self, documents: List[Dict[str, Any]], model: Optional[str],
+              prompt_tokens: int) -> List[Dict[str, Any]]:
+        """
+        Fit retrieved documents into a model's context window.
+
+        Args:
+            documents: Retrieved documents, best first
+            model: Ollama model the prompt is for
+            prompt_tokens: Tokens of the prompt without the documents
+
+        Returns:
+            Documents to put into the prompt, best first
+        """
+        return self.select(self.merge_neighbours(documents), self.budget(model, prompt_tokens))
@@ -0,0 +1,277 @@
+"""
+Document Store Module for RAG System.
+This module stores the text and metadata of indexed chunks in a compact,
+memory-mapped columnar format, so chunks are read from disk only when a
+search returns them.
+"""
+
+import os
+import json
+import mmap
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# One row per chunk: where its text is in the text blob, plus its metadata
+# with strings replaced by ids into the string tables
+ROW_DTYPE = np.dtype([
+    ("offset", "<i8"),
+    ("length", "<i4"),
+    ("source", "<i4"),
+    ("chunk", "<i4"),
+    ("filepath", "<i4"),
+])
+
+class DocumentStore:
+    """Class for storing chunk text and metadata addressed by position."""
+
+    def __init__(self):
+        """Initialize an empty, in-memory document store."""
+        # Rows and text blob of the saved store, memory-mapped once loaded
+        self._rows = np.zeros(0, dtype=ROW_DTYPE)
+        self._blob: Any = b""
+        # String tables for the source and filepath columns
+        self._strings: Dict[str, List[str]] = {"source": [], "filepath": []}
+        self._string_ids: Dict[str, Dict[str, int]] = {"source": {}, "filepath": {}}
+        # Chunks added since the store was loaded, kept in memory until saved
+        self._tail_texts: List[str] = []
+        self._tail_rows: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._rows) + len(self._tail_rows)
+
+    def copy(self) -> "DocumentStore":
+        """
+        Copy the store, so the copy can be modified while the original is read.
+
+        The saved rows and text are shared, since they are never modified in place.
+
+        Returns:
+            The copy
+        """
+        store = DocumentStore()
+        store._rows = self._rows
+        store._blob = self._blob
+        store._strings = {column: list(values) for column, values in self._strings.items()}
+        store._string_ids = {column: dict(ids) for column, ids in self._string_ids.items()}
+        store._tail_texts = list(self._tail_texts)
+        store._tail_rows = list(self._tail_rows)
+        return store
+
+    def _string_id(self, column: str, value: Optional[str]) -> int:
+        """Get the id of a string in a string table, adding it if needed."""
+        if value is None:
+            return -1
+        ids = self._string_ids[column]
+        if value not in ids:
+            ids[value] = len(self._strings[column])
+            self._strings[column].append(value)
+        return ids[value]
+
+    def append(self, documents: Iterable[Dict[str, Any]]) -> None:
+        """
+        Append documents to the store.
+
+        Only the 'source', 'chunk' and 'filepath' metadata fields are stored.
+
+        Args:
+            documents: Document dictionaries with 'content' and 'metadata'
+        """
+        for doc in documents:
+            metadata = doc.get("metadata", {})
+            self._tail_texts.append(doc["content"])
+            self._tail_rows.append((
+                self._string_id("source", metadata.get("source")),
+                int(metadata.get("chunk", -1)),
+                self._string_id("filepath", metadata.get("filepath")),
+            ))
+
+    def _make_document(self, content: str, source: int, chunk: int, filepath: int) -> Dict[str, Any]:
+        """Rebuild a document dictionary from its columns."""
+        metadata = {}
+        if source >= 0:
+            metadata["source"] = self._strings["source"][source]
+        if chunk >= 0:
+            metadata["chunk"] = chunk
+        if filepath >= 0:
+            metadata["filepath"] = self._strings["filepath"][filepath]
+        return {"content": content, "metadata": metadata}
+
+    def get(self, position: int) -> Dict[str, Any]:
+        """
+        Get the document at a position.
+
+        Args:
+            position: Position of the document, equal to its FAISS id
+
+        Returns:
+            Document dictionary with 'content' and 'metadata'
+        """
+        if position < len(self._rows):
+            row = self._rows[position]
+            start = int(row["offset"])
+            content = self._blob[start:start + int(row["length"])].decode("utf-8")
+            return self._make_document(content, int(row["source"]), int(row["chunk"]), int(row["filepath"]))
+
+        tail_position = position - len(self._rows)
+        return self._make_document(self._tail_texts[tail_position], *self._tail_rows[tail_position])
+
+    def iter_documents(self, skip: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the documents in position order.
+
+        Args:
+            skip: Optional positions to leave out
+
+        Yields:
+            Document dictionaries with 'content' and 'metadata'
+        """
+        skip = set(skip or ())
+        for position in range(len(self)):
+            if position not in skip:
+                yield self.get(position)
+
+    def positions_for_source(self, source: str) -> List[int]:
+        """
+        Find the positions of all documents extracted from a source file.
+
+        Args:
+            source: Source filename as stored in the document metadata
+
+        Returns:
+            Sorted list of positions
+        """
+        source_id = self._string_ids["source"].get(source)
+        if source_id is None:
+            return []
+
+        positions = np.flatnonzero(self._rows["source"] == source_id).tolist()
+        positions.extend(
+            len(self._rows) + i for i, row in enumerate(self._tail_rows) if row[0] == source_id
+        )
+        return positions
+
+    def remove(self, positions: Iterable[int]) -> None:
+        """
+        Remove documents, shifting later documents down like IndexFlat.remove_ids.
+
+        The text of removed documents stays in the text blob until the store
+        is saved again.
+
+        Args:
+            positions: Positions of the documents to remove
+        """
+        positions = sorted(set(positions))
+        if not positions:
+            return
+
+        num_rows = len(self._rows)
+        row_positions = [p for p in positions if p < num_rows]
+        if row_positions:
+            keep = np.ones(num_rows, dtype=bool)
+            keep[row_positions] = False
+            self._rows = self._rows[keep]
+
+        tail_positions = {p - num_rows for p in positions if p >= num_rows}
+        if tail_positions:
+            self._tail_texts = [t for i, t in enumerate(self._tail_texts) if i not in tail_positions]
+            self._tail_rows = [r for i, r in enumerate(self._tail_rows) if i not in tail_positions]
+
+    @staticmethod
+    def _paths(directory_path: str, name: str) -> Dict[str, str]:
+        """Get the paths of the files making up a saved store."""
+        base = os.path.join(directory_path, name)
+        return {
+            "blob": f"{base}.docs.bin",
+            "rows": f"{base}.docs.npy",
+            "strings": f"{base}.docs.json",
+        }
+
+    @classmethod
+    def exists(cls, directory_path: str, name: str) -> bool:
+        """
+        Check whether a saved store exists.
+
+        Args:
+            directory_path: Directory of the saved store
+            name: Base name of the saved files
+
+        Returns:
+            True if all files of the store exist
+        """
+        return all(os.path.exists(path) for path in cls._paths(directory_path, name).values())
+
+    def save(self, directory_path: str, name: str) -> None:
+        """
+        Save the store, compacting away the text of removed documents.
+
+        Files are written under temporary names and renamed into place, so
+        processes that memory-map the previous files keep a valid mapping.
+
+        Args:
+            directory_path: Directory to save the store in
+            name: Base name for the saved files
+        """
+        os.makedirs(directory_path, exist_ok=True)
+        paths = self._paths(directory_path, name)
+
+        rows = np.zeros(len(self), dtype=ROW_DTYPE)
+        offset = 0
+        with open(f"{paths['blob']}.tmp", "wb") as f:
+            for position in range(len(self)):
+                if position < len(self._rows):
+                    row = self._rows[position]
+                    start = int(row["offset"])
+                    data = self._blob[start:start + int(row["length"])]
+                    columns = (int(row["source"]), int(row["chunk"]), int(row["filepath"]))
+                else:
+                    tail_position = position - len(self._rows)
+                    data = self._tail_texts[tail_position].encode("utf-8")
+                    columns = self._tail_rows[tail_position]
+                f.write(data)
+                rows[position] = (offset, len(data), *columns)
+                offset += len(data)
+
+        np.save(f"{paths['rows']}.tmp.npy", rows)
+        with open(f"{paths['strings']}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "count": len(rows), **self._strings}, f)
+
+        os.replace(f"{paths['blob']}.tmp", paths["blob"])
+        os.replace(f"{paths['rows']}.tmp.npy", paths["rows"])
+        os.replace(f"{paths['strings']}.tmp", paths["strings"])
+
+    @classmethod
+    def load(cls, directory_path: str, name: str) -> "DocumentStore":
+        """
+        Open a saved store. Text and rows are memory-mapped, not read.
+
+        Args:
+            directory_path: Directory of the saved store
+            name: Base name of the saved files
+
+        Returns:
+            The loaded document store
+        """
+        paths = cls._paths(directory_path, name)
+
+        with open(paths["strings"], "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported document store version {header.get('version')} in {paths['strings']}")
+
+        store = cls()
+        store._strings = {"source": header["source"], "filepath": header["filepath"]}
+        store._string_ids = {
+            column: {value: i for i, value in enumerate(values)}
+            for column, values in store._strings.items()
+        }
+        store._rows = np.load(paths["rows"], mmap_mode="r")
+        if len(store._rows) != header["count"]:
+            raise ValueError(f"Document store {paths['rows']} does not match {paths['strings']}")
+
+        if os.path.getsize(paths["blob"]) > 0:
+            with open(paths["blob"], "rb") as f:
+                store._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return store
@@ -3,9 +3,13 @@ DuckDuckGo Search Module for RAG System.
 This module handles web search using the DuckDuckGo API.
 """
 
+import asyncio
+from concurrent.futures import Executor
 from typing import List, Dict, Any, Optional
 from duckduckgo_search import DDGS
 
+from src.metrics import span
+
 class DuckDuckGoSearch:
     """Class for searching the web using DuckDuckGo."""
     
@@ -39,12 +43,13 @@ class DuckDuckGoSearch:
             
         try:
             # Perform the search
-            results = list(self.ddgs.text(
-                query,
-                region=self.region,
-                safesearch=self.safesearch,
-                max_results=max_results
-            ))
+            with span("web_search", "duckduckgo"):
+                results = list(self.ddgs.text(
+                    query,
+                    region=self.region,
+                    safesearch=self.safesearch,
+                    max_results=max_results
+                ))
             
             # Format the results
             formatted_results = []
@@ -67,6 +72,25 @@ class DuckDuckGoSearch:
             print(f"Error searching DuckDuckGo: {str(e)}")
             return []
     
+    async def asearch(self, query: str, max_results: Optional[int] = None,
+                      executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+        """
+        Search the web using DuckDuckGo without blocking the event loop.
+        
+        The DuckDuckGo client is synchronous, so the search runs in a worker thread.
+        
+        Args:
+            query: Search query
+            max_results: Optional override for max_results
+            executor: Thread pool to search in; defaults to the event loop's
+                default executor
+            
+        Returns:
+            List of search results with title, body, href, and source
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.search, query, max_results)
+    
     def get_snippets(self, query: str, max_results: Optional[int] = None) -> str:
         """
         Get search results as a formatted text for context.
@@ -0,0 +1,354 @@
+"""
+Embedding Cache Module for RAG System.
+This module provides a persistent, content-addressed cache of embeddings that
+is shared by the FAISS and ChromaDB vector stores.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from src.embedding_pipeline import OllamaEmbedder, embedding_format
+from src.ollama_transport import DEFAULT_API_BASE
+
+DEFAULT_CACHE_PATH = "data/embedding_cache.sqlite3"
+
+def text_hash(text: str) -> str:
+    """
+    Compute the cache key of a chunk of text.
+
+    Args:
+        text: Text to hash
+
+    Returns:
+        Hex digest of the text
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    """Class for storing embeddings on disk keyed by model and text hash."""
+
+    def __init__(self, cache_path: str = DEFAULT_CACHE_PATH, max_entries: int = 500_000,
+                 eviction_slack: int = 5000, touch_interval: float = 3600.0):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            cache_path: Path of the SQLite database holding the cache
+            max_entries: Maximum number of embeddings to keep; the least
+                recently used entries are evicted beyond this size
+            eviction_slack: Number of entries the cache may grow beyond
+                max_entries before they are evicted, so that not every
+                write has to evict
+            touch_interval: Number of seconds within which a hit does not
+                record the entry's use again, so that most lookups do not
+                write to the database
+        """
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.eviction_slack = eviction_slack
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        # Kept up to date by put_many; recounted when eviction is due, since
+        # other processes may write to the same database
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model: Name of the embedding model
+            hashes: Text hashes to look up
+
+        Returns:
+            Dictionary mapping each cached text hash to its float32 vector
+        """
+        found = {}
+        if not hashes:
+            return found
+
+        now = time.time()
+        stale = []
+        with self._lock:
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    "SELECT text_hash, vector, last_used FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for key, blob, last_used in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+                    if now - last_used >= self.touch_interval:
+                        stale.append(key)
+
+            # Eviction only needs a coarse order, so recent uses are not recorded again
+            if stale:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, key) for key in stale]
+                )
+                self._conn.commit()
+
+        return found
+
+    def put_many(self, model: str, items: List[Tuple[str, np.ndarray]]) -> None:
+        """
+        Store embeddings in the cache.
+
+        Args:
+            model: Name of the embedding model
+            items: List of (text hash, vector) pairs
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, vector in items:
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((model, key, int(vector.shape[0]), vector.tobytes(), now))
+
+        with self._lock:
+            # The vector of a hash never changes, so an entry another writer added is kept
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, dimension, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._count += max(cursor.rowcount, 0)
+            if self._count > self.max_entries + self.eviction_slack:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Delete the least recently used entries beyond max_entries. Caller holds the lock."""
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self._count -= excess
+
+    def count(self) -> int:
+        """
+        Get the number of cached embeddings.
+
+        Returns:
+            Number of cached embeddings
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove all cached embeddings."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._count = 0
+
+class CachedEmbeddings:
+    """Embeddings wrapper that serves repeated texts from in-process and on-disk caches."""
+
+    def __init__(self, embeddings: Any, model_name: str, cache: Optional[EmbeddingCache],
+                 query_cache_size: int = 1024):
+        """
+        Initialize the cached embeddings.
+
+        Args:
+            embeddings: Underlying embeddings object with an embed_documents method
+            model_name: Name of the embedding model; together with the
+                embedder's format version it is part of the cache key
+            cache: Embedding cache to read from and write to, or None to only
+                keep query embeddings in memory
+            query_cache_size: Maximum number of query embeddings kept in the
+                in-process LRU cache
+        """
+        self.embeddings = embeddings
+        self.model = model_name
+        self.format_version = embedding_format(embeddings)
+        # Entries written for another format version are never read, and age out of the cache
+        self._cache_model = model_name if self.format_version is None else f"{model_name}@{self.format_version}"
+        self.cache = cache
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_lock = threading.Lock()
+        self.query_hits = 0
+        self.query_misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a list of texts, only calling the model for uncached texts.
+
+        Args:
+            texts: List of text strings to embed
+
+        Returns:
+            List of embeddings, in the same order as the texts
+        """
+        if self.cache is None:
+            return self.embeddings.embed_documents(texts)
+
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(self._cache_model, list(set(hashes)))
+
+        # Embed each missing text once, even if it occurs several times
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = [
+                (key, np.asarray(vector, dtype=np.float32))
+                for key, vector in zip(missing.keys(), new_vectors)
+            ]
+            self.cache.put_many(self._cache_model, new_items)
+            vectors.update(new_items)
+
+        return [vectors[key].tolist() for key in hashes]
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed search queries, serving repeated queries from memory.
+
+        Queries missing from the in-process cache are embedded together with
+        one embed_documents call, which also checks the on-disk cache.
+
+        Args:
+            texts: Query texts
+
+        Returns:
+            NumPy array with one embedding row per query
+        """
+        found = {}
+        with self._query_lock:
+            for text in texts:
+                vector = self._query_cache.get(text)
+                if vector is not None:
+                    self._query_cache.move_to_end(text)
+                    found[text] = vector
+            self.query_hits += sum(1 for text in texts if text in found)
+            self.query_misses += sum(1 for text in texts if text not in found)
+
+        missing = list(dict.fromkeys(text for text in texts if text not in found))
+        if missing:
+            new_vectors = np.asarray(self.embed_documents(missing), dtype=np.float32)
+            with self._query_lock:
+                for text, vector in zip(missing, new_vectors):
+                    found[text] = vector
+                    self._query_cache[text] = vector
+                    self._query_cache.move_to_end(text)
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+
+        return np.vstack([found[text] for text in texts]) if texts else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a single query text.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Embedding of the query
+        """
+        return self.embed_queries([text])[0].tolist()
+
+    def query_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get statistics of the in-process query embedding cache.
+
+        Returns:
+            Dictionary with the model name, on-disk cache path, number of
+            entries, hits and misses
+        """
+        with self._query_lock:
+            return {
+                "model": self.model,
+                "cache_path": self.cache.cache_path if self.cache is not None else None,
+                "entries": len(self._query_cache),
+                "hits": self.query_hits,
+                "misses": self.query_misses
+            }
+
+_caches: Dict[str, EmbeddingCache] = {}
+_cached_embeddings: Dict[Tuple[str, Optional[str], str], CachedEmbeddings] = {}
+_registry_lock = threading.Lock()
+
+def get_cached_embeddings(model_name: str, cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                          api_base: str = DEFAULT_API_BASE) -> CachedEmbeddings:
+    """
+    Get the shared embeddings object for a model.
+
+    Vector stores that use the same model, cache path and Ollama server share one instance,
+    so work done for one store, including its in-process cache of query
+    embeddings, is reused by the others.
+
+    Args:
+        model_name: Name of the Ollama embedding model
+        cache_path: Path of the on-disk embedding cache, or None to only
+            cache query embeddings in memory
+        api_base: Base URL of the Ollama API computing the embeddings
+
+    Returns:
+        Embeddings object with embed_documents, embed_query and embed_queries methods
+    """
+    with _registry_lock:
+        key = (model_name, os.path.abspath(cache_path) if cache_path is not None else None, api_base)
+        if key not in _cached_embeddings:
+            cache = None
+            if cache_path is not None:
+                cache = _caches.get(key[1])
+                if cache is None:
+                    cache = _caches[key[1]] = EmbeddingCache(cache_path)
+            _cached_embeddings[key] = CachedEmbeddings(OllamaEmbedder(model_name=model_name, api_base=api_base),
+                                                       model_name, cache)
+        return _cached_embeddings[key]
+
+def query_cache_stats() -> List[Dict[str, Any]]:
+    """
+    Get the query embedding cache statistics of all shared embeddings objects.
+
+    Returns:
+        One statistics dictionary per embedding model, cache path and Ollama server
+    """
+    with _registry_lock:
+        embeddings = list(_cached_embeddings.values())
+    return [instance.query_cache_stats() for instance in embeddings]
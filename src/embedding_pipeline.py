@@ -0,0 +1,241 @@
+"""
+Embedding Pipeline Module for RAG System.
+This module sends text chunks to the Ollama embeddings endpoint in batches,
+concurrently and with retries, and streams the resulting vectors back in order.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+
+import numpy as np
+
+from src.ollama_transport import DEFAULT_API_BASE, OllamaTransport, get_transport
+
+# Version of the way OllamaEmbedder turns texts into vectors. Vectors of
+# different versions are not comparable, so the embedding cache and saved
+# indexes record it and indexes of an older version are rebuilt.
+#   1: langchain's OllamaEmbeddings, one /api/embeddings request per text with a "passage: " prefix
+#   2: batched /api/embed requests with the raw text, returning normalized vectors
+EMBEDDING_FORMAT = 2
+
+# Version of indexes saved before the version was recorded
+LEGACY_EMBEDDING_FORMAT = 1
+
+def embedding_format(embeddings: Any) -> Optional[int]:
+    """
+    Get the embedding format version of an embeddings object.
+
+    Args:
+        embeddings: Embeddings object, e.g. an OllamaEmbedder or CachedEmbeddings
+
+    Returns:
+        The version, or None for embedders that do not declare one
+    """
+    return getattr(embeddings, "format_version", None)
+
+class OllamaEmbedder:
+    """Class for calling the Ollama embeddings endpoint over the shared Ollama transport."""
+
+    format_version = EMBEDDING_FORMAT
+
+    def __init__(self,
+                 model_name: str = "nomic-embed-text",
+                 api_base: str = DEFAULT_API_BASE,
+                 timeout: float = 120.0,
+                 transport: Optional[OllamaTransport] = None):
+        """
+        Initialize the embedder.
+
+        Args:
+            model_name: Name of the Ollama embedding model
+            api_base: Base URL for the Ollama API
+            timeout: Timeout in seconds for one embeddings request
+            transport: Transport to send requests with; defaults to the shared
+                transport for api_base
+        """
+        self.model = model_name
+        self.api_base = api_base
+        self.timeout = timeout
+        self.transport = transport or get_transport(api_base)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a list of texts with a single request.
+
+        Args:
+            texts: List of text strings to embed
+
+        Returns:
+            List of embeddings, in the same order as the texts
+        """
+        if not texts:
+            return []
+
+        response = self.transport.post(
+            "/api/embed",
+            {"model": self.model, "input": texts},
+            timeout=(self.transport.timeout[0], self.timeout)
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Ollama embeddings error: {response.status_code} - {response.text}")
+
+        embeddings = response.json().get("embeddings", [])
+        if len(embeddings) != len(texts):
+            raise RuntimeError(f"Ollama returned {len(embeddings)} embeddings for {len(texts)} texts")
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a single query text.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Embedding of the query
+        """
+        return self.embed_documents([text])[0]
+
+class EmbeddingPipeline:
+    """Class for embedding large lists of texts in concurrent batches."""
+
+    def __init__(self,
+                 embeddings: Any,
+                 batch_size: int = 64,
+                 max_workers: int = 4,
+                 max_retries: int = 3,
+                 retry_backoff: float = 1.0,
+                 max_in_flight: Optional[int] = None):
+        """
+        Initialize the embedding pipeline.
+
+        Args:
+            embeddings: Embeddings object with an embed_documents method
+            batch_size: Number of texts sent per embeddings request
+            max_workers: Maximum number of requests running at once
+            max_retries: Number of times a failed batch is retried
+            retry_backoff: Base delay in seconds between retries, doubled each attempt
+            max_in_flight: Maximum number of batches submitted ahead of the one
+                being consumed; defaults to max_workers
+        """
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_in_flight = max(1, max_in_flight or self.max_workers)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed one batch, retrying on failure.
+
+        Args:
+            texts: Texts of the batch
+
+        Returns:
+            NumPy array of embeddings for the batch
+        """
+        attempt = 0
+        while True:
+            try:
+                return np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                attempt += 1
+                print(f"Embedding batch of {len(texts)} texts failed ({str(e)}), "
+                      f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _run(self, batches: Iterable[Tuple[Any, List[str]]]) -> Iterator[Tuple[Any, np.ndarray]]:
+        """
+        Embed a stream of batches concurrently, yielding results in input order.
+
+        Batches are pulled from the input only when there is room in the
+        in-flight window, so a slow consumer slows down the producer instead
+        of letting work pile up in memory.
+
+        Args:
+            batches: Iterable of (payload, texts) pairs
+
+        Yields:
+            Tuples of (payload, embeddings of the batch's texts)
+        """
+        if self.max_workers == 1:
+            for payload, texts in batches:
+                yield payload, self._embed_batch(texts)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            for payload, texts in batches:
+                pending.append((payload, executor.submit(self._embed_batch, texts)))
+                if len(pending) >= self.max_in_flight:
+                    payload, future = pending.popleft()
+                    yield payload, future.result()
+            while pending:
+                payload, future = pending.popleft()
+                yield payload, future.result()
+
+    def iter_batches(self, texts: List[str]) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Embed texts batch by batch.
+
+        Batches are embedded concurrently, but yielded in input order as soon
+        as they are ready, so callers can add them to an index while later
+        batches are still being embedded.
+
+        Args:
+            texts: List of text strings to embed
+
+        Yields:
+            Tuples of (offset of the batch's first text, embeddings of the batch)
+        """
+        batches = (
+            (start, texts[start:start + self.batch_size])
+            for start in range(0, len(texts), self.batch_size)
+        )
+        yield from self._run(batches)
+
+    def iter_embedded(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Tuple[List[Dict[str, Any]], np.ndarray]]:
+        """
+        Embed a stream of documents batch by batch.
+
+        Documents are read lazily from the input, so at most
+        (max_in_flight + 1) * batch_size documents are held at once.
+
+        Args:
+            documents: Iterable of document dictionaries with 'content' and 'metadata'
+
+        Yields:
+            Tuples of (documents of the batch, embeddings of the batch)
+        """
+        def batches():
+            batch = []
+            for document in documents:
+                batch.append(document)
+                if len(batch) >= self.batch_size:
+                    yield batch, [doc["content"] for doc in batch]
+                    batch = []
+            if batch:
+                yield batch, [doc["content"] for doc in batch]
+
+        yield from self._run(batches())
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed all texts and return them as one matrix.
+
+        Args:
+            texts: List of text strings to embed
+
+        Returns:
+            NumPy array of embeddings, one row per text
+        """
+        batches = [batch for _, batch in self.iter_batches(texts)]
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(batches)
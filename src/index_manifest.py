@@ -0,0 +1,196 @@
+"""
+Index Manifest Module for RAG System.
+This module tracks which PDF files have been indexed, so that only new or
+changed files need to be extracted, chunked and embedded.
+"""
+
+import os
+import copy
+import json
+import hashlib
+from typing import List, Dict, Any, Optional
+
+def file_content_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 hash of a file's content.
+
+    Args:
+        file_path: Path to the file
+        block_size: Number of bytes to read at a time
+
+    Returns:
+        Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def make_chunk_ids(source: str, content_hash: str, num_chunks: int) -> List[str]:
+    """
+    Build deterministic chunk ids for the chunks of one file.
+
+    The ids depend on the file's name as well as its content, so two files
+    with identical bytes get distinct ids and neither overwrites or removes
+    the chunks of the other.
+
+    Args:
+        source: Filename of the source file, as stored in the document metadata
+        content_hash: Content hash of the source file
+        num_chunks: Number of chunks produced from the file
+
+    Returns:
+        List of chunk ids, one per chunk
+    """
+    file_key = hashlib.sha256(f"{source}\0{content_hash}".encode('utf-8')).hexdigest()[:16]
+    return [f"{file_key}_{i}" for i in range(num_chunks)]
+
+def make_document_id(document: Dict[str, Any]) -> str:
+    """
+    Build a deterministic id for a document that was not given one.
+
+    The id is derived from the document's source, chunk number and content,
+    so adding the same document again maps to the same id.
+
+    Args:
+        document: Document dictionary with 'content' and 'metadata'
+
+    Returns:
+        Document id
+    """
+    metadata = document.get("metadata", {})
+    key = f"{metadata.get('source', '')}\0{metadata.get('chunk', '')}\0{document['content']}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+class IndexManifest:
+    """Class for tracking the per-file state of a vector index."""
+
+    def __init__(self, manifest_path: str):
+        """
+        Initialize the manifest.
+
+        Args:
+            manifest_path: Path of the JSON file the manifest is persisted to
+        """
+        self.manifest_path = manifest_path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Load the manifest from disk, starting empty if it does not exist."""
+        if not os.path.exists(self.manifest_path):
+            self.files = {}
+            return
+
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f).get("files", {})
+        except (OSError, ValueError) as e:
+            print(f"Could not read index manifest {self.manifest_path}: {str(e)}")
+            self.files = {}
+
+    def save(self) -> None:
+        """Persist the manifest to disk."""
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"files": self.files}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def exists(self) -> bool:
+        """
+        Check whether the manifest has been persisted before.
+
+        Returns:
+            True if the manifest file exists on disk
+        """
+        return os.path.exists(self.manifest_path)
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the manifest entry of a file.
+
+        Args:
+            filename: Name of the PDF file
+
+        Returns:
+            Manifest entry, or None if the file is not indexed
+        """
+        return self.files.get(filename)
+
+    def needs_update(self, file_path: str) -> Optional[str]:
+        """
+        Check whether a file is new or has changed since it was indexed.
+
+        The modification time and size are compared first, so unchanged files
+        are detected without reading them.
+
+        Args:
+            file_path: Path to the PDF file
+
+        Returns:
+            The file's content hash if it needs indexing, otherwise None
+        """
+        filename = os.path.basename(file_path)
+        entry = self.files.get(filename)
+        stat = os.stat(file_path)
+
+        if entry and entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+            return None
+
+        content_hash = file_content_hash(file_path)
+        if entry and entry.get("content_hash") == content_hash:
+            # Only the timestamp changed, refresh it so the next check is cheap
+            entry["mtime"] = stat.st_mtime
+            entry["size"] = stat.st_size
+            return None
+
+        return content_hash
+
+    def record(self, file_path: str, content_hash: str, chunk_ids: List[str]) -> None:
+        """
+        Record that a file has been indexed.
+
+        Args:
+            file_path: Path to the PDF file
+            content_hash: Content hash of the file
+            chunk_ids: Ids of the chunks that were indexed for the file
+        """
+        stat = os.stat(file_path)
+        self.files[os.path.basename(file_path)] = {
+            "content_hash": content_hash,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "chunk_ids": chunk_ids
+        }
+
+    def remove(self, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        Remove a file from the manifest.
+
+        Args:
+            filename: Name of the PDF file
+
+        Returns:
+            The removed entry, or None if the file was not tracked
+        """
+        return self.files.pop(filename, None)
+
+    def copy(self) -> "IndexManifest":
+        """
+        Copy the manifest, so the copy can be modified and saved in place of the original.
+
+        Returns:
+            The copy
+        """
+        manifest = copy.copy(self)
+        manifest.files = copy.deepcopy(self.files)
+        return manifest
+
+    def clear(self) -> None:
+        """Remove all entries from the manifest."""
+        self.files = {}
@@ -0,0 +1,398 @@
+"""
+Indexing Jobs Module for RAG System.
+This module runs indexing in background worker threads, records the jobs in
+a SQLite table and reports their progress while they run.
+"""
+
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Iterator
+
+DEFAULT_JOBS_PATH = "data/indexing_jobs.sqlite3"
+
+# Statuses of jobs that will not change any more
+FINISHED_STATUSES = ("completed", "failed", "interrupted")
+
+_PROGRESS_FIELDS = ("files_total", "files_processed", "chunks_total", "vectors_embedded")
+
+def _process_alive(pid: int) -> bool:
+    """Check whether a process with the given id exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    except OSError:
+        return False
+    return True
+
+class IndexingProgress:
+    """Class for counting the work done by an indexing run."""
+
+    def __init__(self, on_change: Optional[Callable[[], None]] = None):
+        """
+        Initialize the progress counters.
+
+        Args:
+            on_change: Function called after every update
+        """
+        self.on_change = on_change
+        self.files_total = 0
+        self.files_processed = 0
+        self.chunks_total = 0
+        self.vectors_embedded = 0
+        self.current_file: Optional[str] = None
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def _changed(self) -> None:
+        if self.on_change is not None:
+            self.on_change()
+
+    def add_files(self, count: int) -> None:
+        """
+        Record files that are going to be indexed.
+
+        Args:
+            count: Number of files
+        """
+        with self._lock:
+            self.files_total += count
+        self._changed()
+
+    def file_extracted(self, filename: str, chunks: int) -> None:
+        """
+        Record a file whose chunks were extracted and handed to the embedder.
+
+        Args:
+            filename: Name of the file
+            chunks: Number of chunks extracted from it
+        """
+        with self._lock:
+            self.files_processed += 1
+            self.chunks_total += chunks
+            self.current_file = filename
+        self._changed()
+
+    def vectors_added(self, count: int) -> None:
+        """
+        Record chunks that were embedded and added to the vector store.
+
+        Args:
+            count: Number of chunks
+        """
+        with self._lock:
+            self.vectors_embedded += count
+        self._changed()
+
+    def eta_seconds(self) -> Optional[float]:
+        """
+        Estimate the remaining indexing time.
+
+        The chunk count of the files not extracted yet is extrapolated from
+        the files extracted so far, and the remaining chunks are divided by
+        the embedding rate so far.
+
+        Returns:
+            Estimated number of seconds left, or None before there is a rate
+        """
+        with self._lock:
+            if self.files_processed == 0 or self.vectors_embedded == 0:
+                return None
+            remaining_files = max(self.files_total - self.files_processed, 0)
+            expected_chunks = self.chunks_total + remaining_files * self.chunks_total / self.files_processed
+            rate = self.vectors_embedded / max(time.time() - self.started_at, 1e-6)
+            return max(expected_chunks - self.vectors_embedded, 0) / rate
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the current counters.
+
+        Returns:
+            Dictionary with the counters, the current file and the ETA
+        """
+        eta = self.eta_seconds()
+        with self._lock:
+            state = {field: getattr(self, field) for field in _PROGRESS_FIELDS}
+            state["current_file"] = self.current_file
+        state["eta_seconds"] = None if eta is None else round(eta, 1)
+        return state
+
+class IndexingJobQueue:
+    """Class for running indexing jobs on a local worker pool with a persisted job table."""
+
+    def __init__(self, db_path: str = DEFAULT_JOBS_PATH, max_workers: int = 2,
+                 persist_interval: float = 1.0):
+        """
+        Initialize the job queue.
+
+        Jobs that were still queued or running when the process that owned
+        them stopped cannot be resumed; they are marked as interrupted. Jobs
+        of processes that are still running, on this or another host sharing
+        the database, are left alone.
+
+        Args:
+            db_path: Path of the SQLite database holding the job table
+            max_workers: Number of jobs run at the same time
+            persist_interval: Minimum number of seconds between writes of
+                the progress of a running job to the job table
+        """
+        self.db_path = db_path
+        self.persist_interval = persist_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="indexing-job")
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._version = 0
+        self._running: Dict[str, IndexingProgress] = {}
+        self._persisted_at: Dict[str, float] = {}
+        self._host = socket.gethostname()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                description TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                files_total INTEGER NOT NULL DEFAULT 0,
+                files_processed INTEGER NOT NULL DEFAULT 0,
+                chunks_total INTEGER NOT NULL DEFAULT 0,
+                vectors_embedded INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                owner_host TEXT,
+                owner_pid INTEGER
+            )
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in (("owner_host", "TEXT"), ("owner_pid", "INTEGER")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at)")
+        self._recover_interrupted_jobs()
+        self._conn.commit()
+
+    def _recover_interrupted_jobs(self) -> None:
+        """Mark the unfinished jobs of processes that stopped on this host as interrupted."""
+        rows = self._conn.execute(
+            "SELECT id, owner_host, owner_pid FROM jobs WHERE status IN ('queued', 'running')"
+        ).fetchall()
+        # Jobs recorded before owners were, have no owner; they belong to a stopped process
+        stale = [row["id"] for row in rows
+                 if row["owner_host"] is None
+                 or (row["owner_host"] == self._host and not _process_alive(row["owner_pid"]))]
+        if stale:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'interrupted', finished_at = ? WHERE id = ?",
+                [(now, job_id) for job_id in stale]
+            )
+            print(f"Marked {len(stale)} indexing jobs of stopped processes as interrupted")
+
+    def submit(self, kind: str, target: Callable[[IndexingProgress], Any], description: str = "") -> str:
+        """
+        Queue an indexing job.
+
+        Args:
+            kind: Kind of job, e.g. "index" or "add_pdf"
+            target: Function doing the work; it is called with the job's
+                IndexingProgress and should report its progress to it
+            description: Human-readable description of the job
+
+        Returns:
+            Id of the job
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, description, status, created_at, owner_host, owner_pid) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, description, time.time(), self._host, os.getpid())
+            )
+            self._conn.commit()
+        self._executor.submit(self._run, job_id, target)
+        print(f"Queued indexing job {job_id}: {description or kind}")
+        return job_id
+
+    def _run(self, job_id: str, target: Callable[[IndexingProgress], Any]) -> None:
+        """Run a job in a worker thread and record its outcome."""
+        progress = IndexingProgress(on_change=lambda: self._progress_changed(job_id))
+        with self._lock:
+            self._running[job_id] = progress
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                (progress.started_at, job_id)
+            )
+            self._conn.commit()
+        self._notify()
+
+        status, error = "completed", None
+        try:
+            target(progress)
+        except Exception as e:
+            status, error = "failed", str(e)
+            print(f"Indexing job {job_id} failed: {error}")
+
+        with self._lock:
+            self._write_progress(job_id, progress)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                (status, time.time(), error, job_id)
+            )
+            self._conn.commit()
+            del self._running[job_id]
+            self._persisted_at.pop(job_id, None)
+        self._notify()
+
+    def _progress_changed(self, job_id: str) -> None:
+        """Persist the progress of a running job now and then and wake up watchers."""
+        now = time.monotonic()
+        with self._lock:
+            progress = self._running.get(job_id)
+            if progress is not None and now - self._persisted_at.get(job_id, 0.0) >= self.persist_interval:
+                self._write_progress(job_id, progress)
+                self._conn.commit()
+                self._persisted_at[job_id] = now
+        self._notify()
+
+    def _write_progress(self, job_id: str, progress: IndexingProgress) -> None:
+        """Write the counters of a job to the job table. Caller holds the lock."""
+        state = progress.snapshot()
+        self._conn.execute(
+            "UPDATE jobs SET files_total = ?, files_processed = ?, chunks_total = ?, vectors_embedded = ? "
+            "WHERE id = ?",
+            [state[field] for field in _PROGRESS_FIELDS] + [job_id]
+        )
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def _wait_for_change(self, seen: int, timeout: Optional[float]) -> None:
+        """Wait until anything changed since version seen was read, or the timeout passes."""
+        with self._changed:
+            if self._version == seen:
+                self._changed.wait(timeout=timeout)
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Turn a job table row into a job dictionary, with live counters for running jobs. Caller holds the lock."""
+        job = dict(row)
+        job["current_file"] = None
+        job["eta_seconds"] = None
+        progress = self._running.get(job["id"])
+        if progress is not None:
+            job.update(progress.snapshot())
+        if job["started_at"] is not None:
+            job["elapsed_seconds"] = round((job["finished_at"] or time.time()) - job["started_at"], 1)
+        else:
+            job["elapsed_seconds"] = None
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the state of a job.
+
+        Args:
+            job_id: Id of the job
+
+        Returns:
+            Dictionary with the job's status, counters, elapsed time and ETA,
+            or None if there is no such job
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._row_to_job(row) if row is not None else None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Get the most recent jobs.
+
+        Args:
+            limit: Maximum number of jobs to return
+
+        Returns:
+            List of job dictionaries, newest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return [self._row_to_job(row) for row in rows]
+
+    def watch(self, job_id: str, interval: float = 15.0) -> Iterator[Dict[str, Any]]:
+        """
+        Follow a job until it finishes.
+
+        Args:
+            job_id: Id of the job
+            interval: Maximum number of seconds between two states, so that
+                idle connections stay alive while a large file is extracted
+
+        Yields:
+            The job's state whenever it changes, and at least every interval
+            seconds; the last state is the finished one
+        """
+        last = None
+        last_sent = 0.0
+        while True:
+            seen = self._version
+            job = self.get(job_id)
+            if job is None:
+                return
+            # The elapsed time always changes; it does not count as a change
+            state = {key: value for key, value in job.items() if key not in ("elapsed_seconds", "eta_seconds")}
+            if state != last or time.monotonic() - last_sent >= interval:
+                last, last_sent = state, time.monotonic()
+                yield job
+            if job["status"] in FINISHED_STATUSES:
+                return
+            self._wait_for_change(seen, interval)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for a job to finish.
+
+        Args:
+            job_id: Id of the job
+            timeout: Maximum number of seconds to wait, or None to wait forever
+
+        Returns:
+            The job's last state, or None if there is no such job
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seen = self._version
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED_STATUSES:
+                return job
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return job
+            self._wait_for_change(seen, remaining)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the worker pool.
+
+        Args:
+            wait: Whether to wait for the queued and running jobs to finish
+        """
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,256 @@
+"""
+Metrics Module for RAG System.
+This module records how long each stage of a RAG request takes, and how large
+the prompts are, in histograms, and renders them in the Prometheus text
+exposition format.
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Sequence
+
+# Bucket upper bounds in seconds, from a fast in-memory search to a long generation
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Bucket upper bounds for prompt sizes in tokens
+PROMPT_TOKEN_BUCKETS = (128, 256, 512, 1024, 1536, 2048, 3072, 4096, 6144, 8192, 16384, 32768)
+
+# Bucket upper bounds for generation speeds in tokens per second
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 40, 50, 75, 100, 150, 200, 300, 500)
+
+def _format_value(value: float) -> str:
+    """Format a sample value or bucket bound the way Prometheus expects."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+def _escape_label(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Histogram:
+    """Class for a histogram of observations, with one series per combination of label values."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text of the metric
+            label_names: Names of the labels every observation is given
+            buckets: Upper bounds of the buckets, in increasing order
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value: Observed value, e.g. a duration in seconds
+            **labels: Value of each of the histogram's labels
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        # The first bucket whose upper bound is at least the value; the last one is +Inf
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[key] = series
+            series[0][position] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        Time a block of code, recording its duration even if it raises.
+
+        Args:
+            **labels: Value of each of the histogram's labels
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        """
+        Render the histogram.
+
+        Returns:
+            Lines of the text exposition format
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in series:
+            labels = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.label_names, key)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = ",".join(labels + [f'le="{_format_value(bound)}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {_format_value(total)}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Class for collecting the histograms exposed on the metrics endpoint."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        Get a histogram, creating it on first use.
+
+        Args:
+            name: Metric name
+            documentation: Help text of the metric
+            label_names: Names of the histogram's labels
+            buckets: Upper bounds of the buckets
+
+        Returns:
+            The histogram registered under the name
+        """
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Histogram(name, documentation, label_names, buckets)
+                self._metrics[name] = metric
+            return metric
+
+    def render(self) -> str:
+        """
+        Render all metrics.
+
+        Returns:
+            The metrics in the Prometheus text exposition format
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Registry served on /metrics
+REGISTRY = MetricsRegistry()
+
+# Content type of the text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_DURATION = REGISTRY.histogram(
+    "rag_stage_duration_seconds",
+    "Duration of the stages of answering a question.",
+    ("stage", "backend")
+)
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "rag_request_duration_seconds",
+    "Duration of streamed answers from the start of retrieval to the last chunk.",
+    ("system", "cached")
+)
+
+TOKEN_RATE = REGISTRY.histogram(
+    "rag_llm_tokens_per_second",
+    "Generation speed of the LLM after the first token.",
+    ("model",),
+    buckets=TOKEN_RATE_BUCKETS
+)
+
+PROMPT_TOKENS = REGISTRY.histogram(
+    "rag_prompt_tokens",
+    "Estimated size of RAG prompts after fitting the context into the model's window.",
+    ("model",),
+    buckets=PROMPT_TOKEN_BUCKETS
+)
+
+def span(stage: str, backend: str):
+    """
+    Time a stage of a request.
+
+    Args:
+        stage: Name of the stage, e.g. "vector_search"
+        backend: Component doing the work, e.g. "faiss" or "ollama"
+
+    Returns:
+        Context manager recording the duration in rag_stage_duration_seconds
+    """
+    return STAGE_DURATION.time(stage=stage, backend=backend)
+
+class GenerationTimer:
+    """Class for timing one LLM generation: time to first token, total time and token rate."""
+
+    def __init__(self, model: str):
+        """
+        Start timing a generation.
+
+        Args:
+            model: Name of the model generating
+        """
+        self.model = model
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.chunks = 0
+        self.token_rate: Optional[float] = None
+
+    def chunk(self, data: Dict[str, Any]) -> None:
+        """
+        Record a chunk of a streamed generation.
+
+        Args:
+            data: Decoded JSON line of Ollama's /api/generate or /api/chat stream
+        """
+        if data.get("response") or (data.get("message") or {}).get("content"):
+            self.chunks += 1
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+                STAGE_DURATION.observe(self.first_token_at - self.started_at,
+                                       stage="time_to_first_token", backend="ollama")
+        if data.get("done"):
+            self._read_eval_rate(data)
+
+    def _read_eval_rate(self, data: Dict[str, Any]) -> None:
+        """Take the token rate Ollama reports with the last chunk, when it reports one."""
+        eval_count, eval_duration = data.get("eval_count"), data.get("eval_duration")
+        if eval_count and eval_duration:
+            self.token_rate = eval_count / (eval_duration / 1e9)
+
+    def finish(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Record the end of the generation.
+
+        Args:
+            data: Decoded response of a non-streamed generation, if any
+        """
+        finished_at = time.perf_counter()
+        if data is not None:
+            self._read_eval_rate(data)
+        STAGE_DURATION.observe(finished_at - self.started_at, stage="generation", backend="ollama")
+
+        token_rate = self.token_rate
+        if token_rate is None and self.first_token_at is not None and self.chunks > 1 \
+                and finished_at > self.first_token_at:
+            # Ollama sends about one token per chunk
+            token_rate = (self.chunks - 1) / (finished_at - self.first_token_at)
+        if token_rate is not None:
+            TOKEN_RATE.observe(token_rate, model=self.model)
@@ -0,0 +1,199 @@
+"""
+Model Registry Module for RAG System.
+This module caches the list of models available in Ollama and refreshes it
+in the background, so that page loads never wait for Ollama. It also looks up
+the context length of each model, so prompts use the window the model has.
+"""
+
+import re
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+from src.ollama_transport import DEFAULT_API_BASE, get_transport
+from src.context_builder import ContextBuilder
+
+# num_ctx line in the parameters of an Ollama Modelfile
+_NUM_CTX_PARAMETER = re.compile(r"^num_ctx\s+(\d+)\s*$", re.MULTILINE)
+
+def context_window_from_show(info: Dict[str, Any], max_context_window: Optional[int] = None) -> Optional[int]:
+    """
+    Get the context length to run a model with from its /api/show response.
+
+    A num_ctx set in the model's Modelfile is what Ollama runs it with, so it
+    is used as is. Otherwise the context length the model was trained with
+    is used, at most max_context_window, since Ollama allocates the KV cache
+    for the whole window.
+
+    Args:
+        info: Response of /api/show
+        max_context_window: Largest context length to use, or None for no limit
+
+    Returns:
+        Context length in tokens, or None if the response has none
+    """
+    match = _NUM_CTX_PARAMETER.search(info.get("parameters") or "")
+    if match:
+        return int(match.group(1))
+    lengths = [value for key, value in (info.get("model_info") or {}).items()
+               if key.endswith(".context_length") and isinstance(value, int) and value > 0]
+    if not lengths:
+        return None
+    if max_context_window is not None:
+        return min(lengths[0], max_context_window)
+    return lengths[0]
+
+class ModelRegistry:
+    """Class for serving the Ollama model list from a cache refreshed in the background."""
+
+    def __init__(self, api_base: str = DEFAULT_API_BASE, ttl_seconds: float = 60.0,
+                 fallback_models: Optional[List[str]] = None, timeout: float = 5.0,
+                 context_builder: Optional[ContextBuilder] = None, max_context_window: Optional[int] = 8192):
+        """
+        Initialize the model registry.
+
+        Args:
+            api_base: Base URL for the Ollama API
+            ttl_seconds: Number of seconds after which the list is refreshed
+            fallback_models: Models reported until the list has been fetched once
+            timeout: Timeout in seconds for fetching the list
+            context_builder: Builder that the context length of every listed
+                model without a configured window is added to; None skips
+                the lookup
+            max_context_window: Largest context length looked up for a model
+                that does not set num_ctx itself
+        """
+        self.api_base = api_base
+        self.ttl_seconds = ttl_seconds
+        self.fallback_models = fallback_models or ["llama2"]
+        self.timeout = timeout
+        self.context_builder = context_builder
+        self.max_context_window = max_context_window
+        self._windows_checked = set()
+        self._windows_lock = threading.Lock()
+        self._models: Optional[List[str]] = None
+        self._fetched_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get_models(self) -> List[str]:
+        """
+        Get the available models without waiting for Ollama.
+
+        If the cached list is missing or older than the TTL, a background
+        refresh is started and the current list is returned meanwhile.
+
+        Returns:
+            List of model names
+        """
+        with self._lock:
+            models = self._models
+            stale = models is None or time.monotonic() - self._fetched_at >= self.ttl_seconds
+        if stale:
+            self.refresh_async()
+        return list(models) if models else list(self.fallback_models)
+
+    def has_model(self, model_name: str) -> bool:
+        """
+        Check whether a model is available, without waiting for Ollama.
+
+        Until the list has been fetched, e.g. while Ollama is unreachable at
+        startup, every model is assumed to be available, since the fallback
+        list does not say which ones are not.
+
+        Args:
+            model_name: Model name, with or without the ':latest' tag
+
+        Returns:
+            True if the model is in the fetched list or no list has been fetched yet
+        """
+        self.get_models()
+        with self._lock:
+            models = self._models
+        if models is None:
+            return True
+        return model_name in models or f"{model_name}:latest" in models
+
+    def refresh(self) -> bool:
+        """
+        Fetch the model list from Ollama now.
+
+        On failure the previous list is kept.
+
+        Returns:
+            True if the list was fetched
+        """
+        try:
+            response = get_transport(self.api_base).get("/api/tags", timeout=self.timeout)
+            if response.status_code != 200:
+                print(f"Error getting models from Ollama: {response.status_code} - {response.text}")
+                return False
+            models = [model["name"] for model in response.json().get("models", [])]
+        except Exception as e:
+            print(f"Exception getting models from Ollama: {str(e)}")
+            return False
+        finally:
+            with self._lock:
+                # Also count failed attempts, so a down Ollama is not retried on every call
+                self._fetched_at = time.monotonic()
+
+        with self._lock:
+            self._models = models
+        if self.context_builder is not None:
+            self._load_context_windows(models)
+        return True
+
+    def fetch_context_window(self, model_name: str) -> Optional[int]:
+        """
+        Look up the context length of a model in Ollama.
+
+        Args:
+            model_name: Name of the Ollama model
+
+        Returns:
+            Context length in tokens, or None if it could not be determined
+        """
+        try:
+            response = get_transport(self.api_base).post("/api/show", {"model": model_name}, timeout=self.timeout)
+            if response.status_code != 200:
+                print(f"Error getting model info of {model_name}: {response.status_code} - {response.text}")
+                return None
+            return context_window_from_show(response.json(), self.max_context_window)
+        except Exception as e:
+            print(f"Exception getting model info of {model_name}: {str(e)}")
+            return None
+
+    def _load_context_windows(self, models: List[str]) -> None:
+        """Add the context length of new models without a configured window to the context builder."""
+        # Held for the lookups, so concurrent refreshes do not look up the same models
+        with self._windows_lock:
+            for model_name in models:
+                if model_name in self._windows_checked or self.context_builder.has_window(model_name):
+                    continue
+                context_window = self.fetch_context_window(model_name)
+                if context_window is not None:
+                    self.context_builder.set_window(model_name, context_window)
+                    print(f"Context window of {model_name}: {context_window} tokens")
+                self._windows_checked.add(model_name)
+
+    def refresh_async(self) -> None:
+        """Start a background refresh unless one is already running."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="model-registry-refresh", daemon=True).start()
+
+    def invalidate(self) -> None:
+        """Mark the cached list as stale and refresh it in the background, e.g. after pulling a model."""
+        with self._lock:
+            self._fetched_at = 0.0
+        self.refresh_async()
@@ -3,27 +3,126 @@ Ollama Client Module for RAG System.
 This module handles interactions with Ollama LLM models.
 """
 
-from typing import List, Dict, Any, Optional, Generator, Callable
+from typing import List, Dict, Any, Optional, Generator, Callable, Union
 import requests
 import json
-from langchain_community.llms import Ollama
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+import time
+import threading
+from collections import OrderedDict
+
+from src.ollama_transport import DEFAULT_API_BASE, OllamaTransport, get_transport, set_read_timeout
+from src.metrics import GenerationTimer, PROMPT_TOKENS, span
+from src.context_builder import ContextBuilder, estimate_tokens
+from src.model_registry import ModelRegistry
+
+# Instructions sent as the system message of every RAG chat request. They are the
+# same for every question, so Ollama can reuse their prefilled KV cache
+RAG_SYSTEM_PROMPT = (
+    "You are a helpful assistant that provides accurate information based on the context provided. "
+    "Answer the question using the context information and not prior knowledge. "
+    "If the answer cannot be determined from the context, say "
+    "\"I don't have enough information to answer this question.\""
+)
+
+RAG_USER_TEMPLATE = """Context information is below:
+---------------------
+{context}
+---------------------
+
+Given the context information and not prior knowledge, answer the question: {question}"""
+
+# How long Ollama keeps a model loaded after a request; Ollama's own default is 5 minutes
+DEFAULT_KEEP_ALIVE = "30m"
+
+def format_context(context_docs: List[Dict[str, Any]]) -> str:
+    """
+    Format context documents into a string.
+
+    Args:
+        context_docs: List of context documents from vector search
+
+    Returns:
+        Context text with one numbered section per document
+    """
+    return "\n\n".join([f"Document {i+1} (Source: {doc['metadata']['source']}):\n{doc['content']}"
+                       for i, doc in enumerate(context_docs)])
+
+# Context builder used by clients that are not given their own
+default_context_builder = ContextBuilder()
+
+def _fit_context(context_docs: List[Dict[str, Any]], model: Optional[str],
+                 context_builder: Optional[ContextBuilder], prompt_tokens: int) -> str:
+    """Format the documents that fit next to prompt_tokens of instructions and question."""
+    context_builder = context_builder or default_context_builder
+    context = format_context(context_builder.build(context_docs, model, prompt_tokens))
+    PROMPT_TOKENS.observe(prompt_tokens + estimate_tokens(context), model=model or "")
+    return context
+
+def build_rag_messages(question: str, context_docs: List[Dict[str, Any]], model: Optional[str] = None,
+                       context_builder: Optional[ContextBuilder] = None) -> List[Dict[str, str]]:
+    """
+    Build the chat messages of a RAG request.
+
+    The instructions are a fixed system message and the documents and the
+    question follow in the user message, so every request starts with the
+    same tokens and Ollama does not prefill the instructions again.
+
+    Args:
+        question: User question
+        context_docs: List of context documents from vector search, best first
+        model: Ollama model the messages are for, which determines the token budget
+        context_builder: Builder fitting the documents into the context
+            window; defaults to default_context_builder
+
+    Returns:
+        System and user messages for /api/chat
+    """
+    with span("context_format", "ollama"):
+        prompt_tokens = estimate_tokens(RAG_SYSTEM_PROMPT) + \
+            estimate_tokens(RAG_USER_TEMPLATE.format(context="", question=question))
+        context = _fit_context(context_docs, model, context_builder, prompt_tokens)
+        return [
+            {"role": "system", "content": RAG_SYSTEM_PROMPT},
+            {"role": "user", "content": RAG_USER_TEMPLATE.format(context=context, question=question)}
+        ]
 
 class OllamaClient:
     """Class for interacting with Ollama LLM models."""
 
-    def __init__(self, model_name: str = "llama2", api_base: str = "http://localhost:11434"):
+    def __init__(self, model_name: str = "llama2", api_base: str = DEFAULT_API_BASE,
+                 transport: Optional[OllamaTransport] = None, stream_timeout: float = 10.0,
+                 first_token_timeout: Optional[float] = 300.0, generate_timeout: float = 300.0,
+                 context_builder: Optional[ContextBuilder] = None,
+                 keep_alive: Optional[Union[str, float]] = DEFAULT_KEEP_ALIVE):
         """
         Initialize the Ollama client.
 
         Args:
             model_name: Name of the Ollama model to use
             api_base: Base URL for the Ollama API
+            transport: Transport to send requests with; defaults to the shared
+                transport for api_base
+            stream_timeout: Maximum number of seconds to wait for the next chunk
+                of a streamed answer once the first chunk has arrived
+            first_token_timeout: Maximum number of seconds to wait for the
+                first chunk of a streamed answer, which includes loading the
+                model and evaluating the prompt; None waits forever
+            generate_timeout: Maximum number of seconds to wait for a
+                non-streamed answer
+            context_builder: Builder fitting retrieved documents into the
+                model's context window; defaults to default_context_builder
+            keep_alive: How long Ollama keeps the model loaded after each
+                request, e.g. "30m", or seconds; -1 keeps it loaded, None
+                uses Ollama's default
         """
         self.model_name = model_name
         self.api_base = api_base
-        self.llm = Ollama(model=model_name, base_url=api_base)
+        self.transport = transport or get_transport(api_base)
+        self.stream_timeout = stream_timeout
+        self.first_token_timeout = first_token_timeout
+        self.generate_timeout = generate_timeout
+        self.context_builder = context_builder or default_context_builder
+        self.keep_alive = keep_alive
 
     def generate_response(self, prompt: str) -> str:
         """
@@ -35,34 +134,92 @@ class OllamaClient:
         Returns:
             Generated response
         """
-        return self.llm.invoke(prompt)
+        timer = GenerationTimer(self.model_name)
+        response = self.transport.post(
+            "/api/generate",
+            self._payload(prompt=prompt, stream=False),
+            timeout=(self.transport.timeout[0], self.generate_timeout)
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Ollama API error: {response.status_code} - {response.text}")
+        data = response.json()
+        timer.finish(data)
+        return data.get("response", "")
 
-    def create_rag_chain(self) -> LLMChain:
+    def _payload(self, **fields: Any) -> Dict[str, Any]:
         """
-        Create a LangChain chain for RAG.
+        Build the body of a generation request.
+
+        Every request carries the same keep-alive and, when it is known, the
+        same context length, so the loaded model is kept warm and never
+        reloaded with other options.
+
+        Args:
+            **fields: Request fields, e.g. messages and stream
 
         Returns:
-            LLMChain for RAG
+            Request body
+        """
+        payload = {"model": self.model_name, **fields}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        num_ctx = self.context_builder.num_ctx_for(self.model_name)
+        if num_ctx is not None:
+            payload["options"] = dict(payload.get("options", {}), num_ctx=num_ctx)
+        return payload
+
+    def chat(self, messages: List[Dict[str, str]]) -> str:
         """
-        template = """
-        You are a helpful assistant that provides accurate information based on the context provided.
+        Generate a chat response from the LLM.
 
-        Context information is below:
-        ---------------------
-        {context}
-        ---------------------
+        Args:
+            messages: Chat messages, e.g. from build_rag_messages
 
-        Given the context information and not prior knowledge, answer the question: {question}
+        Returns:
+            Generated response
+        """
+        timer = GenerationTimer(self.model_name)
+        response = self.transport.post(
+            "/api/chat",
+            self._payload(messages=messages, stream=False),
+            timeout=(self.transport.timeout[0], self.generate_timeout)
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Ollama API error: {response.status_code} - {response.text}")
+        data = response.json()
+        timer.finish(data)
+        return data.get("message", {}).get("content", "")
 
-        If the answer cannot be determined from the context, say "I don't have enough information to answer this question."
+    def warm_up(self) -> bool:
         """
+        Load the model and prefill the RAG system prompt.
 
-        prompt = PromptTemplate(
-            input_variables=["context", "question"],
-            template=template
-        )
+        One token is generated for the system prompt, so that the first real
+        request neither waits for the model to load nor prefills the
+        instructions.
 
-        return LLMChain(llm=self.llm, prompt=prompt)
+        Returns:
+            Whether the model answered
+        """
+        messages = [
+            {"role": "system", "content": RAG_SYSTEM_PROMPT},
+            {"role": "user", "content": "Reply with OK."}
+        ]
+        start = time.perf_counter()
+        try:
+            response = self.transport.post(
+                "/api/chat",
+                self._payload(messages=messages, stream=False, options={"num_predict": 1}),
+                timeout=(self.transport.timeout[0], self.generate_timeout)
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"Could not warm up model {self.model_name}: {str(e)}")
+            return False
+        if response.status_code != 200:
+            print(f"Could not warm up model {self.model_name}: {response.status_code} - {response.text}")
+            return False
+        print(f"Warmed up model {self.model_name} in {time.perf_counter() - start:.1f}s")
+        return True
 
     def answer_with_rag(self, question: str, context_docs: List[Dict[str, Any]]) -> str:
         """
@@ -75,22 +232,7 @@ class OllamaClient:
         Returns:
             Generated answer
         """
-        # Format context from documents
-        context_text = self._format_context(context_docs)
-
-        # Create and run chain
-        chain = self.create_rag_chain()
-        response = chain.invoke({
-            "context": context_text,
-            "question": question
-        })
-
-        return response["text"]
-
-    def _format_context(self, context_docs: List[Dict[str, Any]]) -> str:
-        """Format context documents into a string."""
-        return "\n\n".join([f"Document {i+1} (Source: {doc['metadata']['source']}):\n{doc['content']}"
-                           for i, doc in enumerate(context_docs)])
+        return self.chat(build_rag_messages(question, context_docs, self.model_name, self.context_builder))
 
     def stream_answer_with_rag(self, question: str, context_docs: List[Dict[str, Any]]) -> Generator[str, None, None]:
         """
@@ -104,55 +246,47 @@ class OllamaClient:
             Chunks of the generated answer
         """
         try:
-            # Format context from documents
-            context_text = self._format_context(context_docs)
-
-            # Create prompt
-            prompt = f"""
-            You are a helpful assistant that provides accurate information based on the context provided.
-
-            Context information is below:
-            ---------------------
-            {context_text}
-            ---------------------
-
-            Given the context information and not prior knowledge, answer the question: {question}
-
-            If the answer cannot be determined from the context, say "I don't have enough information to answer this question."
-            """
+            # Create messages
+            messages = build_rag_messages(question, context_docs, self.model_name, self.context_builder)
 
             # Stream response directly from Ollama API
-            url = f"{self.api_base}/api/generate"
-            data = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": True
-            }
+            url = f"{self.api_base}/api/chat"
+            data = self._payload(messages=messages, stream=True)
 
             print(f"Sending request to Ollama API at {url}")
             print(f"Using model: {self.model_name}")
 
+            timer = GenerationTimer(self.model_name)
             try:
-                response = requests.post(url, json=data, stream=True, timeout=10)
-
-                if response.status_code == 200:
-                    for line in response.iter_lines():
-                        if line:
-                            try:
-                                chunk = json.loads(line)
-                                if "response" in chunk:
-                                    yield chunk["response"]
-                            except json.JSONDecodeError as e:
-                                print(f"JSON decode error: {e}, line: {line}")
-                                continue
-                else:
-                    error_msg = f"Ollama API error: {response.status_code} - {response.text}"
-                    print(error_msg)
-                    yield f"Error: {error_msg}"
+                # Closing the response returns its connection to the pool
+                with self.transport.post("/api/chat", data, stream=True,
+                                         timeout=(self.transport.timeout[0], self.first_token_timeout)) as response:
+                    if response.status_code == 200:
+                        first_chunk = True
+                        for line in response.iter_lines():
+                            if first_chunk:
+                                # The model is loaded and generating; later chunks follow quickly
+                                set_read_timeout(response, self.stream_timeout)
+                                first_chunk = False
+                            if line:
+                                try:
+                                    chunk = json.loads(line)
+                                    timer.chunk(chunk)
+                                    if "message" in chunk:
+                                        yield chunk["message"].get("content", "")
+                                except json.JSONDecodeError as e:
+                                    print(f"JSON decode error: {e}, line: {line}")
+                                    continue
+                    else:
+                        error_msg = f"Ollama API error: {response.status_code} - {response.text}"
+                        print(error_msg)
+                        yield f"Error: {error_msg}"
             except requests.exceptions.RequestException as e:
                 error_msg = f"Request to Ollama API failed: {str(e)}"
                 print(error_msg)
                 yield f"Error: {error_msg}"
+            finally:
+                timer.finish()
         except Exception as e:
             error_msg = f"Unexpected error in stream_answer_with_rag: {str(e)}"
             print(error_msg)
@@ -170,3 +304,98 @@ class OllamaClient:
         """
         for chunk in self.stream_answer_with_rag(question, context_docs):
             callback(chunk)
+
+class OllamaClientPool:
+    """Class for sharing one OllamaClient per model between concurrent requests."""
+
+    def __init__(self, api_base: str = DEFAULT_API_BASE, models: Optional[List[str]] = None,
+                 context_builder: Optional[ContextBuilder] = None,
+                 keep_alive: Optional[Union[str, float]] = DEFAULT_KEEP_ALIVE,
+                 model_registry: Optional[ModelRegistry] = None, max_clients: int = 32):
+        """
+        Initialize the client pool.
+
+        Args:
+            api_base: Base URL for the Ollama API
+            models: Models to build clients for right away
+            context_builder: Builder fitting retrieved documents into each
+                model's context window; defaults to default_context_builder
+            keep_alive: How long Ollama keeps each model loaded after a request
+            model_registry: Registry that requested models are checked
+                against; None accepts any model name
+            max_clients: Maximum number of clients kept; the least recently
+                used one is dropped when another model is requested
+        """
+        self.api_base = api_base
+        self.context_builder = context_builder
+        self.keep_alive = keep_alive
+        self.model_registry = model_registry
+        self.max_clients = max_clients
+        self._clients: "OrderedDict[str, OllamaClient]" = OrderedDict()
+        self._lock = threading.Lock()
+        for model_name in models or []:
+            self._client(model_name)
+
+    def get(self, model_name: str) -> OllamaClient:
+        """
+        Get the client for a model, building it on first use.
+
+        Clients are never modified after they are built, so requests for
+        different models can use the pool concurrently.
+
+        Args:
+            model_name: Name of the Ollama model
+
+        Returns:
+            The client shared by all requests for the model
+
+        Raises:
+            ValueError: If the model registry does not know the model
+        """
+        if self.model_registry is not None and not self.model_registry.has_model(model_name):
+            raise ValueError(f"Unknown model: {model_name}")
+        return self._client(model_name)
+
+    def _client(self, model_name: str) -> OllamaClient:
+        """Get or build the client for a model, without checking the model name."""
+        with self._lock:
+            client = self._clients.get(model_name)
+            if client is None:
+                client = OllamaClient(model_name=model_name, api_base=self.api_base,
+                                      context_builder=self.context_builder, keep_alive=self.keep_alive)
+                self._clients[model_name] = client
+                # Clients share the transport of api_base, so a dropped client holds no connections
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(model_name)
+            return client
+
+    def models(self) -> List[str]:
+        """Names of the models that clients have been built for."""
+        with self._lock:
+            return list(self._clients)
+
+    def warm_up(self, models: List[str], background: bool = True) -> None:
+        """
+        Load models into Ollama before the first request for them.
+
+        With a model registry that looks up context windows, the model list
+        is fetched first, so the models are loaded with the num_ctx that
+        requests will use.
+
+        Args:
+            models: Names of the models to warm up, e.g. the default models
+            background: Whether to warm them up in a background thread, so
+                that startup does not wait for the models to load
+        """
+        def run():
+            if self.model_registry is not None and self.model_registry.context_builder is not None:
+                self.model_registry.refresh()
+            for model_name in dict.fromkeys(models):
+                self._client(model_name).warm_up()
+
+        if background:
+            threading.Thread(target=run, name="ollama-warm-up", daemon=True).start()
+        else:
+            run()
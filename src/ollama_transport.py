@@ -0,0 +1,118 @@
+"""
+Ollama Transport Module for RAG System.
+This module provides the shared, connection-pooled HTTP session used for all
+calls to the Ollama API: generation, embeddings and model listing.
+"""
+
+import threading
+from typing import Dict, Any, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_BASE = "http://localhost:11434"
+
+Timeout = Union[float, Tuple[float, float]]
+
+class OllamaTransport:
+    """Class for sending requests to one Ollama server over keep-alive connections."""
+
+    def __init__(self, api_base: str = DEFAULT_API_BASE, pool_size: int = 16,
+                 connect_timeout: float = 5.0, read_timeout: float = 120.0):
+        """
+        Initialize the transport.
+
+        Args:
+            api_base: Base URL for the Ollama API
+            pool_size: Maximum number of keep-alive connections kept open
+            connect_timeout: Default number of seconds to wait for a connection
+            read_timeout: Default number of seconds to wait for response data
+        """
+        self.api_base = api_base.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, path: str, timeout: Optional[Timeout] = None) -> requests.Response:
+        """
+        Send a GET request.
+
+        Args:
+            path: API path, e.g. "/api/tags"
+            timeout: Timeout for this call; defaults to the transport's timeouts
+
+        Returns:
+            The response
+        """
+        return self.session.get(f"{self.api_base}{path}", timeout=timeout or self.timeout)
+
+    def post(self, path: str, payload: Dict[str, Any], stream: bool = False,
+             timeout: Optional[Timeout] = None) -> requests.Response:
+        """
+        Send a POST request with a JSON body.
+
+        Streamed responses hold a pooled connection until they are closed, so
+        use them as context managers.
+
+        Args:
+            path: API path, e.g. "/api/generate"
+            payload: JSON body
+            stream: Whether to stream the response body
+            timeout: Timeout for this call; defaults to the transport's timeouts
+
+        Returns:
+            The response
+        """
+        return self.session.post(
+            f"{self.api_base}{path}",
+            json=payload,
+            stream=stream,
+            timeout=timeout or self.timeout
+        )
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.session.close()
+
+def set_read_timeout(response: requests.Response, timeout: Optional[float]) -> None:
+    """
+    Change the read timeout of a streamed response for the reads still to come.
+
+    A stream can wait a long time for its first chunk, while the model loads
+    and the prompt is evaluated, and then only a short time between chunks.
+    The pool sets the timeout of the next request again when the connection
+    is reused.
+
+    Args:
+        response: Response opened with stream=True
+        timeout: Maximum number of seconds to wait for data, or None to wait forever
+    """
+    connection = getattr(response.raw, "connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        sock.settimeout(timeout)
+
+_transports: Dict[str, OllamaTransport] = {}
+_transports_lock = threading.Lock()
+
+def get_transport(api_base: str = DEFAULT_API_BASE, pool_size: Optional[int] = None) -> OllamaTransport:
+    """
+    Get the shared transport for an Ollama server.
+
+    Args:
+        api_base: Base URL for the Ollama API
+        pool_size: Pool size used if the transport does not exist yet
+
+    Returns:
+        The transport shared by all callers using the same base URL
+    """
+    key = api_base.rstrip("/")
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = OllamaTransport(key) if pool_size is None else OllamaTransport(key, pool_size=pool_size)
+            _transports[key] = transport
+        return transport
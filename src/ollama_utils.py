@@ -3,9 +3,10 @@ Ollama Utilities Module.
 This module provides utility functions for interacting with Ollama.
 """
 
-import requests
 from typing import List, Dict, Any, Optional
 
+from src.ollama_transport import get_transport
+
 def get_available_models(api_base: str = "http://localhost:11434") -> List[str]:
     """
     Get a list of available models from Ollama.
@@ -18,7 +19,7 @@ def get_available_models(api_base: str = "http://localhost:11434") -> List[str]:
     """
     try:
         # Call Ollama API to get list of models
-        response = requests.get(f"{api_base}/api/tags")
+        response = get_transport(api_base).get("/api/tags", timeout=5.0)
         
         if response.status_code == 200:
             data = response.json()
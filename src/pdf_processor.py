@@ -4,23 +4,46 @@ This module handles loading, parsing, and chunking PDF documents.
 """
 
 import os
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from pypdf import PdfReader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+def _extract_page_range(pdf_path: str, start: int, end: int) -> str:
+    """
+    Extract the text of a range of pages. Runs in a worker process.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        start: Index of the first page to extract
+        end: Index after the last page to extract
+        
+    Returns:
+        Extracted text, with a newline after every page
+    """
+    reader = PdfReader(pdf_path)
+    return "".join(f"{reader.pages[i].extract_text() or ''}\n" for i in range(start, end))
+
 class PDFProcessor:
     """Class for processing PDF documents."""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 max_workers: Optional[int] = None, pages_per_task: int = 50):
         """
         Initialize the PDF processor.
         
         Args:
             chunk_size: Size of text chunks for vectorization
             chunk_overlap: Overlap between chunks to maintain context
+            max_workers: Number of processes used to extract text from several
+                PDFs at once; None uses all cores, 1 extracts in-process
+            pages_per_task: Number of pages extracted per task; larger PDFs
+                are split into page ranges extracted in parallel
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = max(1, pages_per_task)
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
@@ -42,10 +65,7 @@ class PDFProcessor:
         
         try:
             reader = PdfReader(pdf_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            return "".join(f"{page.extract_text() or ''}\n" for page in reader.pages)
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
     
@@ -95,8 +115,21 @@ class PDFProcessor:
         Returns:
             List of document chunks with metadata
         """
-        filename = os.path.basename(pdf_path)
         text = self.load_pdf(pdf_path)
+        return self._make_documents(pdf_path, text)
+    
+    def _make_documents(self, pdf_path: str, text: str) -> List[Dict[str, Any]]:
+        """
+        Chunk the text of a PDF and attach metadata.
+        
+        Args:
+            pdf_path: Path to the PDF file the text was extracted from
+            text: Extracted text
+            
+        Returns:
+            List of document chunks with metadata
+        """
+        filename = os.path.basename(pdf_path)
         chunks = self.chunk_text(text)
         
         documents = []
@@ -122,15 +155,112 @@ class PDFProcessor:
         Returns:
             List of document chunks with metadata from all PDFs
         """
-        all_documents = []
+        return list(self.iter_directory(directory_path))
+    
+    def iter_directory(self, directory_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Process all PDFs in a directory, yielding chunks as files complete.
         
-        for filename in os.listdir(directory_path):
-            if filename.lower().endswith('.pdf'):
-                file_path = os.path.join(directory_path, filename)
+        Args:
+            directory_path: Path to directory containing PDFs
+            
+        Yields:
+            Document chunks with metadata
+        """
+        pdf_paths = [
+            os.path.join(directory_path, filename)
+            for filename in sorted(os.listdir(directory_path))
+            if filename.lower().endswith('.pdf')
+        ]
+        for _, documents in self.iter_files(pdf_paths):
+            yield from documents
+    
+    def iter_files(self, pdf_paths: List[str]) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Process several PDFs in parallel, yielding each file's chunks when it completes.
+        
+        Text extraction runs in a process pool: each PDF is one task, and PDFs
+        with more than pages_per_task pages are split into page-range tasks so
+        a single large file also uses several cores. Only a bounded number of
+        tasks is submitted ahead of the consumer, so extracted text does not
+        pile up in memory when downstream stages are slower. Files that fail
+        to process are reported and skipped.
+        
+        Args:
+            pdf_paths: Paths of the PDF files
+            
+        Yields:
+            Tuples of (PDF path, list of document chunks with metadata)
+        """
+        if self.max_workers == 1 or not pdf_paths:
+            for pdf_path in pdf_paths:
                 try:
-                    documents = self.process_pdf(file_path)
-                    all_documents.extend(documents)
+                    yield pdf_path, self.process_pdf(pdf_path)
                 except Exception as e:
-                    print(f"Error processing {filename}: {str(e)}")
+                    print(f"Error processing {os.path.basename(pdf_path)}: {str(e)}")
+            return
+        
+        parts: Dict[str, List[Optional[str]]] = {}
+        tasks = self._iter_page_tasks(pdf_paths, parts)
+        max_pending = self.max_workers * 2
+        
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {}
+            failed = set()
+            exhausted = False
+            while True:
+                while not exhausted and len(in_flight) < max_pending:
+                    task = next(tasks, None)
+                    if task is None:
+                        exhausted = True
+                        break
+                    pdf_path, position, start, end = task
+                    future = executor.submit(_extract_page_range, pdf_path, start, end)
+                    in_flight[future] = (pdf_path, position)
+                
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pdf_path, position = in_flight.pop(future)
+                    if pdf_path in failed:
+                        continue
+                    try:
+                        parts[pdf_path][position] = future.result()
+                    except Exception as e:
+                        failed.add(pdf_path)
+                        parts.pop(pdf_path, None)
+                        print(f"Error processing {os.path.basename(pdf_path)}: {str(e)}")
+                        continue
+                    
+                    if all(part is not None for part in parts[pdf_path]):
+                        text = "".join(parts.pop(pdf_path))
+                        yield pdf_path, self._make_documents(pdf_path, text)
+    
+    def _iter_page_tasks(self, pdf_paths: List[str],
+                         parts: Dict[str, List[Optional[str]]]) -> Iterator[Tuple[str, int, int, int]]:
+        """
+        Split PDFs into page-range extraction tasks, one file at a time.
         
-        return all_documents
+        Args:
+            pdf_paths: Paths of the PDF files
+            parts: Dictionary that receives one empty slot per task of each file
+            
+        Yields:
+            Tuples of (PDF path, position of the range in the file, first page, end page)
+        """
+        for pdf_path in pdf_paths:
+            try:
+                num_pages = len(PdfReader(pdf_path).pages)
+            except Exception as e:
+                print(f"Error processing {os.path.basename(pdf_path)}: {str(e)}")
+                continue
+            
+            ranges = [
+                (start, min(start + self.pages_per_task, num_pages))
+                for start in range(0, num_pages, self.pages_per_task)
+            ] or [(0, 0)]
+            parts[pdf_path] = [None] * len(ranges)
+            for position, (start, end) in enumerate(ranges):
+                yield pdf_path, position, start, end
@@ -5,18 +5,39 @@ This module integrates PDF processing, vector store, and LLM components.
 
 import os
 import enum
-from typing import List, Dict, Any, Optional, Union
+import time
+import asyncio
+import threading
+from concurrent.futures import Executor
+from typing import List, Dict, Any, Optional, Union, Iterator, AsyncIterator, Tuple, Callable
+
+import numpy as np
 
 from src.pdf_processor import PDFProcessor
-from src.vector_store import VectorStore
+from src.vector_store import VectorStore, FaissIndexType
 from src.chroma_store import ChromaStore
 from src.ollama_client import OllamaClient
+from src.embedding_cache import DEFAULT_CACHE_PATH
+from src.ollama_transport import DEFAULT_API_BASE
+from src.index_manifest import IndexManifest, file_content_hash, make_chunk_ids
+from src.answer_cache import AnswerCache
+from src.async_ollama_client import AsyncOllamaClient
+from src.indexing_jobs import IndexingJobQueue, IndexingProgress
+from src.bm25_index import BM25Index, reciprocal_rank_fusion
+from src.read_write_lock import ReadWriteLock
+from src.metrics import REQUEST_DURATION, span
 
 class VectorStoreType(enum.Enum):
     """Enum for vector store types."""
     FAISS = "faiss"
     CHROMA = "chroma"
 
+class IndexState(enum.Enum):
+    """Enum for the loading state of the index."""
+    UNLOADED = "unloaded"
+    EMPTY = "empty"
+    READY = "ready"
+
 class RAGSystem:
     """Class for the complete RAG system."""
 
@@ -30,7 +51,23 @@ class RAGSystem:
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
         top_k: int = 5,
-        vector_store_type: VectorStoreType = VectorStoreType.FAISS
+        vector_store_type: VectorStoreType = VectorStoreType.FAISS,
+        embedding_cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+        index_check_interval: float = 5.0,
+        embedding_batch_size: int = 64,
+        embedding_workers: int = 4,
+        extraction_workers: Optional[int] = None,
+        ingestion_window: int = 512,
+        faiss_index_type: FaissIndexType = FaissIndexType.AUTO,
+        faiss_nprobe: int = 16,
+        faiss_ef_search: int = 64,
+        faiss_mmap: bool = True,
+        answer_cache: Optional[AnswerCache] = None,
+        job_queue: Optional[IndexingJobQueue] = None,
+        hybrid_search: bool = True,
+        hybrid_candidates: int = 20,
+        rrf_k: int = 60,
+        api_base: str = DEFAULT_API_BASE
     ):
         """
         Initialize the RAG system.
@@ -45,120 +82,709 @@ class RAGSystem:
             chunk_overlap: Overlap between chunks
             top_k: Number of documents to retrieve for each query
             vector_store_type: Type of vector store to use (FAISS or ChromaDB)
+            embedding_cache_path: Path of the embedding cache shared by the vector
+                stores, or None to disable caching
+            index_check_interval: Minimum number of seconds between checks of
+                whether the saved index was changed on disk by another process
+            embedding_batch_size: Number of chunks sent per embeddings request
+            embedding_workers: Number of embeddings requests run concurrently
+            extraction_workers: Number of processes extracting PDF text; None
+                uses all cores
+            ingestion_window: Maximum number of chunks being embedded at once
+                during indexing; bounds the memory used by the ingestion pipeline
+            faiss_index_type: FAISS index type; AUTO uses an exact flat index for
+                small corpora and IVF indexes for large ones
+            faiss_nprobe: Number of IVF clusters visited per FAISS search
+            faiss_ef_search: Size of the HNSW candidate list per FAISS search
+            faiss_mmap: Whether to memory-map a saved FAISS index instead of
+                reading it into memory
+            answer_cache: Optional cache of generated answers, which may be
+                shared between RAG systems; repeated and near-duplicate
+                questions are answered from it without running the LLM
+            job_queue: Optional queue that index_documents and add_pdf submit
+                background indexing jobs to
+            hybrid_search: Whether to fuse the vector search results with
+                those of a BM25 index, which finds exact terms like model
+                names and acronyms that dense retrieval misses
+            hybrid_candidates: Number of results taken from each retriever
+                before fusion
+            rrf_k: Rank offset of the reciprocal rank fusion
+            api_base: Base URL for the Ollama API, used for generation and embeddings
         """
         self.pdf_dir = pdf_dir
         self.index_dir = index_dir
         self.chroma_dir = chroma_dir
         self.top_k = top_k
         self.vector_store_type = vector_store_type
+        self.embedding_cache_path = embedding_cache_path
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_workers = embedding_workers
+        self.ingestion_window = ingestion_window
+        self.faiss_index_type = FaissIndexType(faiss_index_type)
+        self.faiss_nprobe = faiss_nprobe
+        self.faiss_ef_search = faiss_ef_search
+        self.faiss_mmap = faiss_mmap
+        self.answer_cache = answer_cache
+        self.job_queue = job_queue
+        self.hybrid_search = hybrid_search
+        self.hybrid_candidates = hybrid_candidates
+        self.rrf_k = rrf_k
+        self.api_base = api_base
 
         # Initialize components
-        self.pdf_processor = PDFProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-        self.ollama_client = OllamaClient(model_name=llm_model)
+        self.pdf_processor = PDFProcessor(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            max_workers=extraction_workers
+        )
+        self.ollama_client = OllamaClient(model_name=llm_model, api_base=api_base)
 
         # Initialize vector store based on type
-        if vector_store_type == VectorStoreType.FAISS:
-            self.vector_store = VectorStore(embedding_model_name=embedding_model)
-        else:
-            self.vector_store = ChromaStore(
-                embedding_model_name=embedding_model,
-                persist_directory=chroma_dir
-            )
+        self.vector_store = self._create_vector_store(vector_store_type, embedding_model)
 
         # Create directories if they don't exist
         os.makedirs(pdf_dir, exist_ok=True)
         os.makedirs(index_dir, exist_ok=True)
         os.makedirs(chroma_dir, exist_ok=True)
 
-    def index_documents(self, force_reindex: bool = False) -> None:
+        # Per-file record of what the current vector store has indexed
+        self.manifest = self._create_manifest()
+
+        # Lexical index over the same chunks, kept next to the vector store data;
+        # loaded together with the vector store
+        self.bm25_index = BM25Index()
+
+        # Index loading state; the index is loaded lazily on first use
+        self.index_check_interval = index_check_interval
+        self.index_state = IndexState.UNLOADED
+        self._index_signature = None
+        self._pdf_signature = None
+        self._last_index_check = 0.0
+        # Serializes indexing runs. They build new stores next to the searched
+        # ones and take the search lock only to swap them in, so searches
+        # never see a half-built index and never wait for a whole run
+        self._index_lock = threading.RLock()
+        self._search_lock = ReadWriteLock()
+        # Increases whenever the indexed documents may have changed, so
+        # answers cached for an older index are not reused
+        self.index_version = 0
+
+    def _create_vector_store(self, vector_store_type: VectorStoreType, embedding_model: str,
+                             embeddings: Optional[Any] = None,
+                             collection_name: str = "pdf_documents") -> Union[VectorStore, ChromaStore]:
+        """
+        Create a vector store of the given type.
+
+        Args:
+            vector_store_type: Type of vector store to create
+            embedding_model: Ollama embedding model name
+            embeddings: Optional embeddings object to share, e.g. the current store's
+            collection_name: Name of the ChromaDB collection
+
+        Returns:
+            The new vector store
+        """
+        max_in_flight = max(1, self.ingestion_window // self.embedding_batch_size)
+        if vector_store_type == VectorStoreType.FAISS:
+            return VectorStore(
+                embedding_model_name=embedding_model,
+                embedding_cache_path=self.embedding_cache_path,
+                embeddings=embeddings,
+                embedding_batch_size=self.embedding_batch_size,
+                embedding_workers=self.embedding_workers,
+                embedding_max_in_flight=max_in_flight,
+                index_type=self.faiss_index_type,
+                nprobe=self.faiss_nprobe,
+                ef_search=self.faiss_ef_search,
+                mmap=self.faiss_mmap,
+                api_base=self.api_base
+            )
+        return ChromaStore(
+            embedding_model_name=embedding_model,
+            collection_name=collection_name,
+            persist_directory=self.chroma_dir,
+            embedding_cache_path=self.embedding_cache_path,
+            embeddings=embeddings,
+            embedding_batch_size=self.embedding_batch_size,
+            embedding_workers=self.embedding_workers,
+            embedding_max_in_flight=max_in_flight,
+            api_base=self.api_base
+        )
+
+    def _create_manifest(self) -> IndexManifest:
+        """
+        Create the index manifest for the current vector store type.
+
+        Returns:
+            IndexManifest persisted next to the vector store data
+        """
+        if self.vector_store_type == VectorStoreType.FAISS:
+            return IndexManifest(os.path.join(self.index_dir, "faiss_index.manifest.json"))
+        return IndexManifest(os.path.join(self.chroma_dir, "manifest.json"))
+
+    def _bm25_dir(self) -> str:
+        """Get the directory the BM25 index of the current vector store type is saved in."""
+        return self.index_dir if self.vector_store_type == VectorStoreType.FAISS else self.chroma_dir
+
+    def _new_vector_store(self, collection_name: str = "pdf_documents") -> Union[VectorStore, ChromaStore]:
+        """Create an empty vector store like the current one, to build an index in next to it."""
+        return self._create_vector_store(self.vector_store_type, self.vector_store.embedding_model_name,
+                                         self.vector_store.embeddings, collection_name)
+
+    def _read_bm25_index(self, vector_store: Union[VectorStore, ChromaStore]) -> BM25Index:
+        """
+        Load the saved BM25 index of a vector store.
+
+        If there is none, e.g. for an index built by an older version, it is
+        built from the documents in the vector store and saved.
+
+        Args:
+            vector_store: Vector store the BM25 index belongs to
+
+        Returns:
+            The BM25 index
+        """
+        if BM25Index.exists(self._bm25_dir(), "bm25"):
+            return BM25Index.load(self._bm25_dir(), "bm25")
+
+        print("Building BM25 index from the vector store...")
+        bm25_index = BM25Index()
+        bm25_index.add(vector_store.iter_documents())
+        bm25_index.save(self._bm25_dir(), "bm25")
+        return bm25_index
+
+    def _swap_index(self, vector_store: Union[VectorStore, ChromaStore, None], bm25_index: BM25Index,
+                    manifest: IndexManifest, change: Optional[Callable[[], Any]] = None) -> None:
+        """
+        Make newly built stores the ones that are searched. Caller holds the index lock.
+
+        Args:
+            vector_store: New vector store, or None to keep the current one
+            bm25_index: New BM25 index
+            manifest: Manifest describing the new stores
+            change: Optional function making the last changes to the
+                ChromaDB collection, called while no search runs
+        """
+        with self._search_lock.write():
+            if change is not None:
+                change()
+            if vector_store is not None:
+                self.vector_store = vector_store
+            self.bm25_index = bm25_index
+            self.manifest = manifest
+
+    def _list_pdfs(self) -> List[str]:
+        """
+        List the PDF files in the PDF directory.
+
+        Returns:
+            Sorted list of PDF file paths
+        """
+        return [
+            os.path.join(self.pdf_dir, filename)
+            for filename in sorted(os.listdir(self.pdf_dir))
+            if filename.lower().endswith('.pdf')
+        ]
+
+    def index_documents(self, force_reindex: bool = False, background: bool = False,
+                        progress: Optional[IndexingProgress] = None) -> Optional[str]:
         """
         Index all PDF documents in the PDF directory.
 
         Args:
             force_reindex: Whether to force reindexing even if index exists
+            background: Whether to submit the work to the job queue and return
+                right away instead of indexing in the calling thread
+            progress: Progress to report the work done to
+
+        Returns:
+            Id of the indexing job if background is set, otherwise None
+        """
+        if background:
+            return self._submit_job(
+                "index",
+                f"Index {self.pdf_dir} with {self.vector_store_type.value}",
+                lambda job_progress: self.index_documents(force_reindex, progress=job_progress)
+            )
+
+        progress = progress or IndexingProgress()
+        with self._index_lock:
+            if self.vector_store_type == VectorStoreType.FAISS:
+                self._index_documents_faiss(force_reindex, progress)
+            else:
+                self._index_documents_chroma(force_reindex, progress)
+            self._update_index_state()
+        return None
+
+    def _submit_job(self, kind: str, description: str, target: Callable[[IndexingProgress], Any]) -> str:
+        """
+        Submit indexing work to the job queue.
+
+        Args:
+            kind: Kind of job
+            description: Human-readable description of the job
+            target: Function doing the work, called with the job's progress
+
+        Returns:
+            Id of the job
+        """
+        if self.job_queue is None:
+            raise RuntimeError("Background indexing needs a job queue; pass job_queue to RAGSystem")
+        return self.job_queue.submit(kind, target, description)
+
+    def _faiss_index_signature(self) -> Optional[tuple]:
+        """
+        Get a cheap fingerprint of the saved FAISS index files.
+
+        Returns:
+            Tuple of modification times and sizes, or None if no index is saved
+        """
+        signature = []
+        for suffix in (".index", ".json"):
+            try:
+                stat = os.stat(os.path.join(self.index_dir, f"faiss_index{suffix}"))
+            except OSError:
+                return None
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _pdf_dir_signature(self) -> tuple:
+        """
+        Get a cheap fingerprint of the PDF files and the saved FAISS index.
+
+        Returns:
+            Names, modification times and sizes of the PDFs, and the FAISS index signature
         """
+        signature = []
+        for file_path in self._list_pdfs():
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            signature.append((os.path.basename(file_path), stat.st_mtime_ns, stat.st_size))
+        return tuple(signature), self._faiss_index_signature()
+
+    def _update_index_state(self) -> None:
+        """Record whether the vector store holds documents and what is saved on disk."""
         if self.vector_store_type == VectorStoreType.FAISS:
-            self._index_documents_faiss(force_reindex)
+            has_documents = self.vector_store.index is not None and self.vector_store.index.ntotal > 0
+            self._index_signature = self._faiss_index_signature()
         else:
-            self._index_documents_chroma(force_reindex)
+            has_documents = self.vector_store.count() > 0
+            self._index_signature = None
+
+        self.index_state = IndexState.READY if has_documents else IndexState.EMPTY
+        # An empty index is only rebuilt once the PDFs or the saved index change
+        self._pdf_signature = None if has_documents else self._pdf_dir_signature()
+        self._last_index_check = time.monotonic()
+        self.index_version += 1
+
+    def ensure_index_ready(self) -> None:
+        """
+        Make sure the index is loaded before it is searched.
+
+        The index is loaded (or built) once, on first use. After that the hot
+        query path returns immediately; at most every index_check_interval
+        seconds the saved FAISS files are checked for changes made by another
+        process and reloaded if needed; an empty index is rebuilt once PDFs
+        are added or changed. While another thread is indexing, a
+        loaded index is searched as it is instead of waiting for that thread.
+        """
+        with span("index_ready", self.vector_store_type.value):
+            if self._index_check_is_fresh() and self.index_state == IndexState.READY:
+                return
+
+            if self.index_state == IndexState.READY:
+                if not self._index_lock.acquire(blocking=False):
+                    return
+            else:
+                self._index_lock.acquire()
+            try:
+                if self._index_check_is_fresh():
+                    # Another thread checked meanwhile, or the corpus was empty a moment ago
+                    return
+
+                if self.index_state == IndexState.UNLOADED:
+                    self.index_documents()
+                    return
+
+                if self.index_state == IndexState.EMPTY:
+                    # Indexing replaces the ChromaDB collection, so an empty
+                    # corpus is not indexed again on every check
+                    if self._pdf_dir_signature() != self._pdf_signature:
+                        self.index_documents()
+                    else:
+                        self._last_index_check = time.monotonic()
+                    return
+
+                if self.vector_store_type == VectorStoreType.FAISS:
+                    signature = self._faiss_index_signature()
+                    if signature != self._index_signature:
+                        print("FAISS index changed on disk, reloading...")
+                        if signature is None:
+                            self.index_documents()
+                        elif self._load_saved_faiss_index():
+                            self._update_index_state()
+                        else:
+                            self.index_documents(force_reindex=True)
+                        return
+
+                self._last_index_check = time.monotonic()
+            finally:
+                self._index_lock.release()
+
+    def _index_check_is_fresh(self) -> bool:
+        """Check whether the index state was verified less than index_check_interval ago."""
+        return self.index_state != IndexState.UNLOADED and \
+            time.monotonic() - self._last_index_check < self.index_check_interval
+
+    def _load_saved_faiss_index(self) -> bool:
+        """
+        Load the saved FAISS index into a new store and swap it in. Caller holds the index lock.
+
+        Returns:
+            False if the saved index was embedded with an older embedding
+            format and must be rebuilt instead
+        """
+        vector_store = self._new_vector_store()
+        vector_store.load(self.index_dir)
+        if vector_store.is_outdated():
+            print("FAISS index was embedded with an older embedding format, reindexing...")
+            return False
+        self._swap_index(vector_store, self._read_bm25_index(vector_store), self._create_manifest())
+        return True
 
-    def _index_documents_faiss(self, force_reindex: bool = False) -> None:
+    def _index_documents_faiss(self, force_reindex: bool, progress: IndexingProgress) -> None:
         """
         Index all PDF documents using FAISS.
 
+        The index is built in a new store, saved and then swapped in, so the
+        current index is searched until the new one is complete.
+
         Args:
             force_reindex: Whether to force reindexing even if index exists
+            progress: Progress to report the work done to
         """
         index_path = os.path.join(self.index_dir, "faiss_index.index")
 
         # Check if index already exists
         if os.path.exists(index_path) and not force_reindex:
             print("Loading existing FAISS index...")
-            self.vector_store.load(self.index_dir)
-            return
+            if self._load_saved_faiss_index():
+                return
 
         print(f"Indexing documents from {self.pdf_dir} using FAISS...")
-        documents = self.pdf_processor.process_directory(self.pdf_dir)
+        vector_store = self._new_vector_store()
+        # The previous chunk count is the best estimate of the corpus size
+        # when the index type is chosen automatically
+        previous_chunks = sum(len(entry.get("chunk_ids", [])) for entry in self.manifest.files.values())
+        vector_store.expected_size = previous_chunks or None
+        manifest = self._create_manifest()
+        manifest.clear()
+        bm25_index = BM25Index()
+        file_paths = self._list_pdfs()
+        progress.add_files(len(file_paths))
+        vector_store.create_index(self._iter_file_documents(file_paths, progress, manifest, bm25_index),
+                                  on_batch=progress.vectors_added)
 
-        if not documents:
+        if vector_store.index is None:
             print("No documents found to index.")
+            self._swap_index(vector_store, bm25_index, manifest)
             return
 
-        print(f"Creating FAISS index with {len(documents)} document chunks...")
-        self.vector_store.create_index(documents)
-
         print("Saving FAISS index...")
-        self.vector_store.save(self.index_dir)
+        vector_store.save(self.index_dir)
+        manifest.save()
+        bm25_index.save(self._bm25_dir(), "bm25")
+        self._swap_index(vector_store, bm25_index, manifest)
 
         print("FAISS indexing complete.")
 
-    def _index_documents_chroma(self, force_reindex: bool = False) -> None:
+    def _index_documents_chroma(self, force_reindex: bool, progress: IndexingProgress) -> None:
         """
         Index all PDF documents using ChromaDB.
 
+        The documents are added to a staging collection, which replaces the
+        current collection once it is complete.
+
         Args:
             force_reindex: Whether to force reindexing even if index exists
+            progress: Progress to report the work done to
         """
-        # Clear collection if force reindex
-        if force_reindex:
-            print("Clearing ChromaDB collection...")
-            self.vector_store.clear()
+        if not force_reindex and self.vector_store.is_outdated():
+            print("ChromaDB collection was embedded with an older embedding format, reindexing...")
+            force_reindex = True
 
         # Check if collection already has documents
         if not force_reindex and self.vector_store.count() > 0:
             print(f"ChromaDB collection already has {self.vector_store.count()} documents.")
+            self._swap_index(None, self._read_bm25_index(self.vector_store), self.manifest)
             return
 
         print(f"Indexing documents from {self.pdf_dir} using ChromaDB...")
-        documents = self.pdf_processor.process_directory(self.pdf_dir)
+        collection_name = self.vector_store.collection_name
+        vector_store = self._new_vector_store(f"{collection_name}_staging")
+        # Drop what a failed run may have left in the staging collection
+        vector_store.clear()
+        manifest = self._create_manifest()
+        manifest.clear()
+        bm25_index = BM25Index()
+        file_paths = self._list_pdfs()
+        progress.add_files(len(file_paths))
+        total = vector_store.add_document_stream(
+            self._iter_file_documents(file_paths, progress, manifest, bm25_index),
+            on_batch=progress.vectors_added
+        )
+
+        self._swap_index(vector_store, bm25_index, manifest,
+                         lambda: vector_store.replace_collection(collection_name))
+        manifest.save()
+        bm25_index.save(self._bm25_dir(), "bm25")
 
-        if not documents:
+        if total == 0:
             print("No documents found to index.")
             return
+        print("ChromaDB indexing complete.")
 
-        print(f"Adding {len(documents)} document chunks to ChromaDB...")
-        self.vector_store.add_documents(documents)
+    def index_file(self, file_path: str, save: bool = True, progress: Optional[IndexingProgress] = None) -> int:
+        """
+        Incrementally index a single PDF file.
 
-        print("ChromaDB indexing complete.")
+        Only the given file is extracted, chunked and embedded; the vectors of
+        other files stay in place. Files whose content has not changed since
+        they were last indexed are skipped.
+
+        Args:
+            file_path: Path to the PDF file
+            save: Whether to persist the index and manifest afterwards
+            progress: Progress to report the work done to
+
+        Returns:
+            Number of document chunks added
+        """
+        progress = progress or IndexingProgress()
+        with self._index_lock:
+            embedded_before = progress.vectors_embedded
+            self._prepare_update(progress)
+            self._index_files([file_path], progress, save=save)
+            return progress.vectors_embedded - embedded_before
+
+    def _prepare_update(self, progress: IndexingProgress) -> None:
+        """
+        Load or build the index before an incremental update. Caller holds the index lock.
+
+        An index holding vectors of an older embedding format is rebuilt: new
+        vectors could not be compared with the old ones, so an incremental
+        update would corrupt it.
+
+        Args:
+            progress: Progress to report the work done to
+        """
+        if self.index_state == IndexState.UNLOADED:
+            # Loading rebuilds an outdated index
+            self.index_documents(progress=progress)
+        elif self.vector_store.is_outdated():
+            print("The index was embedded with an older embedding format, reindexing all documents...")
+            self.index_documents(force_reindex=True, progress=progress)
+
+    def _index_files(self, file_paths: List[str], progress: IndexingProgress,
+                     stale_sources: Optional[List[str]] = None, save: bool = True) -> int:
+        """
+        Incrementally index the new or changed files among the given ones.
+
+        The previous chunks of the changed files and the chunks of the stale
+        sources are removed, the files that need work are extracted in
+        parallel and their chunks are added. FAISS and BM25 changes are made
+        to copies, which are swapped in once complete. A ChromaDB collection
+        cannot be copied, so the new chunks are added to it first and the old
+        ones removed at the end; after a failure the added chunks are removed
+        again. Caller holds the index lock.
+
+        Args:
+            file_paths: Paths of the PDF files
+            progress: Progress to report the work done to
+            stale_sources: Filenames of sources to remove, e.g. deleted files
+            save: Whether to persist the index and manifest
+
+        Returns:
+            Number of document chunks added
+        """
+        pending = {}
+        for file_path in file_paths:
+            content_hash = self.manifest.needs_update(file_path)
+            if content_hash is None:
+                print(f"{os.path.basename(file_path)} is already indexed and unchanged.")
+            else:
+                pending[file_path] = content_hash
+
+        removed = [os.path.basename(path) for path in pending] + list(stale_sources or [])
+        if not removed:
+            return 0
+
+        progress.add_files(len(pending))
+        manifest = self.manifest.copy()
+        bm25_index = self.bm25_index.copy()
+        bm25_index.remove_sources(removed)
+        for filename in removed:
+            manifest.remove(filename)
+        documents = self._iter_file_documents(list(pending), progress, manifest, bm25_index, pending)
+
+        try:
+            if self.vector_store_type == VectorStoreType.FAISS:
+                vector_store = self.vector_store.copy()
+                vector_store.remove_sources(removed)
+                total = vector_store.add_document_stream(documents, on_batch=progress.vectors_added)
+                if save and vector_store.index is not None:
+                    vector_store.save(self.index_dir)
+                self._swap_index(vector_store, bm25_index, manifest)
+            else:
+                total, added_ids = self._add_chroma_documents(documents, progress)
+                # The old chunks go when the new BM25 index and manifest come in
+                self._swap_index(None, bm25_index, manifest,
+                                 lambda: self.vector_store.remove_sources(removed, keep_ids=set(added_ids)))
+            if save:
+                manifest.save()
+                bm25_index.save(self._bm25_dir(), "bm25")
+            self._update_index_state()
+            return total
+        finally:
+            self.index_version += 1
+
+    def _add_chroma_documents(self, documents: Iterator[Dict[str, Any]],
+                              progress: IndexingProgress) -> Tuple[int, List[str]]:
+        """
+        Add new chunks to the ChromaDB collection, removing them again if adding fails.
+
+        Args:
+            documents: New chunks, with ids
+            progress: Progress to report the work done to
+
+        Returns:
+            Tuple of (number of chunks added, their ids)
+        """
+        added_ids = []
+
+        def track(documents):
+            for document in documents:
+                added_ids.append(document["id"])
+                yield document
+
+        try:
+            total = self.vector_store.add_document_stream(track(documents), on_batch=progress.vectors_added)
+        except Exception:
+            # Leave the collection as the manifest describes it
+            self.vector_store.remove_ids(added_ids)
+            raise
+        return total, added_ids
+
+    def _iter_file_documents(self, file_paths: List[str], progress: IndexingProgress,
+                             manifest: IndexManifest, bm25_index: BM25Index,
+                             content_hashes: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the chunks of PDF files into the ingestion pipeline.
+
+        This is the first stage of the streaming ingestion pipeline: files are
+        extracted in parallel, and as each one completes it is recorded in the
+        manifest and the BM25 index being built and its chunks are yielded,
+        tagged with their chunk ids, to be embedded and added to the index
+        downstream. Previous chunks of the files must have been removed before.
+
+        Args:
+            file_paths: Paths of the PDF files
+            progress: Progress to report the extracted files to
+            manifest: Manifest to record the files in
+            bm25_index: BM25 index to add the chunks to
+            content_hashes: Already computed content hashes by file path
+
+        Yields:
+            Document dictionaries with 'content', 'metadata' and 'id'
+        """
+        for file_path, documents in self.pdf_processor.iter_files(file_paths):
+            filename = os.path.basename(file_path)
+            if content_hashes and file_path in content_hashes:
+                content_hash = content_hashes[file_path]
+            else:
+                content_hash = file_content_hash(file_path)
+            chunk_ids = make_chunk_ids(filename, content_hash, len(documents))
+
+            manifest.record(file_path, content_hash, chunk_ids)
+            print(f"Indexing {len(documents)} document chunks from {filename}...")
+            progress.file_extracted(filename, len(documents))
+
+            for document, chunk_id in zip(documents, chunk_ids):
+                document["id"] = chunk_id
+            bm25_index.add(documents)
+            yield from documents
+
+    def sync_documents(self, progress: Optional[IndexingProgress] = None) -> int:
+        """
+        Bring the index in line with the PDF directory.
+
+        New and changed files are indexed incrementally and files that were
+        deleted from the PDF directory are removed from the index.
+
+        Args:
+            progress: Progress to report the work done to
+
+        Returns:
+            Number of document chunks added
+        """
+        progress = progress or IndexingProgress()
+        with self._index_lock:
+            embedded_before = progress.vectors_embedded
+            self._prepare_update(progress)
+            file_paths = self._list_pdfs()
+            present = {os.path.basename(path) for path in file_paths}
+            stale = [filename for filename in self.manifest.files if filename not in present]
+            self._index_files(file_paths, progress, stale)
+            return progress.vectors_embedded - embedded_before
 
-    def query(self, question: str) -> Dict[str, Any]:
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """
+        Tune the speed/recall trade-off of approximate FAISS searches.
+
+        Args:
+            nprobe: Number of IVF clusters visited per search
+            ef_search: Size of the HNSW candidate list per search
+        """
+        if nprobe is not None:
+            self.faiss_nprobe = nprobe
+        if ef_search is not None:
+            self.faiss_ef_search = ef_search
+        if self.vector_store_type == VectorStoreType.FAISS:
+            self.vector_store.set_search_params(nprobe=nprobe, ef_search=ef_search)
+
+    def query(self, question: str, ollama_client: Optional[OllamaClient] = None) -> Dict[str, Any]:
         """
         Process a query through the RAG system.
 
         Args:
             question: User question
+            ollama_client: Client to answer with, e.g. from an OllamaClientPool;
+                defaults to the system's client
 
         Returns:
             Dictionary with answer and retrieved documents
         """
+        ollama_client = ollama_client or self.ollama_client
+
         # Ensure documents are indexed
-        self.index_documents()
+        self.ensure_index_ready()
+
+        scope = self._answer_scope(ollama_client.model_name)
+        query_embedding = self._embed_question(question)
 
         # Search for relevant documents
-        retrieved_docs = self.vector_store.search(question, k=self.top_k)
+        retrieved_docs = self._search(question, query_embedding)
 
-        # Generate answer using RAG
-        answer = self.ollama_client.answer_with_rag(question, retrieved_docs)
+        # Reuse the answer to the same or a very similar question
+        cached = self._get_cached_answer(question, query_embedding, scope)
+        if cached is not None:
+            answer = "".join(cached)
+        else:
+            # Generate answer using RAG
+            answer = ollama_client.answer_with_rag(question, retrieved_docs)
+            self._cache_answer(question, [answer], query_embedding, scope)
 
         return {
             "question": question,
@@ -167,24 +793,193 @@ class RAGSystem:
             "vector_store_type": self.vector_store_type.value
         }
 
-    def stream_query(self, question: str):
+    def stream_query(self, question: str, retrieved_docs: Optional[List[Dict[str, Any]]] = None,
+                     ollama_client: Optional[OllamaClient] = None):
         """
         Process a query through the RAG system with streaming response.
 
+        If the same or a very similar question was answered recently, the
+        cached answer is replayed instead of generating it again.
+
+        Args:
+            question: User question
+            retrieved_docs: Documents already retrieved for the question, e.g. by
+                get_retrieved_docs; when omitted the vector store is searched
+            ollama_client: Client to answer with, e.g. from an OllamaClientPool;
+                defaults to the system's client
+
+        Yields:
+            Chunks of the generated answer
+        """
+        ollama_client = ollama_client or self.ollama_client
+        started_at = time.perf_counter()
+        cached, retrieved_docs, query_embedding, scope = self._prepare_answer(
+            question, retrieved_docs, ollama_client.model_name
+        )
+        try:
+            if cached is not None:
+                yield from cached
+                return
+
+            # Stream answer using RAG
+            chunks = []
+            for chunk in ollama_client.stream_answer_with_rag(question, retrieved_docs):
+                chunks.append(chunk)
+                yield chunk
+
+            self._cache_answer(question, chunks, query_embedding, scope)
+        finally:
+            self._observe_request(started_at, cached is not None)
+
+    async def astream_query(self, question: str, ollama_client: AsyncOllamaClient,
+                            retrieved_docs: Optional[List[Dict[str, Any]]] = None,
+                            model: Optional[str] = None,
+                            executor: Optional[Executor] = None) -> AsyncIterator[str]:
+        """
+        Process a query with a streaming response, for use in an event loop.
+
+        Loading the index, embedding the question and searching are blocking,
+        so they run in a thread pool; the answer is streamed with asyncio.
+
         Args:
             question: User question
+            ollama_client: Async client to stream the answer with
+            retrieved_docs: Documents already retrieved for the question; when
+                omitted the vector store is searched
+            model: Ollama model to answer with; defaults to the system's model
+            executor: Thread pool for the blocking steps; defaults to the
+                event loop's default executor
 
         Yields:
             Chunks of the generated answer
         """
+        model = model or self.ollama_client.model_name
+        started_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        cached, retrieved_docs, query_embedding, scope = await loop.run_in_executor(
+            executor, self._prepare_answer, question, retrieved_docs, model
+        )
+        try:
+            if cached is not None:
+                for chunk in cached:
+                    yield chunk
+                return
+
+            chunks = []
+            async for chunk in ollama_client.stream_answer_with_rag(question, retrieved_docs, model=model):
+                chunks.append(chunk)
+                yield chunk
+
+            self._cache_answer(question, chunks, query_embedding, scope)
+        finally:
+            self._observe_request(started_at, cached is not None)
+
+    def _observe_request(self, started_at: float, cached: bool) -> None:
+        """Record the duration of a streamed answer that started at started_at."""
+        REQUEST_DURATION.observe(time.perf_counter() - started_at,
+                                 system=self.vector_store_type.value, cached=str(cached).lower())
+
+    def _prepare_answer(self, question: str, retrieved_docs: Optional[List[Dict[str, Any]]] = None,
+                        model: Optional[str] = None) -> Tuple[Optional[List[str]], Optional[List[Dict[str, Any]]],
+                                                               Optional[np.ndarray], Dict[str, Any]]:
+        """
+        Do the work that precedes generating an answer.
+
+        Args:
+            question: User question
+            retrieved_docs: Documents already retrieved for the question, if any
+            model: Ollama model the answer is generated with
+
+        Returns:
+            Tuple of (cached answer chunks or None, retrieved documents,
+            query embedding, answer cache scope); the vector store is only
+            searched if there is no cached answer
+        """
         # Ensure documents are indexed
-        self.index_documents()
+        self.ensure_index_ready()
 
-        # Search for relevant documents
-        retrieved_docs = self.vector_store.search(question, k=self.top_k)
+        scope = self._answer_scope(model)
+        query_embedding = self._embed_question(question)
+
+        cached = self._get_cached_answer(question, query_embedding, scope)
+        if cached is not None:
+            print("Replaying cached answer")
+            return cached, retrieved_docs, query_embedding, scope
+
+        if retrieved_docs is None:
+            # Search for relevant documents
+            retrieved_docs = self._search(question, query_embedding)
+
+        return None, retrieved_docs, query_embedding, scope
+
+    def _answer_scope(self, model: Optional[str] = None) -> Dict[str, Any]:
+        """Describe what a generated answer depends on besides the question."""
+        return {
+            "llm_model": model or self.ollama_client.model_name,
+            "vector_store": self.vector_store_type.value,
+            "embedding_model": self.vector_store.embedding_model_name,
+            "top_k": self.top_k,
+            "hybrid_search": self.hybrid_search,
+            "index_version": self.index_version
+        }
+
+    def _embed_question(self, question: str) -> Optional[np.ndarray]:
+        """Embed a question for the answer cache, or return None if there is no answer cache."""
+        if self.answer_cache is None:
+            return None
+        return self.vector_store.embed_queries([question])[0]
+
+    def _search(self, question: str, query_embedding: Optional[np.ndarray]) -> List[Dict[str, Any]]:
+        """Search the vector store, reusing the question's embedding if it was already computed."""
+        with span("retrieval", self.vector_store_type.value), self._search_lock.read():
+            k = self._candidate_count(self.top_k)
+            if query_embedding is None:
+                dense = self.vector_store.search(question, k=k)
+            else:
+                dense = self.vector_store.search_by_embeddings(query_embedding.reshape(1, -1), k=k)[0]
+            return self._fuse(question, dense, self.top_k)
+
+    def _candidate_count(self, k: int) -> int:
+        """Get the number of dense results to fetch for k final results."""
+        return max(k, self.hybrid_candidates) if self.hybrid_search else k
+
+    def _fuse(self, question: str, dense: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """
+        Fuse vector search results with BM25 results for the question.
+
+        The BM25 search needs no embedding, so it adds no latency to the
+        query embedding path.
+
+        Args:
+            question: User question
+            dense: Vector search results, best first
+            k: Number of results to return
 
-        # Stream answer using RAG
-        yield from self.ollama_client.stream_answer_with_rag(question, retrieved_docs)
+        Returns:
+            Up to k fused results, best first
+        """
+        if not self.hybrid_search:
+            return dense[:k]
+        with span("bm25_search", "bm25"):
+            lexical = self.bm25_index.search(question, k=self._candidate_count(k))
+        return reciprocal_rank_fusion({"dense": dense, "bm25": lexical}, k=self.rrf_k, limit=k)
+
+    def _get_cached_answer(self, question: str, query_embedding: Optional[np.ndarray],
+                           scope: Dict[str, Any]) -> Optional[List[str]]:
+        """Look up the answer cache, if there is one."""
+        if self.answer_cache is None:
+            return None
+        with span("answer_cache_lookup", "answer_cache"):
+            return self.answer_cache.get(question, query_embedding, **scope)
+
+    def _cache_answer(self, question: str, chunks: List[str], query_embedding: Optional[np.ndarray],
+                      scope: Dict[str, Any]) -> None:
+        """Store a complete answer in the answer cache, unless generation failed."""
+        if self.answer_cache is None or not chunks:
+            return
+        if any(chunk.startswith("Error: ") for chunk in chunks):
+            return
+        self.answer_cache.put(question, chunks, query_embedding, **scope)
 
     def get_retrieved_docs(self, question: str) -> List[Dict[str, Any]]:
         """
@@ -197,10 +992,34 @@ class RAGSystem:
             List of retrieved documents
         """
         # Ensure documents are indexed
-        self.index_documents()
+        self.ensure_index_ready()
 
         # Search for relevant documents
-        return self.vector_store.search(question, k=self.top_k)
+        return self._search(question, None)
+
+    def search_batch(self, questions: List[str], k: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Get retrieved documents for several questions at once.
+
+        The questions are embedded in one request and searched together,
+        which is much faster than one search per question for evaluation
+        runs and bulk question answering.
+
+        Args:
+            questions: User questions
+            k: Number of documents to retrieve per question; defaults to top_k
+
+        Returns:
+            One list of retrieved documents per question
+        """
+        # Ensure documents are indexed
+        self.ensure_index_ready()
+
+        # Search for relevant documents
+        k = k or self.top_k
+        with self._search_lock.read():
+            dense = self.vector_store.search_batch(questions, k=self._candidate_count(k))
+            return [self._fuse(question, results, k) for question, results in zip(questions, dense)]
 
     def switch_vector_store(self, vector_store_type: VectorStoreType, embedding_model: str = None) -> None:
         """
@@ -221,28 +1040,37 @@ class RAGSystem:
             # Use current embedding model
             embedding_model_name = getattr(self.vector_store, "embedding_model_name", "nomic-embed-text")
 
-        # Initialize new vector store
-        if vector_store_type == VectorStoreType.FAISS:
-            self.vector_store = VectorStore(embedding_model_name=embedding_model_name)
-        else:
-            self.vector_store = ChromaStore(
-                embedding_model_name=embedding_model_name,
-                persist_directory=self.chroma_dir
-            )
+        with self._index_lock:
+            # Initialize new vector store
+            vector_store = self._create_vector_store(vector_store_type, embedding_model_name)
 
-        # Update vector store type
-        self.vector_store_type = vector_store_type
+            # Update vector store type; searches wait for the index of the new store
+            with self._search_lock.write():
+                self.vector_store = vector_store
+                self.vector_store_type = vector_store_type
+                self.manifest = self._create_manifest()
+                self.bm25_index = BM25Index()
+                self.index_state = IndexState.UNLOADED
 
-        # Load or create index
-        self.index_documents()
+            # Load or create index
+            self.index_documents()
 
-    def add_pdf(self, pdf_path: str, reindex: bool = True) -> None:
+    def add_pdf(self, pdf_path: str, reindex: bool = True, background: bool = False) -> Optional[str]:
         """
         Add a new PDF to the system.
 
+        Only the new file is extracted and embedded; the existing vectors
+        stay in place.
+
         Args:
             pdf_path: Path to the PDF file
-            reindex: Whether to reindex after adding
+            reindex: Whether to index the file after adding
+            background: Whether to submit the indexing to the job queue and
+                return right away instead of indexing in the calling thread
+
+        Returns:
+            Id of the indexing job if the file is indexed in the background,
+            otherwise None
         """
         # Copy PDF to the PDF directory if it's not already there
         filename = os.path.basename(pdf_path)
@@ -253,5 +1081,12 @@ class RAGSystem:
             shutil.copy2(pdf_path, target_path)
             print(f"Copied {pdf_path} to {target_path}")
 
+        if reindex and background:
+            return self._submit_job(
+                "add_pdf",
+                f"Index {filename} with {self.vector_store_type.value}",
+                lambda job_progress: self.index_file(target_path, progress=job_progress)
+            )
         if reindex:
-            self.index_documents(force_reindex=True)
+            self.index_file(target_path)
+        return None
@@ -0,0 +1,58 @@
+"""
+Read-Write Lock Module for RAG System.
+This module provides a lock that many searches can hold at once, while an
+indexing run takes it alone for the short moment it swaps in a new index.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+class ReadWriteLock:
+    """Class for a lock held by any number of readers or by one writer."""
+
+    def __init__(self):
+        """Initialize the lock, unheld."""
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """
+        Hold the lock for reading.
+
+        Readers wait while a writer holds the lock or waits for it, so a
+        steady stream of searches cannot starve a writer. A thread must not
+        take the read lock again while it holds it.
+        """
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Hold the lock alone, once the current readers are done."""
+        with self._condition:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._condition.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
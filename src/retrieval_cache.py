@@ -0,0 +1,92 @@
+"""
+Retrieval Cache Module for RAG System.
+This module keeps the documents retrieved for a question for a short time, so
+that a follow-up streaming request can reuse them instead of searching again.
+"""
+
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+class RetrievalCache:
+    """Class for holding retrieval results under short-lived handles."""
+
+    def __init__(self, ttl_seconds: float = 120.0, max_entries: int = 1024):
+        """
+        Initialize the retrieval cache.
+
+        Args:
+            ttl_seconds: Number of seconds a retrieval result stays available
+            max_entries: Maximum number of results to hold; the oldest are dropped first
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, question: str, documents: List[Dict[str, Any]], **scope: Any) -> str:
+        """
+        Store the documents retrieved for a question.
+
+        Args:
+            question: Question the documents were retrieved for
+            documents: Retrieved documents
+            **scope: Extra values that must match when the result is reused,
+                e.g. the active system or vector store type
+
+        Returns:
+            Handle under which the result can be fetched
+        """
+        handle = uuid.uuid4().hex
+        now = time.monotonic()
+
+        with self._lock:
+            self._purge(now)
+            self._entries[handle] = {
+                "question": question,
+                "documents": documents,
+                "scope": scope,
+                "expires_at": now + self.ttl_seconds
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return handle
+
+    def get(self, handle: Optional[str], question: str, **scope: Any) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetch the documents stored under a handle.
+
+        Args:
+            handle: Handle returned by put
+            question: Question the caller is answering
+            **scope: Values that must match the ones the result was stored with
+
+        Returns:
+            The retrieved documents, or None if the handle is unknown, expired
+            or was stored for a different question or scope
+        """
+        if not handle:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                return None
+            if entry["expires_at"] < time.monotonic():
+                del self._entries[handle]
+                return None
+            if entry["question"] != question or entry["scope"] != scope:
+                return None
+            return entry["documents"]
+
+    def _purge(self, now: float) -> None:
+        """Drop expired entries. Caller holds the lock."""
+        # Entries are inserted in expiry order, so stop at the first live one
+        while self._entries:
+            handle, entry = next(iter(self._entries.items()))
+            if entry["expires_at"] >= now:
+                break
+            del self._entries[handle]
@@ -0,0 +1,222 @@
+"""
+Server-Sent Events Module for RAG System.
+This module turns a stream of answer chunks, from a generator or an async
+generator, into Server-Sent Events, with optional coalescing of small chunks
+and heartbeats on idle connections.
+"""
+
+import time
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+
+def format_event(data: str, event: Optional[str] = None) -> str:
+    """
+    Format one Server-Sent Event.
+
+    Every line of the data gets its own 'data:' field, so chunks that
+    contain newlines arrive intact; the browser joins the fields with '\\n'.
+
+    Args:
+        data: Event data
+        event: Optional event type; omitted for plain 'message' events
+
+    Returns:
+        The encoded event, terminated by a blank line
+    """
+    lines = data.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    prefix = f"event: {event}\n" if event else ""
+    return prefix + "".join(f"data: {line}\n" for line in lines) + "\n"
+
+def format_comment(text: str = "") -> str:
+    """
+    Format an SSE comment, which keeps the connection alive and is ignored by EventSource.
+
+    Args:
+        text: Comment text
+
+    Returns:
+        The encoded comment
+    """
+    return f": {text}\n\n"
+
+_END = object()
+
+class _Failure:
+    """Exception raised by the chunk producer, handed over to the consumer."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+class _EventBuffer:
+    """Coalescing and heartbeat bookkeeping shared by the blocking and asyncio event loops."""
+
+    def __init__(self, coalesce_interval: float, max_buffer_size: int, heartbeat_interval: Optional[float]):
+        self.coalesce_interval = coalesce_interval
+        self.max_buffer_size = max_buffer_size
+        self.heartbeat_interval = heartbeat_interval
+        self.buffer: List[str] = []
+        self.buffered_size = 0
+        self.buffered_at = 0.0
+        self.last_sent = time.monotonic()
+
+    def timeout(self) -> Optional[float]:
+        """Number of seconds to wait for the next chunk before something is due, or None to wait forever."""
+        deadlines = []
+        if self.buffer:
+            deadlines.append(self.buffered_at + self.coalesce_interval)
+        if self.heartbeat_interval is not None:
+            deadlines.append(self.last_sent + self.heartbeat_interval)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def flush(self) -> Optional[str]:
+        """Encode the buffered chunks as one event, if there are any."""
+        if not self.buffer:
+            return None
+        event = format_event("".join(self.buffer))
+        self.buffer, self.buffered_size, self.last_sent = [], 0, time.monotonic()
+        return event
+
+    def add(self, chunk: str) -> Optional[str]:
+        """Buffer a chunk, returning an event if the buffer is due to be sent."""
+        if not chunk:
+            return None
+        if not self.buffer:
+            self.buffered_at = time.monotonic()
+        self.buffer.append(chunk)
+        self.buffered_size += len(chunk)
+        if self.coalesce_interval <= 0 or self.buffered_size >= self.max_buffer_size:
+            return self.flush()
+        return None
+
+    def expire(self) -> Optional[str]:
+        """Return the event or heartbeat that is due after waiting timed out."""
+        now = time.monotonic()
+        if self.buffer and now - self.buffered_at >= self.coalesce_interval:
+            return self.flush()
+        if self.heartbeat_interval is not None and now - self.last_sent >= self.heartbeat_interval:
+            self.last_sent = now
+            return format_comment("heartbeat")
+        return None
+
+def stream_events(chunks: Iterable[str],
+                  coalesce_interval: float = 0.0,
+                  max_buffer_size: int = 1024,
+                  heartbeat_interval: Optional[float] = None) -> Iterator[str]:
+    """
+    Encode a stream of text chunks as Server-Sent Events.
+
+    Chunks are sent as soon as they are produced. With a coalescing interval,
+    chunks produced within that interval of the first buffered one are sent
+    as a single event, which cuts the per-event overhead of token-sized
+    chunks. With a heartbeat interval, a comment is sent whenever nothing
+    else was sent for that long, e.g. while the model is being loaded.
+
+    A blocking iterator cannot be interrupted without a thread per stream,
+    so chunks are coalesced as they arrive: held-back chunks are sent with
+    the first chunk arriving after the coalescing interval, or at the end.
+    Heartbeats are likewise only sent when the iterator yields an empty
+    chunk after being idle for the heartbeat interval; a source that blocks
+    while the model loads, like OllamaClient.stream_answer_with_rag, gets
+    none. astream_events wakes up on time instead, so heartbeats need the
+    ASGI server.
+
+    Args:
+        chunks: Text chunks, e.g. from stream_query
+        coalesce_interval: Maximum number of seconds a chunk is held back to
+            be merged with the following ones; 0 sends every chunk right away
+        max_buffer_size: Number of buffered characters that triggers sending
+            before the coalescing interval has passed
+        heartbeat_interval: Number of idle seconds after which a heartbeat
+            comment is sent, or None for no heartbeats
+
+    Yields:
+        Encoded events
+    """
+    if coalesce_interval <= 0 and heartbeat_interval is None:
+        for chunk in chunks:
+            if chunk:
+                yield format_event(chunk)
+        return
+
+    events = _EventBuffer(coalesce_interval, max_buffer_size, heartbeat_interval)
+    iterator = iter(chunks)
+    try:
+        for chunk in iterator:
+            event = events.add(chunk) or events.expire()
+            if event:
+                yield event
+        event = events.flush()
+        if event:
+            yield event
+    finally:
+        # The client went away or the stream ended; let the source stop
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+async def astream_events(chunks: AsyncIterable[str],
+                         coalesce_interval: float = 0.0,
+                         max_buffer_size: int = 1024,
+                         heartbeat_interval: Optional[float] = None) -> AsyncIterator[str]:
+    """
+    Encode an async stream of text chunks as Server-Sent Events.
+
+    Works like stream_events, for use in an event loop; chunks are read by
+    a task, so held-back chunks and heartbeats are sent on time even while
+    the next chunk is awaited.
+
+    Args:
+        chunks: Async iterable of text chunks, e.g. from astream_query
+        coalesce_interval: Maximum number of seconds a chunk is held back to
+            be merged with the following ones; 0 sends every chunk right away
+        max_buffer_size: Number of buffered characters that triggers sending
+            before the coalescing interval has passed
+        heartbeat_interval: Number of idle seconds after which a heartbeat
+            comment is sent, or None for no heartbeats
+
+    Yields:
+        Encoded events
+    """
+    if coalesce_interval <= 0 and heartbeat_interval is None:
+        async for chunk in chunks:
+            if chunk:
+                yield format_event(chunk)
+        return
+
+    items: "asyncio.Queue[Any]" = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for chunk in chunks:
+                await items.put(chunk)
+            await items.put(_END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await items.put(_Failure(e))
+
+    producer = asyncio.create_task(produce())
+    events = _EventBuffer(coalesce_interval, max_buffer_size, heartbeat_interval)
+
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(items.get(), events.timeout())
+            except asyncio.TimeoutError:
+                event = events.expire()
+            else:
+                if item is _END or isinstance(item, _Failure):
+                    event = events.flush()
+                    if event:
+                        yield event
+                    if isinstance(item, _Failure):
+                        raise item.error
+                    return
+                event = events.add(item)
+            if event:
+                yield event
+    finally:
+        # The client went away or the stream ended; stop reading chunks
+        producer.cancel()
@@ -4,28 +4,125 @@ This module handles vector embeddings and FAISS database operations.
 """
 
 import os
+import copy
+import enum
+import json
+import math
 import pickle
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Callable
 
 import numpy as np
 import faiss
-from langchain_community.embeddings import OllamaEmbeddings
+
+from src.document_store import DocumentStore
+from src.embedding_cache import DEFAULT_CACHE_PATH, get_cached_embeddings
+from src.embedding_pipeline import EmbeddingPipeline, LEGACY_EMBEDDING_FORMAT, embedding_format
+from src.ollama_transport import DEFAULT_API_BASE
+from src.metrics import span
+
+class FaissIndexType(enum.Enum):
+    """Enum for FAISS index types."""
+    FLAT = "flat"
+    IVF_FLAT = "ivf_flat"
+    IVF_PQ = "ivf_pq"
+    HNSW = "hnsw"
+    AUTO = "auto"
+
+# Corpus sizes at which the automatic index type switches to an approximate index
+AUTO_IVF_FLAT_THRESHOLD = 50_000
+AUTO_IVF_PQ_THRESHOLD = 1_000_000
+
+def choose_index_type(num_vectors: int) -> FaissIndexType:
+    """
+    Choose a FAISS index type for a corpus size.
+    
+    Small corpora use an exact flat index, medium ones IVF-Flat, and very
+    large ones IVF-PQ, which also compresses the vectors.
+    
+    Args:
+        num_vectors: Expected number of vectors in the index
+        
+    Returns:
+        The index type to build
+    """
+    if num_vectors < AUTO_IVF_FLAT_THRESHOLD:
+        return FaissIndexType.FLAT
+    if num_vectors < AUTO_IVF_PQ_THRESHOLD:
+        return FaissIndexType.IVF_FLAT
+    return FaissIndexType.IVF_PQ
 
 class VectorStore:
     """Class for managing vector embeddings and FAISS database."""
     
-    def __init__(self, embedding_model_name: str = "nomic-embed-text"):
+    def __init__(self,
+                 embedding_model_name: str = "nomic-embed-text",
+                 embedding_cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 embeddings: Optional[Any] = None,
+                 embedding_batch_size: int = 64,
+                 embedding_workers: int = 4,
+                 embedding_max_in_flight: Optional[int] = None,
+                 index_type: FaissIndexType = FaissIndexType.FLAT,
+                 nlist: Optional[int] = None,
+                 nprobe: int = 16,
+                 pq_m: Optional[int] = None,
+                 hnsw_m: int = 32,
+                 ef_search: int = 64,
+                 train_sample_size: int = AUTO_IVF_FLAT_THRESHOLD,
+                 expected_size: Optional[int] = None,
+                 mmap: bool = False,
+                 api_base: str = DEFAULT_API_BASE):
         """
         Initialize the vector store.
         
         Args:
             embedding_model_name: Name of the Ollama embedding model to use
+            embedding_cache_path: Path of the shared embedding cache, or None to disable it
+            embeddings: Optional embeddings object to use instead of the Ollama model
+            embedding_batch_size: Number of chunks sent per embeddings request
+            embedding_workers: Number of embeddings requests run concurrently
+            embedding_max_in_flight: Maximum number of batches being embedded
+                ahead of the one being added to the index
+            index_type: Type of FAISS index to build; AUTO chooses by corpus size
+            nlist: Number of IVF clusters; defaults to about 4 * sqrt(corpus size)
+            nprobe: Number of IVF clusters visited per search
+            pq_m: Number of PQ sub-quantizers for IVF-PQ; defaults to a divisor
+                of the dimension giving 16-dimensional sub-vectors or wider
+            hnsw_m: Number of graph neighbours per node for HNSW
+            ef_search: Size of the HNSW candidate list per search
+            train_sample_size: Number of vectors buffered to train IVF indexes
+            expected_size: Optional hint of the final corpus size, used by AUTO
+                and to size nlist when the corpus is larger than the training sample
+            mmap: Whether load() memory-maps the index file read-only instead of
+                copying it into memory, so processes share the same pages
+            api_base: Base URL for the Ollama API computing the embeddings
         """
         self.embedding_model_name = embedding_model_name
-        self.embeddings = OllamaEmbeddings(model=embedding_model_name)
+        self.embedding_cache_path = embedding_cache_path
+        self.api_base = api_base
+        self.embeddings = embeddings or get_cached_embeddings(embedding_model_name, embedding_cache_path, api_base)
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_workers = embedding_workers
+        self.embedding_max_in_flight = embedding_max_in_flight
+        self.index_type = FaissIndexType(index_type)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.train_sample_size = train_sample_size
+        self.expected_size = expected_size
+        self.mmap = mmap
         self.index = None
-        self.documents = []
+        self.built_index_type = None
+        self.documents = DocumentStore()
         self.dimension = None
+        # Embedding format version of the vectors in the index
+        self.embedding_format = embedding_format(self.embeddings)
+        # Path of the index file while the index is a read-only memory map of it
+        self._mmap_path: Optional[str] = None
+        # Vectors waiting for an index that needs training before they can be added
+        self._pending_vectors: List[np.ndarray] = []
+        self._pending_count = 0
     
     def _get_embeddings(self, texts: List[str]) -> np.ndarray:
         """
@@ -40,25 +137,317 @@ class VectorStore:
         embeddings = self.embeddings.embed_documents(texts)
         return np.array(embeddings, dtype=np.float32)
     
-    def create_index(self, documents: List[Dict[str, Any]]) -> None:
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed search queries, using the in-process query embedding cache when available.
+        
+        Args:
+            queries: Query strings
+            
+        Returns:
+            NumPy array with one embedding row per query
+        """
+        with span("query_embedding", "faiss"):
+            if hasattr(self.embeddings, "embed_queries"):
+                return np.asarray(self.embeddings.embed_queries(queries), dtype=np.float32)
+            return np.asarray(self.embeddings.embed_documents(queries), dtype=np.float32)
+    
+    def _embedding_pipeline(self) -> EmbeddingPipeline:
+        """Create a batched embedding pipeline for the current embeddings object."""
+        return EmbeddingPipeline(
+            self.embeddings,
+            batch_size=self.embedding_batch_size,
+            max_workers=self.embedding_workers,
+            max_in_flight=self.embedding_max_in_flight
+        )
+    
+    def clear(self) -> None:
+        """Remove all documents and the index from memory."""
+        self.index = None
+        self._mmap_path = None
+        self.built_index_type = None
+        self.documents = DocumentStore()
+        self.dimension = None
+        self.embedding_format = embedding_format(self.embeddings)
+        self._pending_vectors = []
+        self._pending_count = 0
+    
+    def copy(self) -> "VectorStore":
+        """
+        Copy the store, so the copy can be modified while the original is searched.
+        
+        The copy holds its own in-memory index, so while it is modified the
+        vectors are in memory twice.
+        
+        Returns:
+            The copy
+        """
+        store = copy.copy(self)
+        if self._mmap_path is not None:
+            store.index = faiss.read_index(self._mmap_path)
+        elif self.index is not None:
+            store.index = faiss.clone_index(self.index)
+        store._mmap_path = None
+        store.documents = self.documents.copy()
+        store._pending_vectors = list(self._pending_vectors)
+        store.set_search_params()
+        return store
+    
+    def is_outdated(self) -> bool:
+        """
+        Check whether the index holds vectors of another embedding format than the embedder produces.
+        
+        Such vectors cannot be compared with new query embeddings, so the
+        documents must be embedded again.
+        
+        Returns:
+            True if the index must be rebuilt
+        """
+        current = embedding_format(self.embeddings)
+        return self.index is not None and current is not None and self.embedding_format != current
+    
+    def _build_index(self, index_type: FaissIndexType, train_vectors: np.ndarray) -> None:
+        """
+        Create (and train, if needed) an empty FAISS index.
+        
+        Args:
+            index_type: Type of index to build; must not be AUTO
+            train_vectors: Vectors to train IVF indexes on
+        """
+        num_train = len(train_vectors)
+        expected = max(num_train, self.expected_size or 0)
+        
+        if index_type in (FaissIndexType.IVF_FLAT, FaissIndexType.IVF_PQ):
+            # FAISS needs about 39 training points per cluster
+            nlist = self.nlist or int(4 * math.sqrt(expected))
+            nlist = min(nlist, num_train // 39)
+            if nlist < 2:
+                print(f"Too few vectors ({num_train}) to train an IVF index, using a flat index")
+                index_type = FaissIndexType.FLAT
+        if index_type == FaissIndexType.IVF_PQ and num_train < 39 * 256:
+            print(f"Too few vectors ({num_train}) to train PQ codebooks, using IVF-Flat")
+            index_type = FaissIndexType.IVF_FLAT
+        
+        if index_type == FaissIndexType.FLAT:
+            self.index = faiss.IndexFlatL2(self.dimension)
+        elif index_type == FaissIndexType.HNSW:
+            self.index = faiss.IndexHNSWFlat(self.dimension, self.hnsw_m)
+        else:
+            quantizer = faiss.IndexFlatL2(self.dimension)
+            if index_type == FaissIndexType.IVF_FLAT:
+                self.index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist)
+            else:
+                pq_m = self.pq_m or next(
+                    m for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1)
+                    if self.dimension % m == 0 and self.dimension // m >= 16 or m == 1
+                )
+                self.index = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, pq_m, 8)
+            print(f"Training {index_type.value} index with {nlist} clusters on {num_train} vectors...")
+            self.index.train(train_vectors)
+        
+        self.built_index_type = index_type
+        self.set_search_params()
+    
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """
+        Set the speed/recall trade-off of approximate searches.
+        
+        Args:
+            nprobe: Number of IVF clusters visited per search
+            ef_search: Size of the HNSW candidate list per search
+        """
+        if nprobe is not None:
+            self.nprobe = nprobe
+        if ef_search is not None:
+            self.ef_search = ef_search
+        
+        if self.index is None:
+            return
+        if isinstance(self.index, faiss.IndexIVF):
+            self.index.nprobe = min(self.nprobe, self.index.nlist)
+        elif isinstance(self.index, faiss.IndexHNSW):
+            self.index.hnsw.efSearch = self.ef_search
+    
+    def _ensure_writable(self) -> None:
+        """Replace a read-only memory-mapped index with a private in-memory copy before modifying it."""
+        if self._mmap_path is None:
+            return
+        print("Loading a writable copy of the memory-mapped FAISS index...")
+        self.index = faiss.read_index(self._mmap_path)
+        self._mmap_path = None
+        self.set_search_params()
+    
+    def _flush_pending(self) -> None:
+        """Build the index from the buffered vectors and add them to it."""
+        if not self._pending_vectors:
+            return
+        
+        vectors = np.vstack(self._pending_vectors)
+        self._pending_vectors = []
+        self._pending_count = 0
+        
+        self._ensure_writable()
+        if self.index is None:
+            index_type = self.index_type
+            if index_type == FaissIndexType.AUTO:
+                index_type = choose_index_type(max(len(vectors), self.expected_size or 0))
+            self._build_index(index_type, vectors)
+        
+        self.index.add(vectors)
+    
+    def finalize(self) -> None:
+        """Finish an ingestion run, adding any vectors still buffered for training."""
+        self._flush_pending()
+    
+    def create_index(self, documents: Iterable[Dict[str, Any]],
+                     on_batch: Optional[Callable[[int], None]] = None) -> None:
         """
         Create a FAISS index from documents.
         
+        Args:
+            documents: Documents with 'content' and 'metadata'; may be a generator
+            on_batch: Function called with the size of each batch added to the index
+        """
+        self.clear()
+        self.add_document_stream(documents, on_batch)
+        
+        index_type = self.built_index_type.value if self.built_index_type else "no"
+        print(f"Created {index_type} FAISS index with {len(self.documents)} documents and dimension {self.dimension}")
+    
+    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        Add documents to the FAISS index, keeping the existing vectors in place.
+        
         Args:
             documents: List of document dictionaries with 'content' and 'metadata'
         """
-        self.documents = documents
-        texts = [doc["content"] for doc in documents]
+        if not documents:
+            return
         
-        # Get embeddings
-        embeddings = self._get_embeddings(texts)
-        self.dimension = embeddings.shape[1]
+        self.add_document_stream(documents)
         
-        # Create FAISS index
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.index.add(embeddings)
+        print(f"Added {len(documents)} documents to FAISS index ({len(self.documents)} total)")
+    
+    def add_document_stream(self, documents: Iterable[Dict[str, Any]],
+                            on_batch: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Embed a stream of documents and add them to the index as batches complete.
         
-        print(f"Created FAISS index with {len(documents)} documents and dimension {self.dimension}")
+        Documents are consumed lazily and each batch of vectors is added to
+        the index as soon as it is embedded, so neither the whole corpus nor
+        the full embedding matrix is held in memory at once.
+        
+        Args:
+            documents: Documents with 'content' and 'metadata'; may be a generator
+            on_batch: Function called with the size of each batch added to the index
+            
+        Returns:
+            Number of documents added
+        """
+        added = 0
+        for batch, embeddings in self._embedding_pipeline().iter_embedded(documents):
+            self.add_embedded(batch, embeddings)
+            added += len(batch)
+            if on_batch is not None:
+                on_batch(len(batch))
+        self.finalize()
+        return added
+    
+    def add_embedded(self, documents: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        """
+        Add documents whose embeddings have already been computed.
+        
+        Indexes that need training buffer their first train_sample_size
+        vectors, are trained on them and then receive vectors directly. Call
+        finalize() after the last batch.
+        
+        Args:
+            documents: List of document dictionaries with 'content' and 'metadata'
+            embeddings: NumPy array with one embedding row per document
+        """
+        if self.dimension is None:
+            self.dimension = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dimension:
+            raise ValueError(
+                f"Embedding dimension {embeddings.shape[1]} does not match index dimension {self.dimension}"
+            )
+        
+        self.documents.append(documents)
+        
+        if self.index is None and self.index_type in (FaissIndexType.FLAT, FaissIndexType.HNSW):
+            # These index types need no training, so create them right away
+            self._build_index(self.index_type, embeddings[:0])
+        
+        if self.index is not None:
+            self._ensure_writable()
+            self.index.add(embeddings)
+            return
+        
+        self._pending_vectors.append(embeddings)
+        self._pending_count += len(embeddings)
+        if self._pending_count >= self.train_sample_size:
+            self._flush_pending()
+    
+    def iter_documents(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the indexed documents in index order.
+        
+        Yields:
+            Document dictionaries with 'content' and 'metadata'
+        """
+        return self.documents.iter_documents()
+    
+    def remove_source(self, source: str) -> int:
+        """
+        Remove all documents that were extracted from a given source file.
+        
+        Args:
+            source: Source filename as stored in the document metadata
+            
+        Returns:
+            Number of documents removed
+        """
+        return self.remove_sources([source])
+    
+    def remove_sources(self, sources: Iterable[str]) -> int:
+        """
+        Remove all documents that were extracted from any of the given source files.
+        
+        All sources are removed in one pass, so an approximate index is
+        rebuilt at most once however many files changed.
+        
+        Args:
+            sources: Source filenames as stored in the document metadata
+            
+        Returns:
+            Number of documents removed
+        """
+        if self.index is None:
+            return 0
+        
+        sources = sorted(set(sources))
+        positions = sorted({
+            position for source in sources for position in self.documents.positions_for_source(source)
+        })
+        if not positions:
+            return 0
+        
+        self._ensure_writable()
+        if isinstance(self.index, faiss.IndexFlat):
+            # IndexFlat compacts its storage on removal, so the remaining vectors
+            # keep the same order as the remaining documents
+            self.index.remove_ids(np.array(positions, dtype=np.int64))
+            self.documents.remove(positions)
+        else:
+            # Approximate indexes keep gaps on removal (or do not support it),
+            # so rebuild them; the embeddings come from the embedding cache
+            print(f"Rebuilding {self.built_index_type.value} FAISS index without {len(sources)} source(s)...")
+            remaining = self.documents.iter_documents(skip=positions)
+            self.clear()
+            self.add_document_stream(remaining)
+        
+        print(f"Removed {len(positions)} documents from {len(sources)} source(s) from FAISS index")
+        return len(positions)
     
     def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """
@@ -71,26 +460,60 @@ class VectorStore:
         Returns:
             List of document dictionaries with similarity scores
         """
+        return self.search_batch([query], k)[0]
+    
+    def search_batch(self, queries: List[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search the vector store for several queries at once.
+        
+        All queries are embedded with one embeddings request and searched
+        with a single matrix search of the FAISS index.
+        
+        Args:
+            queries: Query strings
+            k: Number of results to return per query
+            
+        Returns:
+            One list of document dictionaries with similarity scores per query
+        """
         if self.index is None:
             raise ValueError("Index has not been created yet")
+        if not queries:
+            return []
         
-        # Get query embedding
-        query_embedding = self._get_embeddings([query])
+        return self.search_by_embeddings(self.embed_queries(queries), k)
+    
+    def search_by_embeddings(self, query_embeddings: np.ndarray, k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search the vector store with already computed query embeddings.
         
-        # Search FAISS index
-        distances, indices = self.index.search(query_embedding, k)
+        Args:
+            query_embeddings: NumPy array with one query embedding per row
+            k: Number of results to return per query
+            
+        Returns:
+            One list of document dictionaries with similarity scores per query
+        """
+        if self.index is None:
+            raise ValueError("Index has not been created yet")
         
-        # Get results
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.documents):  # Ensure index is valid
-                results.append({
-                    "content": self.documents[idx]["content"],
-                    "metadata": self.documents[idx]["metadata"],
-                    "score": float(distances[0][i])
-                })
+        with span("vector_search", "faiss"):
+            # Search FAISS index
+            query_embeddings = np.ascontiguousarray(query_embeddings, dtype=np.float32).reshape(-1, self.dimension)
+            distances, indices = self.index.search(query_embeddings, k)
+            
+            # Get results
+            all_results = []
+            for row_distances, row_indices in zip(distances, indices):
+                results = []
+                for distance, idx in zip(row_distances, row_indices):
+                    if 0 <= idx < len(self.documents):  # Ensure index is valid
+                        document = self.documents.get(int(idx))
+                        document["score"] = float(distance)
+                        results.append(document)
+                all_results.append(results)
         
-        return results
+        return all_results
     
     def save(self, directory_path: str, name: str = "faiss_index") -> None:
         """
@@ -100,52 +523,132 @@ class VectorStore:
             directory_path: Directory to save the index
             name: Base name for the saved files
         """
+        self._flush_pending()
         if self.index is None:
             raise ValueError("Index has not been created yet")
         
         os.makedirs(directory_path, exist_ok=True)
         
-        # Save FAISS index
+        # Save documents
+        self.documents.save(directory_path, name)
+        
+        # Save FAISS index. Files are written under a temporary name and renamed
+        # into place, so processes that memory-map the old file keep a valid mapping
         index_path = os.path.join(directory_path, f"{name}.index")
-        faiss.write_index(self.index, index_path)
+        faiss.write_index(self.index, f"{index_path}.tmp")
+        os.replace(f"{index_path}.tmp", index_path)
         
-        # Save documents and metadata
-        docs_path = os.path.join(directory_path, f"{name}.pkl")
-        with open(docs_path, 'wb') as f:
-            pickle.dump({
-                "documents": self.documents,
+        # Save metadata last, it marks the saved files as complete
+        meta_path = os.path.join(directory_path, f"{name}.json")
+        self._save_metadata(meta_path)
+        
+        # Serve documents from the saved files rather than from memory
+        self.documents = DocumentStore.load(directory_path, name)
+        
+        print(f"Saved index to {index_path} and documents to {directory_path}")
+    
+    def _save_metadata(self, meta_path: str) -> None:
+        """Write the store's metadata file."""
+        with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({
                 "dimension": self.dimension,
-                "embedding_model": self.embedding_model_name
-            }, f)
+                "embedding_model": self.embedding_model_name,
+                "embedding_format": self.embedding_format,
+                "index_type": self.built_index_type.value
+            }, f, indent=2)
+        os.replace(f"{meta_path}.tmp", meta_path)
+    
+    def _migrate_legacy_pickle(self, directory_path: str, name: str) -> None:
+        """
+        Convert documents saved by older versions as a pickled list to the document store format.
         
-        print(f"Saved index to {index_path} and documents to {docs_path}")
+        Args:
+            directory_path: Directory containing the saved index
+            name: Base name of the saved files
+        """
+        docs_path = os.path.join(directory_path, f"{name}.pkl")
+        print(f"Migrating {docs_path} to the document store format...")
+        
+        with open(docs_path, 'rb') as f:
+            data = pickle.load(f)
+        
+        documents = DocumentStore()
+        documents.append(data["documents"])
+        documents.save(directory_path, name)
+        
+        self.dimension = data["dimension"]
+        self.embedding_model_name = data.get("embedding_model", self.embedding_model_name)
+        self.embedding_format = LEGACY_EMBEDDING_FORMAT
+        self.built_index_type = FaissIndexType(data.get("index_type", FaissIndexType.FLAT.value))
+        self._save_metadata(os.path.join(directory_path, f"{name}.json"))
+        os.remove(docs_path)
     
-    def load(self, directory_path: str, name: str = "faiss_index") -> None:
+    def load(self, directory_path: str, name: str = "faiss_index", mmap: Optional[bool] = None) -> None:
         """
         Load a FAISS index and documents from disk.
         
+        Documents are memory-mapped and only read when a search returns them.
+        
         Args:
             directory_path: Directory containing the saved index
             name: Base name of the saved files
+            mmap: Whether to memory-map the index read-only; defaults to the
+                store's mmap setting. A memory-mapped index is loaded almost
+                instantly, its pages are shared by all processes that map the
+                same file, and it is copied into memory only if it is modified.
         """
         index_path = os.path.join(directory_path, f"{name}.index")
-        docs_path = os.path.join(directory_path, f"{name}.pkl")
+        meta_path = os.path.join(directory_path, f"{name}.json")
         
-        if not os.path.exists(index_path) or not os.path.exists(docs_path):
-            raise FileNotFoundError(f"Index or documents file not found in {directory_path}")
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"Index file not found in {directory_path}")
+        if not os.path.exists(meta_path) and os.path.exists(os.path.join(directory_path, f"{name}.pkl")):
+            self._migrate_legacy_pickle(directory_path, name)
+        if not os.path.exists(meta_path) or not DocumentStore.exists(directory_path, name):
+            raise FileNotFoundError(f"Documents file not found in {directory_path}")
+        
+        # Load documents and metadata
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.documents = DocumentStore.load(directory_path, name)
+        self.dimension = data["dimension"]
+        self.embedding_model_name = data.get("embedding_model", self.embedding_model_name)
+        self.embedding_format = data.get("embedding_format", LEGACY_EMBEDDING_FORMAT)
+        self.built_index_type = FaissIndexType(data.get("index_type", FaissIndexType.FLAT.value))
+        
+        # Reinitialize embeddings if model changed
+        if self.embedding_model_name != self.embeddings.model:
+            self.embeddings = get_cached_embeddings(self.embedding_model_name, self.embedding_cache_path,
+                                                    self.api_base)
         
         # Load FAISS index
-        self.index = faiss.read_index(index_path)
+        mmap = self.mmap if mmap is None else mmap
+        io_flags = self._mmap_io_flags(self.built_index_type) if mmap else 0
+        self.index = faiss.read_index(index_path, io_flags)
+        self._mmap_path = index_path if io_flags else None
+        self._pending_vectors = []
+        self._pending_count = 0
+        self.set_search_params()
         
-        # Load documents and metadata
-        with open(docs_path, 'rb') as f:
-            data = pickle.load(f)
-            self.documents = data["documents"]
-            self.dimension = data["dimension"]
-            self.embedding_model_name = data.get("embedding_model", self.embedding_model_name)
-            
-            # Reinitialize embeddings if model changed
-            if self.embedding_model_name != self.embeddings.model:
-                self.embeddings = OllamaEmbeddings(model=self.embedding_model_name)
+        mode = "memory-mapped " if io_flags else ""
+        print(f"Loaded {mode}index with {len(self.documents)} documents and dimension {self.dimension}")
+    
+    @staticmethod
+    def _mmap_io_flags(index_type: FaissIndexType) -> int:
+        """
+        Get the FAISS IO flags that memory-map an index of the given type.
+        
+        IVF indexes map their inverted lists; flat and HNSW indexes map their
+        vector storage, which needs a FAISS version with IO_FLAG_MMAP_IFC.
         
-        print(f"Loaded index with {len(self.documents)} documents and dimension {self.dimension}")
+        Args:
+            index_type: Type of the saved index
+            
+        Returns:
+            IO flags for faiss.read_index, or 0 if the index cannot be mapped
+        """
+        if index_type in (FaissIndexType.IVF_FLAT, FaissIndexType.IVF_PQ):
+            return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+            return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+        return 0
@@ -4,10 +4,14 @@ This module integrates web search and LLM components for a web-based RAG system.
 """
 
 import os
-from typing import List, Dict, Any, Optional, Generator
+import time
+from concurrent.futures import Executor
+from typing import List, Dict, Any, Optional, Generator, AsyncIterator
 
 from src.duckduckgo_search import DuckDuckGoSearch
 from src.ollama_client import OllamaClient
+from src.async_ollama_client import AsyncOllamaClient
+from src.metrics import REQUEST_DURATION
 
 class WebRAGSystem:
     """Class for the web-based RAG system."""
@@ -38,22 +42,26 @@ class WebRAGSystem:
         )
         self.ollama_client = OllamaClient(model_name=llm_model)
     
-    def query(self, question: str) -> Dict[str, Any]:
+    def query(self, question: str, ollama_client: Optional[OllamaClient] = None) -> Dict[str, Any]:
         """
         Process a query through the web RAG system.
         
         Args:
             question: User question
+            ollama_client: Client to answer with, e.g. from an OllamaClientPool;
+                defaults to the system's client
             
         Returns:
             Dictionary with answer and retrieved documents
         """
+        ollama_client = ollama_client or self.ollama_client
+        
         # Search for relevant information
         search_query = self._generate_search_query(question)
         retrieved_docs = self.search_engine.search(search_query, self.max_results)
         
         # Generate answer using RAG
-        answer = self.ollama_client.answer_with_rag(question, retrieved_docs)
+        answer = ollama_client.answer_with_rag(question, retrieved_docs)
         
         return {
             "question": question,
@@ -62,22 +70,67 @@ class WebRAGSystem:
             "retrieved_documents": retrieved_docs
         }
     
-    def stream_query(self, question: str) -> Generator[str, None, None]:
+    def stream_query(self, question: str,
+                     retrieved_docs: Optional[List[Dict[str, Any]]] = None,
+                     ollama_client: Optional[OllamaClient] = None) -> Generator[str, None, None]:
         """
         Process a query through the web RAG system with streaming response.
         
         Args:
             question: User question
+            retrieved_docs: Search results already retrieved for the question, e.g.
+                by get_retrieved_docs; when omitted the web is searched
+            ollama_client: Client to answer with, e.g. from an OllamaClientPool;
+                defaults to the system's client
             
         Yields:
             Chunks of the generated answer
         """
-        # Search for relevant information
-        search_query = self._generate_search_query(question)
-        retrieved_docs = self.search_engine.search(search_query, self.max_results)
+        started_at = time.perf_counter()
+        try:
+            if retrieved_docs is None:
+                # Search for relevant information
+                search_query = self._generate_search_query(question)
+                retrieved_docs = self.search_engine.search(search_query, self.max_results)
+            
+            # Stream answer using RAG
+            yield from (ollama_client or self.ollama_client).stream_answer_with_rag(question, retrieved_docs)
+        finally:
+            REQUEST_DURATION.observe(time.perf_counter() - started_at, system="web", cached="false")
+    
+    async def astream_query(self, question: str, ollama_client: AsyncOllamaClient,
+                            retrieved_docs: Optional[List[Dict[str, Any]]] = None,
+                            model: Optional[str] = None,
+                            executor: Optional[Executor] = None) -> AsyncIterator[str]:
+        """
+        Process a query with a streaming response, for use in an event loop.
         
-        # Stream answer using RAG
-        yield from self.ollama_client.stream_answer_with_rag(question, retrieved_docs)
+        Args:
+            question: User question
+            ollama_client: Async client to stream the answer with
+            retrieved_docs: Search results already retrieved for the question;
+                when omitted the web is searched
+            model: Ollama model to answer with; defaults to the system's model
+            executor: Thread pool for the web search; defaults to the event
+                loop's default executor
+            
+        Yields:
+            Chunks of the generated answer
+        """
+        started_at = time.perf_counter()
+        try:
+            if retrieved_docs is None:
+                # Search for relevant information
+                search_query = self._generate_search_query(question)
+                retrieved_docs = await self.search_engine.asearch(search_query, self.max_results, executor)
+            
+            # Stream answer using RAG
+            async for chunk in ollama_client.stream_answer_with_rag(
+                question, retrieved_docs, model=model or self.ollama_client.model_name
+            ):
+                yield chunk
+        finally:
+            REQUEST_DURATION.observe(time.perf_counter() - started_at, system="web", cached="false")
     
     def get_retrieved_docs(self, question: str) -> List[Dict[str, Any]]:
         """
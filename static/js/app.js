@@ -27,6 +27,10 @@ document.addEventListener("DOMContentLoaded", function () {
   // Track current active system
   let activeSystem = systemToggle.checked ? "web" : "pdf";
 
+  // Track current vector store; sent with every request, so that each
+  // browser tab keeps its own selection
+  let activeVectorStore = vectorStoreSelect.value;
+
   // Bootstrap toast instance
   const toastInstance = new bootstrap.Toast(toast);
 
@@ -53,6 +57,36 @@ document.addEventListener("DOMContentLoaded", function () {
     loadingOverlay.classList.add("d-none");
   }
 
+  // Follow the progress of a background indexing job until it finishes
+  function followJob(jobId, label) {
+    return new Promise((resolve) => {
+      const eventSource = new EventSource(`/jobs/${encodeURIComponent(jobId)}/events`);
+      let lastJob = null;
+
+      eventSource.onmessage = function (event) {
+        const job = JSON.parse(event.data);
+        lastJob = job;
+        if (job.status === "running" && job.files_total > 0) {
+          const eta =
+            job.eta_seconds !== null ? `, about ${Math.ceil(job.eta_seconds)}s left` : "";
+          console.log(
+            `${label}: ${job.files_processed}/${job.files_total} files, ` +
+              `${job.vectors_embedded}/${job.chunks_total} chunks embedded${eta}`
+          );
+        }
+        if (["completed", "failed", "interrupted"].includes(job.status)) {
+          eventSource.close();
+          resolve(job);
+        }
+      };
+
+      eventSource.onerror = function () {
+        eventSource.close();
+        resolve(lastJob);
+      };
+    });
+  }
+
   // Add message to chat
   function addMessage(content, isUser = false) {
     const messageDiv = document.createElement("div");
@@ -101,7 +135,15 @@ document.addEventListener("DOMContentLoaded", function () {
 
         const scoreSpan = document.createElement("span");
         scoreSpan.classList.add("document-score");
-        scoreSpan.textContent = `Score: ${doc.score.toFixed(4)}`;
+        // score is the vector distance, missing for documents only the keyword search found
+        const scores = [];
+        if (doc.score !== null && doc.score !== undefined) {
+          scores.push(`Score: ${doc.score.toFixed(4)}`);
+        }
+        if (doc.rrf_score !== null && doc.rrf_score !== undefined) {
+          scores.push(`RRF: ${doc.rrf_score.toFixed(4)}`);
+        }
+        scoreSpan.textContent = scores.join(" | ");
 
         const contentP = document.createElement("p");
         contentP.classList.add("mb-0", "mt-2");
@@ -228,10 +270,23 @@ document.addEventListener("DOMContentLoaded", function () {
         } else {
           showNotification(
             "Success",
-            `File ${data.filename} uploaded and indexed successfully.`
+            `File ${data.filename} uploaded. Indexing in the background...`
           );
-          // Reload the page to update the PDF list
-          window.location.reload();
+          Promise.all(
+            (data.job_ids || []).map((jobId) => followJob(jobId, data.filename))
+          ).then((jobs) => {
+            const failed = jobs.find((job) => !job || job.status !== "completed");
+            if (failed) {
+              showNotification(
+                "Indexing Error",
+                (failed && failed.error) || `Indexing ${data.filename} did not complete.`,
+                true
+              );
+            } else {
+              // Reload the page to update the PDF list
+              window.location.reload();
+            }
+          });
         }
       })
       .catch((error) => {
@@ -253,13 +308,33 @@ document.addEventListener("DOMContentLoaded", function () {
 
     fetch("/index", {
       method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({
+        vector_store_type: activeVectorStore,
+      }),
     })
       .then((response) => response.json())
       .then((data) => {
         if (data.error) {
           showNotification("Indexing Error", data.error, true);
         } else {
-          showNotification("Success", "Documents reindexed successfully.");
+          showNotification("Success", "Reindexing in the background...");
+          followJob(data.job_id, "Reindexing").then((job) => {
+            if (job && job.status === "completed") {
+              showNotification(
+                "Success",
+                `Documents reindexed successfully (${job.vectors_embedded} chunks).`
+              );
+            } else {
+              showNotification(
+                "Indexing Error",
+                (job && job.error) || "Reindexing did not complete.",
+                true
+              );
+            }
+          });
         }
       })
       .catch((error) => {
@@ -324,6 +399,7 @@ document.addEventListener("DOMContentLoaded", function () {
         if (data.error) {
           showNotification("Vector Store Error", data.error, true);
         } else {
+          activeVectorStore = data.vector_store_type;
           showNotification(
             "Success",
             `Switched to ${data.vector_store_type.toUpperCase()} vector store.`
@@ -383,6 +459,8 @@ document.addEventListener("DOMContentLoaded", function () {
       body: JSON.stringify({
         question: question,
         model: model,
+        system: activeSystem,
+        vector_store_type: activeVectorStore,
       }),
     })
       .then((response) => response.json())
@@ -445,7 +523,13 @@ document.addEventListener("DOMContentLoaded", function () {
           // Now start streaming the response
           const streamUrl = `/stream?question=${encodeURIComponent(
             question
-          )}&model=${encodeURIComponent(model)}`;
+          )}&model=${encodeURIComponent(model)}&retrieval_id=${encodeURIComponent(
+            data.retrieval_id || ""
+          )}&system=${encodeURIComponent(
+            data.active_system || activeSystem
+          )}&vector_store_type=${encodeURIComponent(
+            data.vector_store_type || ""
+          )}`;
           const eventSource = new EventSource(streamUrl);
 
           let responseText = "";
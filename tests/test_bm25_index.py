@@ -0,0 +1,58 @@
+"""Tests for the BM25 index and reciprocal rank fusion."""
+
+import unittest
+
+from src.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+def document(source, chunk, score=None):
+    result = {"content": f"{source} {chunk}", "metadata": {"source": source, "chunk": chunk}}
+    if score is not None:
+        result["score"] = score
+    return result
+
+class ReciprocalRankFusionTest(unittest.TestCase):
+
+    def test_documents_in_both_lists_rank_first(self):
+        dense = [document("a.pdf", 0, 0.1), document("a.pdf", 1, 0.2)]
+        bm25 = [document("b.pdf", 0, 9.0), document("a.pdf", 1, 4.0)]
+        fused = reciprocal_rank_fusion({"dense": dense, "bm25": bm25}, k=60)
+        self.assertEqual([(d["metadata"]["source"], d["metadata"]["chunk"]) for d in fused],
+                         [("a.pdf", 1), ("a.pdf", 0), ("b.pdf", 0)])
+        self.assertAlmostEqual(fused[0]["rrf_score"], 1 / 62 + 1 / 62)
+        self.assertAlmostEqual(fused[1]["rrf_score"], 1 / 61)
+
+    def test_score_keeps_the_dense_distance(self):
+        dense = [document("a.pdf", 0, 0.25)]
+        bm25 = [document("b.pdf", 0, 9.0), document("a.pdf", 0, 4.0)]
+        fused = {d["metadata"]["source"]: d for d in reciprocal_rank_fusion({"dense": dense, "bm25": bm25})}
+        self.assertEqual(fused["a.pdf"]["score"], 0.25)
+        self.assertEqual(fused["a.pdf"]["dense_score"], 0.25)
+        self.assertEqual(fused["a.pdf"]["bm25_score"], 4.0)
+        self.assertIsNone(fused["b.pdf"]["score"])
+        self.assertEqual(fused["b.pdf"]["bm25_score"], 9.0)
+
+    def test_limit(self):
+        dense = [document("a.pdf", i, i) for i in range(5)]
+        self.assertEqual(len(reciprocal_rank_fusion({"dense": dense, "bm25": []}, limit=3)), 3)
+
+    def test_inputs_are_not_modified(self):
+        dense = [document("a.pdf", 0, 0.5)]
+        reciprocal_rank_fusion({"dense": dense, "bm25": [document("a.pdf", 0, 2.0)]})
+        self.assertEqual(dense[0], document("a.pdf", 0, 0.5))
+
+class BM25IndexTest(unittest.TestCase):
+
+    def test_tokenize_keeps_compound_terms(self):
+        self.assertIn("gpt-4", tokenize("Compare GPT-4 with the others"))
+
+    def test_exact_term_ranks_first(self):
+        index = BM25Index()
+        index.add([document("a.pdf", 0), document("b.pdf", 0)])
+        index.add([{"content": "The BERT model uses masked language modelling",
+                    "metadata": {"source": "c.pdf", "chunk": 0}}])
+        results = index.search("BERT", k=2)
+        self.assertEqual(results[0]["metadata"]["source"], "c.pdf")
+        self.assertGreater(results[0]["score"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
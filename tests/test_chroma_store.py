@@ -0,0 +1,63 @@
+"""Tests for swapping a staged ChromaDB collection in."""
+
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks.fake_embeddings import HashEmbeddings
+from src.chroma_store import ChromaStore
+
+def documents(source, count):
+    return [{"content": f"{source} chunk {i}", "metadata": {"source": source, "chunk": i}} for i in range(count)]
+
+class ReplaceCollectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def store(self, collection_name):
+        return ChromaStore(collection_name=collection_name, persist_directory=self.directory,
+                           embedding_cache_path=None, embeddings=HashEmbeddings())
+
+    def collection_names(self, store):
+        return sorted(collection.name for collection in store.client.list_collections())
+
+    def test_staging_collection_replaces_live_one(self):
+        live = self.store("docs")
+        live.add_documents(documents("old.pdf", 2))
+        staging = self.store("docs_staging")
+        staging.add_documents(documents("new.pdf", 3))
+
+        staging.replace_collection("docs")
+
+        self.assertEqual(staging.collection_name, "docs")
+        self.assertEqual(self.collection_names(staging), ["docs"])
+        self.assertEqual(self.store("docs").count(), 3)
+
+    def test_live_collection_is_restored_if_rename_fails(self):
+        live = self.store("docs")
+        live.add_documents(documents("old.pdf", 2))
+        staging = self.store("docs_staging")
+        staging.collection = mock.Mock(wraps=staging.collection)
+        staging.collection.modify.side_effect = RuntimeError("rename failed")
+
+        with self.assertRaises(RuntimeError):
+            staging.replace_collection("docs")
+
+        self.assertEqual(staging.collection_name, "docs_staging")
+        self.assertEqual(self.collection_names(live), ["docs", "docs_staging"])
+        self.assertEqual(self.store("docs").count(), 2)
+
+    def test_backup_of_interrupted_swap_is_restored_on_open(self):
+        live = self.store("docs")
+        live.add_documents(documents("old.pdf", 2))
+        # A process that died after renaming the live collection to its backup name
+        live.collection.modify(name="docs_previous")
+
+        self.assertEqual(self.store("docs").count(), 2)
+        self.assertEqual(self.collection_names(live), ["docs"])
+
+if __name__ == "__main__":
+    unittest.main()
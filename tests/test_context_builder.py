@@ -0,0 +1,93 @@
+"""Tests for fitting retrieved documents into a model's context window."""
+
+import unittest
+
+from src.context_builder import DEFAULT_CONTEXT_WINDOW, ContextBuilder, estimate_tokens
+
+def chunk(source, number, content, score=0.0):
+    return {"content": content, "metadata": {"source": source, "chunk": number}, "score": score}
+
+# Two chunks of one file whose texts overlap by the 25 characters "neighbouring chunk text. "
+FIRST = "The first chunk ends with neighbouring chunk text. "
+SECOND = "neighbouring chunk text. The second chunk continues."
+
+class MergeNeighboursTest(unittest.TestCase):
+
+    def setUp(self):
+        self.builder = ContextBuilder()
+
+    def test_overlapping_neighbours_are_merged(self):
+        merged = self.builder.merge_neighbours([chunk("a.pdf", 0, FIRST), chunk("a.pdf", 1, SECOND)])
+        self.assertEqual(len(merged), 1)
+        self.assertEqual(merged[0]["content"], FIRST + "The second chunk continues.")
+        self.assertEqual(merged[0]["chunks"], [0, 1])
+        self.assertEqual(merged[0]["metadata"]["chunk"], 0)
+
+    def test_merged_passage_takes_the_better_rank(self):
+        other = chunk("b.pdf", 0, "Something else entirely.")
+        merged = self.builder.merge_neighbours([chunk("a.pdf", 1, SECOND), other, chunk("a.pdf", 0, FIRST)])
+        self.assertEqual([d["metadata"]["source"] for d in merged], ["a.pdf", "b.pdf"])
+        self.assertEqual(merged[0]["content"], FIRST + "The second chunk continues.")
+
+    def test_chunks_of_other_files_or_without_overlap_are_kept(self):
+        documents = [chunk("a.pdf", 0, FIRST), chunk("b.pdf", 1, SECOND), chunk("a.pdf", 1, "No overlap here.")]
+        self.assertEqual(len(self.builder.merge_neighbours(documents)), 3)
+
+    def test_duplicates_are_dropped(self):
+        merged = self.builder.merge_neighbours([chunk("a.pdf", 0, FIRST), chunk("c.pdf", 3, FIRST)])
+        self.assertEqual(len(merged), 1)
+
+    def test_documents_without_chunk_numbers_are_passed_through(self):
+        document = {"content": "Web result", "metadata": {}}
+        self.assertEqual(self.builder.merge_neighbours([document]), [document])
+
+    def test_inputs_are_not_modified(self):
+        first = chunk("a.pdf", 0, FIRST)
+        self.builder.merge_neighbours([first, chunk("a.pdf", 1, SECOND)])
+        self.assertEqual(first, chunk("a.pdf", 0, FIRST))
+
+class SelectTest(unittest.TestCase):
+
+    def setUp(self):
+        self.builder = ContextBuilder(min_document_tokens=10)
+        self.documents = [chunk(f"{name}.pdf", 0, " ".join(["word"] * 50)) for name in "abc"]
+        self.document_tokens = 50 + estimate_tokens("Document 1 (Source: a.pdf):") + 2
+
+    def test_everything_fits(self):
+        self.assertEqual(self.builder.select(self.documents, 10_000), self.documents)
+
+    def test_lowest_ranked_documents_are_dropped(self):
+        selected = self.builder.select(self.documents, 2 * self.document_tokens + 5)
+        self.assertEqual(selected, self.documents[:2])
+
+    def test_document_is_trimmed_to_the_remaining_budget(self):
+        selected = self.builder.select(self.documents, 2 * self.document_tokens + 30)
+        self.assertEqual(len(selected), 3)
+        self.assertTrue(selected[2]["content"].endswith("…"))
+        self.assertLess(estimate_tokens(selected[2]["content"]), 30)
+        self.assertEqual(self.documents[2]["content"], " ".join(["word"] * 50))
+
+    def test_best_document_is_trimmed_rather_than_dropped(self):
+        selected = self.builder.select(self.documents, self.document_tokens // 2)
+        self.assertEqual(len(selected), 1)
+        self.assertTrue(selected[0]["content"].endswith("…"))
+
+    def test_empty_budget(self):
+        self.assertEqual(self.builder.select(self.documents, 0), [])
+
+class ContextWindowTest(unittest.TestCase):
+
+    def test_window_lookup(self):
+        builder = ContextBuilder(context_windows={"llama3": 8192, "mistral:7b": 4096})
+        self.assertEqual(builder.num_ctx_for("llama3:latest"), 8192)
+        self.assertEqual(builder.num_ctx_for("mistral:7b"), 4096)
+        self.assertIsNone(builder.num_ctx_for("mistral:latest"))
+        self.assertEqual(builder.window_for("phi3"), DEFAULT_CONTEXT_WINDOW)
+
+    def test_budget_keeps_room_for_the_answer(self):
+        builder = ContextBuilder(context_window=4096, answer_tokens=512)
+        self.assertEqual(builder.budget("llama3", 100), 4096 - 512 - 100)
+        self.assertEqual(builder.budget("llama3", 10_000), 0)
+
+if __name__ == "__main__":
+    unittest.main()
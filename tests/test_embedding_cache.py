@@ -0,0 +1,84 @@
+"""Tests for the embedding cache."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.embedding_cache import EmbeddingCache, get_cached_embeddings
+
+def vectors(keys):
+    return [(key, np.full(4, index, dtype=np.float32)) for index, key in enumerate(keys)]
+
+class EmbeddingCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def cache(self, **kwargs):
+        cache = EmbeddingCache(os.path.join(self.directory, "cache.sqlite3"), **kwargs)
+        self.addCleanup(cache._conn.close)
+        return cache
+
+    def last_used(self, cache, key):
+        return cache._conn.execute("SELECT last_used FROM embeddings WHERE text_hash = ?", (key,)).fetchone()[0]
+
+    def test_round_trip(self):
+        cache = self.cache()
+        cache.put_many("model", vectors(["a", "b"]))
+        found = cache.get_many("model", ["a", "b", "c"])
+        self.assertEqual(sorted(found), ["a", "b"])
+        np.testing.assert_array_equal(found["b"], np.full(4, 1, dtype=np.float32))
+        self.assertEqual(cache.get_many("other-model", ["a"]), {})
+
+    def test_eviction_waits_for_the_slack(self):
+        cache = self.cache(max_entries=4, eviction_slack=2)
+        cache.put_many("model", vectors(["a", "b", "c", "d", "e", "f"]))
+        self.assertEqual(cache.count(), 6)
+        cache.put_many("model", vectors(["g"]))
+        self.assertEqual(cache.count(), 4)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.cache(max_entries=2, eviction_slack=0, touch_interval=0.0)
+        cache.put_many("model", vectors(["a", "b"]))
+        cache._conn.execute("UPDATE embeddings SET last_used = last_used - 10")
+        cache.get_many("model", ["a"])
+        cache.put_many("model", vectors(["c"]))
+        self.assertEqual(sorted(cache.get_many("model", ["a", "b", "c"])), ["a", "c"])
+
+    def test_recent_hits_are_not_written(self):
+        cache = self.cache(touch_interval=3600.0)
+        cache.put_many("model", vectors(["a"]))
+        last_used = self.last_used(cache, "a")
+        cache.get_many("model", ["a"])
+        self.assertEqual(self.last_used(cache, "a"), last_used)
+
+        cache._conn.execute("UPDATE embeddings SET last_used = last_used - 7200")
+        cache.get_many("model", ["a"])
+        self.assertGreaterEqual(self.last_used(cache, "a"), last_used)
+
+    def test_count_survives_reopening_and_duplicates(self):
+        cache = self.cache()
+        cache.put_many("model", vectors(["a", "b"]))
+        cache.put_many("model", vectors(["a"]))
+        self.assertEqual(cache._count, 2)
+        self.assertEqual(self.cache()._count, 2)
+        cache.clear()
+        self.assertEqual(cache._count, 0)
+
+class GetCachedEmbeddingsTest(unittest.TestCase):
+
+    def test_embeddings_use_the_given_ollama_server(self):
+        embeddings = get_cached_embeddings("nomic-embed-text", None, "http://ollama.example:11434")
+        self.assertEqual(embeddings.embeddings.api_base, "http://ollama.example:11434")
+
+    def test_instances_are_shared_per_ollama_server(self):
+        first = get_cached_embeddings("nomic-embed-text", None, "http://first:11434")
+        self.assertIs(get_cached_embeddings("nomic-embed-text", None, "http://first:11434"), first)
+        self.assertIsNot(get_cached_embeddings("nomic-embed-text", None, "http://second:11434"), first)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Tests for the per-file index manifest."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.index_manifest import IndexManifest, file_content_hash, make_chunk_ids
+
+class IndexManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.manifest = IndexManifest(os.path.join(self.directory, "index", "manifest.json"))
+        self.pdf_path = self.write("a.pdf", b"first version")
+
+    def write(self, filename, content):
+        path = os.path.join(self.directory, filename)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def record(self, path):
+        content_hash = file_content_hash(path)
+        self.manifest.record(path, content_hash, make_chunk_ids(os.path.basename(path), content_hash, 2))
+
+    def test_new_file_needs_update(self):
+        self.assertEqual(self.manifest.needs_update(self.pdf_path), file_content_hash(self.pdf_path))
+
+    def test_recorded_file_does_not(self):
+        self.record(self.pdf_path)
+        self.assertIsNone(self.manifest.needs_update(self.pdf_path))
+
+    def test_changed_content_needs_update(self):
+        self.record(self.pdf_path)
+        self.write("a.pdf", b"second version")
+        self.assertEqual(self.manifest.needs_update(self.pdf_path), file_content_hash(self.pdf_path))
+
+    def test_touched_file_does_not_and_its_timestamp_is_refreshed(self):
+        self.record(self.pdf_path)
+        stat = os.stat(self.pdf_path)
+        os.utime(self.pdf_path, (stat.st_atime, stat.st_mtime + 60))
+        self.assertIsNone(self.manifest.needs_update(self.pdf_path))
+        self.assertEqual(self.manifest.get("a.pdf")["mtime"], stat.st_mtime + 60)
+
+    def test_save_and_load(self):
+        self.record(self.pdf_path)
+        self.manifest.save()
+        loaded = IndexManifest(self.manifest.manifest_path)
+        self.assertEqual(loaded.files, self.manifest.files)
+        self.assertIsNone(loaded.needs_update(self.pdf_path))
+
+    def test_copy_is_independent(self):
+        self.record(self.pdf_path)
+        copy = self.manifest.copy()
+        copy.get("a.pdf")["chunk_ids"].append("extra")
+        copy.remove("a.pdf")
+        self.assertEqual(len(self.manifest.get("a.pdf")["chunk_ids"]), 2)
+
+    def test_chunk_ids_depend_on_name_and_content(self):
+        content_hash = file_content_hash(self.pdf_path)
+        self.assertEqual(make_chunk_ids("a.pdf", content_hash, 2), make_chunk_ids("a.pdf", content_hash, 2))
+        self.assertNotEqual(make_chunk_ids("a.pdf", content_hash, 1), make_chunk_ids("b.pdf", content_hash, 1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Tests for the cached Ollama model list."""
+
+import unittest
+from unittest import mock
+
+from src.model_registry import ModelRegistry, context_window_from_show
+
+class FakeResponse:
+
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+def fetched_registry(models):
+    """A registry whose list was fetched from a fake Ollama listing the given models."""
+    registry = ModelRegistry(ttl_seconds=3600)
+    transport = mock.Mock()
+    transport.get.return_value = FakeResponse({"models": [{"name": name} for name in models]})
+    with mock.patch("src.model_registry.get_transport", return_value=transport):
+        assert registry.refresh()
+    return registry
+
+class HasModelTest(unittest.TestCase):
+
+    def test_listed_model(self):
+        registry = fetched_registry(["llama3:latest", "mistral:7b"])
+        self.assertTrue(registry.has_model("mistral:7b"))
+        self.assertTrue(registry.has_model("llama3:latest"))
+
+    def test_latest_tag_may_be_omitted(self):
+        self.assertTrue(fetched_registry(["llama3:latest"]).has_model("llama3"))
+
+    def test_unlisted_model(self):
+        registry = fetched_registry(["llama3:latest"])
+        self.assertFalse(registry.has_model("mistral"))
+        self.assertFalse(registry.has_model("llama3:8b"))
+
+    def test_any_model_before_the_list_is_fetched(self):
+        # Nothing listens on port 1, so the list is never fetched
+        registry = ModelRegistry(api_base="http://127.0.0.1:1", timeout=0.5)
+        self.assertTrue(registry.has_model("mistral"))
+        self.assertEqual(registry.get_models(), ["llama2"])
+
+    def test_failed_refresh_keeps_the_list(self):
+        registry = fetched_registry(["llama3:latest"])
+        transport = mock.Mock()
+        transport.get.return_value = FakeResponse({}, status_code=500)
+        with mock.patch("src.model_registry.get_transport", return_value=transport):
+            self.assertFalse(registry.refresh())
+        self.assertTrue(registry.has_model("llama3"))
+        self.assertFalse(registry.has_model("mistral"))
+
+class ContextWindowFromShowTest(unittest.TestCase):
+
+    def test_modelfile_num_ctx_wins(self):
+        info = {"parameters": "stop \"<|eot_id|>\"\nnum_ctx 16384",
+                "model_info": {"llama.context_length": 131072}}
+        self.assertEqual(context_window_from_show(info, 8192), 16384)
+
+    def test_trained_context_length_is_capped(self):
+        info = {"model_info": {"llama.context_length": 131072}}
+        self.assertEqual(context_window_from_show(info, 8192), 8192)
+        self.assertEqual(context_window_from_show(info, None), 131072)
+
+    def test_no_context_length(self):
+        self.assertIsNone(context_window_from_show({"model_info": {}}))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Tests for index loading in the RAG system."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks.corpus import write_pdf
+from benchmarks.fake_embeddings import HashEmbeddings
+from src.chroma_store import ChromaStore
+from src.rag_system import IndexState, RAGSystem, VectorStoreType
+
+class EmptyCorpusTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.pdf_dir = os.path.join(self.directory, "pdfs")
+        os.makedirs(self.pdf_dir)
+
+    def rag_system(self, vector_store_type):
+        rag_system = RAGSystem(pdf_dir=self.pdf_dir, index_dir=os.path.join(self.directory, "index"),
+                               chroma_dir=os.path.join(self.directory, "chroma"),
+                               vector_store_type=vector_store_type, embedding_cache_path=None,
+                               index_check_interval=0.0, extraction_workers=1)
+        rag_system.vector_store.embeddings = HashEmbeddings()
+        return rag_system
+
+    def test_empty_chroma_collection_is_not_replaced_on_every_check(self):
+        rag_system = self.rag_system(VectorStoreType.CHROMA)
+        with mock.patch.object(ChromaStore, "replace_collection", autospec=True,
+                               side_effect=ChromaStore.replace_collection) as replace_collection:
+            rag_system.ensure_index_ready()
+            self.assertEqual(rag_system.index_state, IndexState.EMPTY)
+            for _ in range(3):
+                rag_system.ensure_index_ready()
+            self.assertEqual(replace_collection.call_count, 1)
+
+            write_pdf(os.path.join(self.pdf_dir, "notes.pdf"), [["Retrieval augmented generation with BM25."]])
+            rag_system.ensure_index_ready()
+            self.assertEqual(replace_collection.call_count, 2)
+        self.assertEqual(rag_system.index_state, IndexState.READY)
+        self.assertTrue(rag_system.get_retrieved_docs("BM25"))
+
+    def test_empty_faiss_index_is_built_once_pdfs_are_added(self):
+        rag_system = self.rag_system(VectorStoreType.FAISS)
+        rag_system.ensure_index_ready()
+        self.assertEqual(rag_system.index_state, IndexState.EMPTY)
+        with mock.patch.object(rag_system, "index_documents", wraps=rag_system.index_documents) as index_documents:
+            rag_system.ensure_index_ready()
+            index_documents.assert_not_called()
+            write_pdf(os.path.join(self.pdf_dir, "notes.pdf"), [["Retrieval augmented generation with BM25."]])
+            rag_system.ensure_index_ready()
+            index_documents.assert_called_once()
+        self.assertEqual(rag_system.index_state, IndexState.READY)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Tests for the lock shared by searches and indexing runs."""
+
+import threading
+import time
+import unittest
+
+from src.read_write_lock import ReadWriteLock
+
+class ReadWriteLockTest(unittest.TestCase):
+
+    def test_readers_share_the_lock(self):
+        lock = ReadWriteLock()
+        inside = threading.Barrier(3, timeout=2)
+
+        def read():
+            with lock.read():
+                inside.wait()
+
+        threads = [threading.Thread(target=read) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertFalse(inside.broken)
+
+    def test_writer_waits_for_readers_and_blocks_new_ones(self):
+        lock = ReadWriteLock()
+        events = []
+        reading = threading.Event()
+        release_reader = threading.Event()
+
+        def first_reader():
+            with lock.read():
+                reading.set()
+                release_reader.wait(2)
+                events.append("first read done")
+
+        def writer():
+            with lock.write():
+                events.append("write")
+
+        def second_reader():
+            with lock.read():
+                events.append("second read")
+
+        threads = [threading.Thread(target=first_reader)]
+        threads[0].start()
+        reading.wait(2)
+        threads.append(threading.Thread(target=writer))
+        threads[1].start()
+        while not lock._writers_waiting:
+            time.sleep(0.001)
+        threads.append(threading.Thread(target=second_reader))
+        threads[2].start()
+        time.sleep(0.05)
+        self.assertEqual(events, [])
+
+        release_reader.set()
+        for thread in threads:
+            thread.join(2)
+        self.assertEqual(events, ["first read done", "write", "second read"])
+
+    def test_lock_is_released_on_error(self):
+        lock = ReadWriteLock()
+        with self.assertRaises(RuntimeError):
+            with lock.write():
+                raise RuntimeError("failed swap")
+        with lock.read():
+            pass
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Tests for the Server-Sent Events encoding."""
+
+import time
+import asyncio
+import unittest
+
+from src.sse import format_event, format_comment, stream_events, astream_events
+
+def slow_chunks(chunks, delay):
+    """Yield chunks from a blocking source, sleeping before each one."""
+    for chunk in chunks:
+        time.sleep(delay)
+        yield chunk
+
+async def aslow_chunks(chunks, delay):
+    """Yield chunks from an async source, sleeping before each one."""
+    for chunk in chunks:
+        await asyncio.sleep(delay)
+        yield chunk
+
+async def collect(events):
+    return [event async for event in events]
+
+class FormatEventTest(unittest.TestCase):
+
+    def test_single_line(self):
+        self.assertEqual(format_event("hello"), "data: hello\n\n")
+
+    def test_every_line_gets_a_data_field(self):
+        self.assertEqual(format_event("a\nb\r\nc\rd"), "data: a\ndata: b\ndata: c\ndata: d\n\n")
+
+    def test_trailing_newline_is_kept(self):
+        self.assertEqual(format_event("a\n"), "data: a\ndata: \n\n")
+
+    def test_event_type(self):
+        self.assertEqual(format_event("{}", event="progress"), "event: progress\ndata: {}\n\n")
+
+    def test_comment(self):
+        self.assertEqual(format_comment("heartbeat"), ": heartbeat\n\n")
+
+class StreamEventsTest(unittest.TestCase):
+
+    def test_every_chunk_is_sent(self):
+        events = list(stream_events(["a", "", "b"]))
+        self.assertEqual(events, [format_event("a"), format_event("b")])
+
+    def test_chunks_are_coalesced(self):
+        events = list(stream_events(["a", "b", "c"], coalesce_interval=10.0))
+        self.assertEqual(events, [format_event("abc")])
+
+    def test_full_buffer_is_sent(self):
+        events = list(stream_events(["ab", "cd", "e"], coalesce_interval=10.0, max_buffer_size=4))
+        self.assertEqual(events, [format_event("abcd"), format_event("e")])
+
+    def test_held_back_chunks_are_sent_with_a_late_chunk(self):
+        events = list(stream_events(slow_chunks(["a", "b", "c"], 0.05), coalesce_interval=0.01))
+        self.assertEqual(events, [format_event("ab"), format_event("c")])
+
+    def test_heartbeat_on_empty_chunk_after_idle(self):
+        events = list(stream_events(slow_chunks(["", "a"], 0.05), heartbeat_interval=0.01))
+        self.assertEqual(events, [format_comment("heartbeat"), format_event("a")])
+
+    def test_source_is_closed(self):
+        closed = []
+
+        def source():
+            try:
+                yield "a"
+                yield "b"
+            finally:
+                closed.append(True)
+
+        events = stream_events(source(), coalesce_interval=10.0, max_buffer_size=1)
+        next(events)
+        events.close()
+        self.assertEqual(closed, [True])
+
+class AStreamEventsTest(unittest.TestCase):
+
+    def test_heartbeat_while_source_blocks(self):
+        events = asyncio.run(collect(astream_events(aslow_chunks(["a"], 0.2), heartbeat_interval=0.05)))
+        self.assertIn(format_comment("heartbeat"), events)
+        self.assertEqual(events[-1], format_event("a"))
+
+    def test_held_back_chunks_are_sent_on_time(self):
+        async def run():
+            received = []
+            async for event in astream_events(aslow_chunks(["a", "b"], 0.1), coalesce_interval=0.01):
+                received.append((event, time.monotonic()))
+            return received
+
+        start = time.monotonic()
+        received = asyncio.run(run())
+        self.assertEqual([event for event, _ in received], [format_event("a"), format_event("b")])
+        self.assertLess(received[0][1] - start, 0.18)
+
+    def test_source_error_is_raised_after_flush(self):
+        async def failing():
+            yield "a"
+            raise RuntimeError("boom")
+
+        async def run():
+            received = []
+            with self.assertRaises(RuntimeError):
+                async for event in astream_events(failing(), coalesce_interval=10.0):
+                    received.append(event)
+            return received
+
+        self.assertEqual(asyncio.run(run()), [format_event("a")])
+
+if __name__ == "__main__":
+    unittest.main()
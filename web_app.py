@@ -4,13 +4,21 @@ This script provides a web interface to the RAG system with streaming capabiliti
 """
 
 import os
-import time
+import json
+import threading
 from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 from werkzeug.utils import secure_filename
 
 from src.rag_system import RAGSystem, VectorStoreType
-from src.ollama_utils import get_available_models
+from src.ollama_client import OllamaClientPool, default_context_builder
+from src.model_registry import ModelRegistry
 from src.web_rag_system import WebRAGSystem
+from src.retrieval_cache import RetrievalCache
+from src.answer_cache import AnswerCache
+from src.embedding_cache import query_cache_stats
+from src.sse import stream_events, format_event, format_comment
+from src.indexing_jobs import IndexingJobQueue
+from src import metrics
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -18,19 +26,29 @@ app.config['SECRET_KEY'] = 'your-secret-key'
 app.config['UPLOAD_FOLDER'] = 'data/pdfs'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
 
+# Answers shared by both RAG systems; entries are scoped by model, vector store and index version
+answer_cache = AnswerCache(ttl_seconds=3600)
+
+# Background indexing jobs, so that uploads and reindexing return right away
+indexing_jobs = IndexingJobQueue(db_path='data/indexing_jobs.sqlite3', max_workers=2)
+
 # Initialize RAG systems
 faiss_rag_system = RAGSystem(
     llm_model="llama2",
     embedding_model="nomic-embed-text",
     top_k=5,
-    vector_store_type=VectorStoreType.FAISS
+    vector_store_type=VectorStoreType.FAISS,
+    answer_cache=answer_cache,
+    job_queue=indexing_jobs
 )
 
 chroma_rag_system = RAGSystem(
     llm_model="llama2",
     embedding_model="nomic-embed-text",
     top_k=5,
-    vector_store_type=VectorStoreType.CHROMA
+    vector_store_type=VectorStoreType.CHROMA,
+    answer_cache=answer_cache,
+    job_queue=indexing_jobs
 )
 
 # Add Web RAG system
@@ -39,10 +57,59 @@ web_rag_system = WebRAGSystem(
     max_results=5
 )
 
-# Track active system (default to PDF)
+# Ollama model list, refreshed in the background so page loads never wait for Ollama;
+# the context length of each listed model is added to the shared context builder
+model_registry = ModelRegistry(api_base=faiss_rag_system.ollama_client.api_base, ttl_seconds=60,
+                               context_builder=default_context_builder)
+
+# Ollama clients shared by all requests, one per model, so that requests for
+# different models never modify each other's client; only models listed by
+# Ollama get a client
+ollama_clients = OllamaClientPool(api_base=faiss_rag_system.ollama_client.api_base, model_registry=model_registry)
+
+_background_tasks_started = False
+_background_tasks_lock = threading.Lock()
+
+def start_background_tasks():
+    """
+    Fetch the model list and load the default models in the background.
+
+    Called when the server starts or on the first request rather than on
+    import, so that importing this module talks to no server. The RAG
+    system prompt is prefilled too, so the first question does not wait.
+    """
+    global _background_tasks_started
+    with _background_tasks_lock:
+        if _background_tasks_started:
+            return
+        _background_tasks_started = True
+    # The warm-up fetches the model list first, so the models load with their context window
+    ollama_clients.warm_up([faiss_rag_system.ollama_client.model_name, web_rag_system.ollama_client.model_name])
+
+@app.before_request
+def start_background_tasks_on_first_request():
+    start_background_tasks()
+
+# SSE settings of /stream: answer chunks produced within this many seconds are
+# sent as one event, and idle connections get a heartbeat comment. Heartbeats
+# are only sent by the ASGI server (asgi_app.py): the blocking Ollama stream
+# served here yields nothing while the model loads
+STREAM_COALESCE_INTERVAL = 0.02
+STREAM_HEARTBEAT_INTERVAL = 15.0
+
+# Retrieval results from /query, reused by the following /stream request
+retrieval_cache = RetrievalCache(ttl_seconds=120)
+
+# PDF RAG systems by vector store type
+rag_systems = {
+    'faiss': faiss_rag_system,
+    'chroma': chroma_rag_system
+}
+
+# Default system for requests that do not name one (default to PDF)
 active_system = "pdf"
 
-# Current active RAG system (default to ChromaDB for speed)
+# Default PDF RAG system for requests that do not name a vector store (default to ChromaDB for speed)
 active_rag_system = chroma_rag_system
 
 # Ensure the upload folder exists
@@ -55,18 +122,44 @@ def allowed_file(filename):
     """Check if the file extension is allowed."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _select_system(params):
+    """
+    Pick the RAG system for a request.
+
+    Requests may name the system ('pdf' or 'web') and the vector store
+    ('faiss' or 'chroma'); otherwise the defaults set by /switch-system and
+    /switch-vector-store are used. Raises ValueError for unknown names.
+
+    Returns:
+        Tuple of (system name, RAG system)
+    """
+    system_type = (params.get('system') or active_system).lower()
+    if system_type == 'web':
+        return 'web', web_rag_system
+    if system_type != 'pdf':
+        raise ValueError(f'Invalid system type: {system_type}')
+    vector_store_type = params.get('vector_store_type')
+    if not vector_store_type:
+        return 'pdf', active_rag_system
+    if vector_store_type.lower() not in rag_systems:
+        raise ValueError(f'Invalid vector store type: {vector_store_type}')
+    return 'pdf', rag_systems[vector_store_type.lower()]
+
+def _retrieval_scope(system_type, rag_system):
+    """Describe the system that retrieval results were produced by."""
+    if system_type == "pdf":
+        return {'system': system_type, 'vector_store_type': rag_system.vector_store_type.value}
+    return {'system': system_type}
+
 @app.route('/')
 def index():
     """Render the main page."""
     # Get list of available models from Ollama
-    current_system = active_rag_system if active_system == "pdf" else web_rag_system
-    models = get_available_models(current_system.ollama_client.api_base)
-    if not models:
-        models = ["llama2"]
+    models = model_registry.get_models()
     # Get list of indexed PDFs
     pdfs = [f for f in os.listdir(app.config['UPLOAD_FOLDER']) if f.endswith('.pdf')]
-    # Get current vector store type (only for PDF)
-    vector_store_type = active_rag_system.vector_store_type.value if active_system == "pdf" else None
+    # Get the default vector store type, used once the PDF system is selected
+    vector_store_type = active_rag_system.vector_store_type.value
     return render_template('index.html', 
                           models=models, 
                           pdfs=pdfs, 
@@ -89,11 +182,13 @@ def upload_file():
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(file_path)
         
-        # Reindex after adding the file for both RAG systems
+        # Index the file for both RAG systems in the background
         try:
-            faiss_rag_system.add_pdf(file_path)
-            chroma_rag_system.add_pdf(file_path)
-            return jsonify({'success': True, 'filename': filename}), 200
+            job_ids = [
+                faiss_rag_system.add_pdf(file_path, background=True),
+                chroma_rag_system.add_pdf(file_path, background=True)
+            ]
+            return jsonify({'success': True, 'filename': filename, 'job_ids': job_ids}), 202
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -101,16 +196,48 @@ def upload_file():
 
 @app.route('/index', methods=['POST'])
 def index_documents():
-    """Force reindexing of all documents."""
+    """Force reindexing of all documents in the background."""
     try:
-        active_rag_system.index_documents(force_reindex=True)
-        return jsonify({'success': True}), 200
+        _, rag_system = _select_system({**(request.get_json(silent=True) or {}), 'system': 'pdf'})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        job_id = rag_system.index_documents(force_reindex=True, background=True)
+        return jsonify({'success': True, 'job_id': job_id}), 202
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/jobs')
+def list_jobs():
+    """Get the most recent indexing jobs."""
+    return jsonify(indexing_jobs.list_jobs())
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Get the status and progress of an indexing job."""
+    job = indexing_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream the progress of an indexing job (files, chunks, vectors embedded, ETA) until it finishes."""
+    if indexing_jobs.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    headers = {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+    def generate():
+        for job in indexing_jobs.watch(job_id, interval=STREAM_HEARTBEAT_INTERVAL):
+            yield format_event(json.dumps(job))
+    return Response(generate(), headers=headers)
+
 @app.route('/switch-vector-store', methods=['POST'])
 def switch_vector_store():
-    """Switch between vector store types."""
+    """Switch the default vector store type for requests that do not name one."""
     global active_rag_system
     
     data = request.json
@@ -119,14 +246,10 @@ def switch_vector_store():
     
     vector_store_type = data['vector_store_type'].lower()
     
-    if vector_store_type == 'faiss':
-        active_rag_system = faiss_rag_system
-        print("Switched to FAISS vector store")
-    elif vector_store_type == 'chroma':
-        active_rag_system = chroma_rag_system
-        print("Switched to ChromaDB vector store")
-    else:
+    if vector_store_type not in rag_systems:
         return jsonify({'error': f'Invalid vector store type: {vector_store_type}'}), 400
+    active_rag_system = rag_systems[vector_store_type]
+    print(f"Switched to {active_rag_system.vector_store_type.value} vector store")
     
     return jsonify({
         'success': True, 
@@ -135,6 +258,7 @@ def switch_vector_store():
 
 @app.route('/switch-system', methods=['POST'])
 def switch_system():
+    """Switch the default system for requests that do not name one."""
     global active_system
     data = request.json
     if not data or 'system' not in data:
@@ -156,28 +280,25 @@ def query():
     if not data or 'question' not in data:
         return jsonify({'error': 'No question provided'}), 400
     question = data['question']
-    model = data.get('model', 'llama2')
-    # Get the current RAG system based on active_system
-    current_system = active_rag_system if active_system == "pdf" else web_rag_system
-    # Update model if different from current
-    if model != current_system.ollama_client.model_name:
-        current_system.ollama_client.model_name = model
-        current_system.ollama_client.llm = current_system.ollama_client.llm.__class__(
-            model=model,
-            base_url=current_system.ollama_client.api_base
-        )
+    # Get the RAG system for this request; the model is only used by /stream
+    try:
+        system_type, current_system = _select_system(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
         # Get retrieved documents first
         retrieved_docs = current_system.get_retrieved_docs(question)
         # Format documents for display based on the active system
         formatted_docs = []
-        if active_system == "pdf":
+        if system_type == "pdf":
             for i, doc in enumerate(retrieved_docs):
                 formatted_docs.append({
                     'index': i + 1,
                     'source': doc['metadata']['source'],
                     'content': doc['content'][:200] + '...' if len(doc['content']) > 200 else doc['content'],
-                    'score': doc['score']
+                    # Vector distance (lower is better), None for documents only BM25 found
+                    'score': doc['score'],
+                    'rrf_score': doc.get('rrf_score')
                 })
         else:
             for doc in retrieved_docs:
@@ -190,10 +311,13 @@ def query():
         response = {
             'documents': formatted_docs,
             'streaming': True,
-            'active_system': active_system
+            'active_system': system_type,
+            'retrieval_id': retrieval_cache.put(
+                question, retrieved_docs, **_retrieval_scope(system_type, current_system)
+            )
         }
-        if active_system == "pdf":
-            response['vector_store_type'] = active_rag_system.vector_store_type.value
+        if system_type == "pdf":
+            response['vector_store_type'] = current_system.vector_store_type.value
         return jsonify(response), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -202,27 +326,25 @@ def query():
 def stream():
     # Handle both GET and POST requests
     if request.method == 'GET':
-        question = request.args.get('question')
-        model = request.args.get('model', 'llama2')
+        params = request.args
     else:
-        data = request.json
-        if not data:
+        params = request.json
+        if not params:
             return jsonify({'error': 'No data provided'}), 400
-        question = data.get('question')
-        model = data.get('model', 'llama2')
+    question = params.get('question')
+    model = params.get('model', 'llama2')
+    retrieval_id = params.get('retrieval_id')
     if not question:
         return jsonify({'error': 'No question provided'}), 400
     print(f"Stream request received - Question: {question}, Model: {model}")
-    # Get the current RAG system based on active_system
-    current_system = active_rag_system if active_system == "pdf" else web_rag_system
-    # Update model if different from current
-    if model != current_system.ollama_client.model_name:
-        print(f"Changing model from {current_system.ollama_client.model_name} to {model}")
-        current_system.ollama_client.model_name = model
-        current_system.ollama_client.llm = current_system.ollama_client.llm.__class__(
-            model=model,
-            base_url=current_system.ollama_client.api_base
-        )
+    # Get the RAG system and the shared client for the model of this request
+    try:
+        system_type, current_system = _select_system(params)
+        ollama_client = ollama_clients.get(model)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Reuse the documents retrieved by /query instead of searching again
+    retrieved_docs = retrieval_cache.get(retrieval_id, question, **_retrieval_scope(system_type, current_system))
     headers = {
         'Content-Type': 'text/event-stream',
         'Cache-Control': 'no-cache',
@@ -232,29 +354,32 @@ def stream():
     def generate():
         try:
             print(f"Starting streaming response for question: {question} using model: {model}")
-            if active_system == "pdf":
-                print(f"Using vector store: {active_rag_system.vector_store_type.value}")
-            yield "data: Connection established\n\n"
-            for chunk in current_system.stream_query(question):
-                yield f"data: {chunk}\n\n"
-                time.sleep(0.01)
+            if system_type == "pdf":
+                print(f"Using vector store: {current_system.vector_store_type.value}")
+            # A comment, so that it is not mistaken for part of the answer
+            yield format_comment("connected")
+            yield from stream_events(
+                current_system.stream_query(question, retrieved_docs=retrieved_docs, ollama_client=ollama_client),
+                coalesce_interval=STREAM_COALESCE_INTERVAL
+            )
         except Exception as e:
             error_msg = str(e)
             print(f"Error in streaming: {error_msg}")
-            yield f"data: Error: {error_msg}\n\n"
+            yield format_event(f"Error: {error_msg}")
         finally:
             print("Streaming completed, sending DONE signal")
-            yield "data: [DONE]\n\n"
+            yield format_event("[DONE]")
     return Response(generate(), headers=headers)
 
 @app.route('/models')
 def get_models():
-    # Get the current RAG system based on active_system
-    current_system = active_rag_system if active_system == "pdf" else web_rag_system
-    models = get_available_models(current_system.ollama_client.api_base)
-    if not models:
-        models = ["llama2"]
-    return jsonify(models)
+    return jsonify(model_registry.get_models())
+
+@app.route('/models/refresh', methods=['POST'])
+def refresh_models():
+    """Refresh the model list in the background, e.g. after pulling a model."""
+    model_registry.invalidate()
+    return jsonify({'success': True}), 202
 
 @app.route('/vector-stores')
 def get_vector_stores():
@@ -262,6 +387,19 @@ def get_vector_stores():
     vector_stores = [vs.value for vs in VectorStoreType]
     return jsonify(vector_stores)
 
+@app.route('/cache-stats')
+def get_cache_stats():
+    """Get hit/miss statistics of the query embedding and answer caches."""
+    return jsonify({
+        'query_embeddings': query_cache_stats(),
+        'answers': answer_cache.stats()
+    })
+
+@app.route('/metrics')
+def get_metrics():
+    """Get the stage latency histograms in the Prometheus text format."""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
     # Ensure the indexes are loaded
     try:
@@ -269,6 +407,7 @@ if __name__ == '__main__':
         chroma_rag_system.index_documents()
     except Exception as e:
         print(f"Warning: Could not load indexes: {str(e)}")
+    start_background_tasks()
     
     # Run the Flask app
     app.run(debug=True, host='0.0.0.0', port=5000)